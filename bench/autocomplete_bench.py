@@ -0,0 +1,43 @@
+"""
+Measures PrefixIndex build time and completion latency for one-, two- and three-character prefixes,
+the worst cases for autocomplete since short prefixes cover the most keys.
+
+    python bench/autocomplete_bench.py [--keys 200000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('BOT_DATA_DIR', tempfile.mkdtemp(prefix='bot-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    keys = [''.join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(4, 16))) for _ in range(args.keys)]
+    index = bot.PrefixIndex()
+    started = time.perf_counter()
+    for value, key in enumerate(keys):
+        index.add(key, value)
+    print(f"build:      {args.keys} keys in {(time.perf_counter() - started) * 1000:.0f} ms")
+    for prefix in ('a', 'ab', 'abc'):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            index.complete(prefix)
+        print(f"complete {prefix!r:<6} {(time.perf_counter() - started) / args.repeat * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Measures how far the event loop falls behind a heartbeat-like ticker while export batches are encoded
+on the loop itself, in a thread (to_thread, before) and in the job runner's worker processes (after).
+
+    python bench/job_latency_bench.py [--batches 40] [--rows 5000]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('BOT_DATA_DIR', tempfile.mkdtemp(prefix='bot-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+from jobs import JobOutput, encode_export_batch
+
+TICK = 0.005
+FIELDS = ['case_id', 'user_id', 'moderator_id', 'action', 'reason', 'created_at']
+
+
+def make_rows(count):
+    return [{'case_id': i, 'user_id': 910000000000000000 + i, 'moderator_id': 910000000000000001,
+             'action': 'warn', 'reason': f"Reason number {i} with some padding text to compress", 'created_at': 1700000000 + i}
+            for i in range(count)]
+
+
+async def ticker(stop, lags):
+    """Sleeps TICK at a time, like the gateway heartbeat, and records how late each wake-up is."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def encode(mode, rows, header):
+    if mode == 'inline':
+        return encode_export_batch('csv', FIELDS, rows, header)
+    if mode == 'to_thread':
+        return await asyncio.to_thread(encode_export_batch, 'csv', FIELDS, rows, header)
+    data = await bot.job_runner.run(encode_export_batch, 'csv', FIELDS, rows, header, priority=bot.JOB_PRIORITY_LOW)
+    return await asyncio.to_thread(data.read) if isinstance(data, JobOutput) else data
+
+
+async def measure(mode, batches, rows):
+    lags = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(stop, lags))
+    started = time.perf_counter()
+    if mode == 'idle':
+        await asyncio.sleep(0.5)
+    else:
+        # Several exports at once, as when a few staff run .export together
+        await asyncio.gather(*(encode(mode, rows, i == 0) for i in range(batches)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await tick_task
+    lags.sort()
+    return {
+        'wall': wall,
+        'p50': statistics.median(lags) * 1000,
+        'p99': lags[int(len(lags) * 0.99) - 1] * 1000 if len(lags) >= 100 else lags[-1] * 1000,
+        'max': lags[-1] * 1000,
+        'ticks': len(lags),
+    }
+
+
+async def main(args):
+    rows = make_rows(args.rows)
+    # Start the workers first so pool start-up isn't charged to the measurement
+    await bot.job_runner.run(encode_export_batch, 'csv', FIELDS, rows[:1], True)
+    print(f"{args.batches} batches x {args.rows} rows, {bot.JOB_WORKERS} job workers, tick {TICK * 1000:.0f} ms")
+    print(f"{'mode':<10} {'wall s':>8} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11} {'ticks':>6}")
+    try:
+        for mode in ('idle', 'inline', 'to_thread', 'jobs'):
+            r = await measure(mode, args.batches, rows)
+            print(f"{mode:<10} {r['wall']:>8.2f} {r['p50']:>11.2f} {r['p99']:>11.2f} {r['max']:>11.2f} {r['ticks']:>6}")
+    finally:
+        bot.job_runner.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batches', type=int, default=40)
+    parser.add_argument('--rows', type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+"""
+Measures what a log call costs the event loop, comparing eager f-string messages (before) with
+lazy %s arguments (after), for records below the configured level and for emitted records.
+
+    python bench/logging_bench.py [--calls 200000]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+os.environ['LOG_LEVEL'] = 'INFO'
+os.environ.setdefault('BOT_DATA_DIR', tempfile.mkdtemp(prefix='bot-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+
+
+class Ticket:
+    """Stands in for the discord objects the bot logs, whose __str__ isn't free."""
+    def __init__(self, ticket_id):
+        self.ticket_id = ticket_id
+        self.user = {'id': 910000000000000000 + ticket_id, 'name': f"user{ticket_id}"}
+
+    def __str__(self):
+        return f"Ticket #{self.ticket_id} for {self.user['name']} ({self.user['id']})"
+
+
+def eager(logger, level, ticket, count):
+    logger.log(level, f"Relayed {ticket} with {count} attachments to the modmail thread")
+
+def lazy(logger, level, ticket, count):
+    logger.log(level, "Relayed %s with %s attachments to the modmail thread", ticket, count)
+
+
+async def measure(style, level, calls):
+    ticket = Ticket(42)
+    start = time.perf_counter()
+    for i in range(calls):
+        style(bot.logger, level, ticket, i)
+        if i % 100 == 0:
+            await asyncio.sleep(0)  # Interleave with other loop work like a busy gateway would
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    # Keep the queue listener running but send its output nowhere
+    sink = logging.StreamHandler(io.StringIO())
+    bot.log_listener.handlers = (sink,)
+
+    print(f"{'case':<34}{'before (f-string)':>20}{'after (lazy %s)':>18}")
+    for name, level in (("DEBUG call, level INFO (filtered)", logging.DEBUG), ("INFO call, level INFO (emitted)", logging.INFO)):
+        before = asyncio.run(measure(eager, level, args.calls))
+        after = asyncio.run(measure(lazy, level, args.calls))
+        print(f"{name:<34}{before:>17.3f} us{after:>15.3f} us")
+        sink.stream.seek(0)
+        sink.stream.truncate()
+
+
+if __name__ == '__main__':
+    main()
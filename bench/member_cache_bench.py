@@ -0,0 +1,78 @@
+"""
+Measures member cache memory per 100k guild members under each MEMBER_CACHE_POLICY. The guild is
+built through the harness: 'all' receives every member as startup chunking would deliver them,
+'active' and 'none' start empty; then a share of members join and chat under every policy.
+Each policy runs in its own process, because the policy is read when bot.py is imported.
+'none' is the floor: what the harness and the event traffic cost with no members cached.
+
+    python bench/member_cache_bench.py [--members 100000] [--active-share 0.02]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLICIES = ('all', 'active', 'none')
+
+
+def rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+async def build(members, active_share):
+    import harness
+    payloads = [harness.member_payload(harness.Harness.member_id(i)) for i in range(members)]
+    active = payloads[:int(members * active_share)]
+    gc.collect()
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    async with harness.Harness(members=payloads, cache_members=os.environ['MEMBER_CACHE_POLICY'] == 'all') as h:
+        for member in active:
+            if h.guild.get_member(int(member['user']['id'])) is None:
+                h.state.parsers['GUILD_MEMBER_ADD']({**member, 'guild_id': str(harness.GUILD_ID)})
+            h.state.parsers['MESSAGE_CREATE'](harness.message_payload("hello there", int(member['user']['id'])))
+        await h.settle()
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return {'cached': len(h.guild.members), 'traced': traced, 'rss': rss_bytes() - rss_before}
+
+
+def child(args):
+    import logging
+    logging.getLogger('discord').setLevel(logging.ERROR)  # Welcome-message failures for the fake joins aren't the point
+    print(json.dumps(asyncio.run(build(args.members, args.active_share))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=100000)
+    parser.add_argument('--active-share', type=float, default=0.02, help="Share of members who join or chat during the run")
+    parser.add_argument('--child', choices=POLICIES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        sys.path.insert(0, ROOT)
+        child(args)
+        return
+
+    scale = 100000 / args.members
+    print(f"{args.members} members, {args.active_share:.0%} active")
+    print(f"{'policy':<8}{'cached':>10}{'traced MiB/100k':>18}{'RSS MiB/100k':>15}")
+    for policy in POLICIES:
+        env = {**os.environ, 'MEMBER_CACHE_POLICY': policy, 'LOG_LEVEL': 'ERROR',
+               'BOT_DATA_DIR': tempfile.mkdtemp(prefix='bot-bench-')}
+        output = subprocess.run([sys.executable, __file__, '--child', policy, '--members', str(args.members), '--active-share', str(args.active_share)],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{policy:<8}{result['cached']:>10}{result['traced'] * scale / 2**20:>18.1f}{result['rss'] * scale / 2**20:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Measures bytes per record for the in-memory moderation state, comparing the old representation
+(before: defaultdict counters, warnings as dicts with datetime timestamps) with the current one
+(after: UserCounters and interned WarningRecord tuples), using tracemalloc.
+
+    python bench/memory_bench.py [--users 100000] [--warnings 100000]
+"""
+import argparse
+import datetime
+import gc
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from collections import defaultdict
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('BOT_DATA_DIR', tempfile.mkdtemp(prefix='bot-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+
+USER_ID_BASE = 910000000000000000
+MODERATOR_ID = USER_ID_BASE - 1
+REASONS = ["Spamming in general", "Off-topic links", "Automod: Repeated the same message 4 times in 10s", "Rude to members"]
+
+
+def measure(build):
+    """Returns the bytes still allocated by build() once it returns, keeping its result alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del state
+    return after - before
+
+
+def counter_updates(users, rng):
+    return [(USER_ID_BASE + i, rng.randint(1, 500)) for i in range(users)]
+
+
+def warning_rows(count, users, rng):
+    return [(USER_ID_BASE + rng.randrange(users), case_id, rng.randrange(len(REASONS)), 1700000000 + case_id)
+            for case_id in range(1, count + 1)]
+
+
+def reason_text(index):
+    """Reasons arrive as fresh strings (from commands and the case log), never as shared literals."""
+    return REASONS[index].encode().decode()
+
+
+def old_counters(updates):
+    counters = defaultdict(int)
+    for user_id, points in updates:
+        counters[user_id] += points
+    return counters
+
+
+def new_counters(updates):
+    counters = bot.UserCounters()
+    counters.update(dict(updates))
+    return counters
+
+
+def old_warnings(rows):
+    warnings = defaultdict(list)
+    for user_id, case_id, reason, timestamp in rows:
+        warnings[user_id].append({
+            'case_id': case_id,
+            'reason': reason_text(reason),
+            'moderator': MODERATOR_ID,
+            'timestamp': datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+        })
+    return warnings
+
+
+def new_warnings(rows):
+    warnings = {}
+    for user_id, case_id, reason, timestamp in rows:
+        warnings.setdefault(user_id, []).append(bot.WarningRecord(case_id, sys.intern(reason_text(reason)), MODERATOR_ID, timestamp))
+    return warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000, help="Users with a reputation/infraction counter")
+    parser.add_argument('--warnings', type=int, default=100000, help="Warning records")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    updates = counter_updates(args.users, rng)
+    rows = warning_rows(args.warnings, max(1, args.warnings // 4), rng)
+
+    print(f"{'record':<18}{'count':>10}{'before B/rec':>14}{'after B/rec':>13}{'saved':>8}")
+    for name, count, before, after in (
+        ("counter", args.users, measure(lambda: old_counters(updates)), measure(lambda: new_counters(updates))),
+        ("warning record", args.warnings, measure(lambda: old_warnings(rows)), measure(lambda: new_warnings(rows))),
+    ):
+        print(f"{name:<18}{count:>10}{before / count:>14.1f}{after / count:>13.1f}{1 - after / before:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Replays a gateway event stream through bot.py offline and reports throughput, handler latency
+and REST calls per event.
+
+    python bench/replay_bench.py                       # 5000 synthetic messages
+    python bench/replay_bench.py --input events.jsonl  # a recorded or hand-written stream
+    python bench/replay_bench.py --write-synthetic events.jsonl --events 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')  # Per-message INFO logs would dominate the measurement
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+
+
+async def run(events, http_latency):
+    async with harness.Harness(http_latency=http_latency) as bench:
+        start = time.perf_counter()
+        results = await bench.replay(events)
+        wall = time.perf_counter() - start
+        routes = Counter(f"{call.method} {call.path}" for call in bench.http.calls)
+    return harness.summarize(results, wall), routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', help="JSONL event stream to replay (default: synthetic messages)")
+    parser.add_argument('--events', type=int, default=5000, help="Synthetic events to generate")
+    parser.add_argument('--members', type=int, default=500, help="Distinct authors in the synthetic stream")
+    parser.add_argument('--http-latency-ms', type=float, default=0.0, help="Simulated REST round trip")
+    parser.add_argument('--write-synthetic', metavar='PATH', help="Write the synthetic stream to PATH and exit")
+    args = parser.parse_args()
+
+    if args.write_synthetic:
+        harness.write_events(args.write_synthetic, harness.synthetic_events(args.events, members=args.members))
+        print(f"Wrote {args.events} events to {args.write_synthetic}")
+        return
+    events = list(harness.load_events(args.input) if args.input else harness.synthetic_events(args.events, members=args.members))
+    summary, routes = asyncio.run(run(events, args.http_latency_ms / 1000))
+
+    print(f"events:          {summary['events']}")
+    print(f"throughput:      {summary['events_per_sec']:.0f} events/sec")
+    print(f"latency p50:     {summary['p50_ms']:.3f} ms")
+    print(f"latency p99:     {summary['p99_ms']:.3f} ms")
+    print(f"latency max:     {summary['max_ms']:.3f} ms")
+    print(f"REST per event:  {summary['rest_calls_per_event']:.3f}")
+    print("REST calls by route:")
+    for route, count in routes.most_common():
+        print(f"  {count:>8}  {route}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Measures restart-to-ready time for the state snapshot at a large state size: how long saving takes,
+how big the file is, and how long load_state_snapshot() takes on a fresh process, including the
+replay of warnings recorded in the case log after the snapshot's high-water mark.
+
+    python bench/snapshot_restart_bench.py [--entries 1000000] [--replay 10000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('BOT_DATA_DIR', tempfile.mkdtemp(prefix='bot-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+
+USER_ID_BASE = 910000000000000000
+REASONS = ["Spamming in general", "Off-topic links", "Automod: Repeated the same message 4 times in 10s", "Rude to members"]
+
+
+def reset_state():
+    bot.reputation = bot.UserCounters()
+    bot.infractions = bot.UserCounters()
+    bot.warnings = {}
+    bot.quarantined_users = set()
+
+
+def fill_state(entries, rng):
+    """Splits `entries` between reputation and warnings, the two sections that grow with the server."""
+    users = entries // 2
+    bot.reputation.update({USER_ID_BASE + i: rng.randint(1, 500) for i in range(users)})
+    warned = entries // 8
+    for case_id in range(1, entries - users + 1):
+        user_id = USER_ID_BASE + rng.randrange(warned)
+        bot.add_warning(user_id, case_id, rng.choice(REASONS), USER_ID_BASE + 1)
+    bot.quarantined_users.update(USER_ID_BASE + i for i in range(0, users, 1000))
+    return entries - users
+
+
+async def record_cases(first_case_id, count, rng):
+    """Writes warnings to the case log only, as if they were issued after the last snapshot."""
+    now = time.time()
+    records = [(case_id, 'Warn', USER_ID_BASE + rng.randrange(count), USER_ID_BASE + 1, rng.choice(REASONS), None, now)
+               for case_id in range(first_case_id, first_case_id + count)]
+
+    def insert():
+        conn = bot.case_store._connect()
+        with bot.case_store.lock, conn:
+            conn.executemany("INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+    await asyncio.to_thread(insert)
+
+
+async def main(args):
+    rng = random.Random(7)
+    reset_state()
+    last_case_id = fill_state(args.entries, rng)
+    await record_cases(1, last_case_id, rng)  # The journal holds every case the snapshot reflects
+
+    started = time.perf_counter()
+    await bot.save_state_snapshot()
+    save_seconds = time.perf_counter() - started
+    size = os.path.getsize(bot.SNAPSHOT_PATH)
+    await record_cases(last_case_id + 1, args.replay, rng)
+
+    reset_state()
+    started = time.perf_counter()
+    await bot.load_state_snapshot()
+    load_seconds = time.perf_counter() - started
+
+    restored = len(bot.reputation) + sum(len(records) for records in bot.warnings.values())
+    print(f"state entries:       {args.entries} (restored {restored})")
+    print(f"snapshot size:       {size / 1e6:.1f} MB")
+    print(f"save:                {save_seconds * 1000:.0f} ms")
+    print(f"restart to ready:    {load_seconds * 1000:.0f} ms (with {args.replay} warnings replayed from the case log)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--replay', type=int, default=10000, help="Warnings recorded after the snapshot")
+    asyncio.run(main(parser.parse_args()))
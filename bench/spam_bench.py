@@ -0,0 +1,67 @@
+"""
+Measures SpamDetector.check() cost per message and the detector's memory once SPAM_MAX_TRACKED_USERS
+users have a window (flat ring buffers plus the user -> slot index).
+
+    python bench/spam_bench.py [--messages 200000] [--users 100000]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('BOT_DATA_DIR', tempfile.mkdtemp(prefix='bot-bench-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+
+USER_ID_BASE = 910000000000000000
+WORDS = ("the cosmic crew is checking notes for the next exam can someone share the physics link "
+         "thanks a lot see you in the study hall tonight at nine").split()
+
+
+def messages(count, users, rng):
+    """Chat-shaped traffic: 3-25 word messages, the odd mention and link, spread over `users` authors."""
+    for _ in range(count):
+        text = ' '.join(rng.choices(WORDS, k=rng.randint(3, 25)))
+        yield USER_ID_BASE + rng.randrange(users), text, int(rng.random() < 0.05), int(rng.random() < 0.03)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=bot.SPAM_MAX_TRACKED_USERS)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    # Memory: every user gets a window, so the arrays and index are at their full size
+    gc.collect()
+    tracemalloc.start()
+    detector = bot.SpamDetector(max_users=args.users)
+    now = 0.0
+    for user_offset in range(args.users):
+        detector.check(USER_ID_BASE + user_offset, "hello there", 0, 0, now=now)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Speed: warm detector, mixed traffic, one message every 2ms of simulated time
+    traffic = list(messages(args.messages, args.users, rng))
+    flagged = 0
+    started = time.perf_counter()
+    for user_id, text, mentions, links in traffic:
+        now += 0.002
+        if detector.check(user_id, text, mentions, links, now=now):
+            flagged += 1
+    elapsed = time.perf_counter() - started
+
+    print(f"users tracked:      {len(detector.slots)} (ring size {detector.ring_size})")
+    print(f"memory:             {memory / 2**20:.1f} MiB ({memory / args.users:.0f} bytes per user)")
+    print(f"check():            {elapsed / args.messages * 1e6:.1f} us/message over {args.messages} messages ({flagged} flagged)")
+
+
+if __name__ == '__main__':
+    main()
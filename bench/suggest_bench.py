@@ -0,0 +1,83 @@
+"""
+Replays .suggest through the harness with a simulated REST round trip and compares the serialized
+setup (before: reactions, discussion thread and confirmation one after another) with the current
+concurrent setup (after: confirm right after posting, finish the rest in the background).
+Reports per command the time until the submitter sees the confirmation and until setup is done.
+
+    python bench/suggest_bench.py [--commands 50] [--http-latency-ms 50]
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+
+import bot
+import harness
+
+
+async def serialized_suggest(ctx, *, suggestion_text: str):
+    """The command as it was before: every setup step awaited in turn, then the confirmation."""
+    suggestion_channel = bot.bot.get_channel(bot.SUGGESTION_CHANNEL_ID)
+    suggestion_id = await bot.id_allocator.next_id('suggestion')
+    embed = discord.Embed(title=f"💡 New Cosmic Suggestion #{suggestion_id} 🌟", description=suggestion_text,
+                          timestamp=datetime.datetime.now(datetime.timezone.utc))
+    suggestion_message = await suggestion_channel.send(embed=embed)
+    await suggestion_message.add_reaction(bot.SUGGESTION_UPVOTE_EMOJI)
+    await suggestion_message.add_reaction(bot.SUGGESTION_DOWNVOTE_EMOJI)
+    discussion_thread = await suggestion_message.create_thread(name=f"Suggestion-#{suggestion_id}-Discussion", auto_archive_duration=1440)
+    await discussion_thread.send(f"This is a private discussion thread for suggestion #{suggestion_id}. Staff can discuss here.")
+    await ctx.send(f"✅ Your cosmic suggestion #{suggestion_id} has been submitted! Thank you for helping shape our galaxy! 🌟")
+    await bot.log_action("Suggestion Submitted", ctx.author, None, f"Suggestion #{suggestion_id}: {suggestion_text}")
+
+
+async def run(mode, commands, latency):
+    command = bot.bot.get_command('suggest')
+    original = command.callback
+    if mode == 'serialized':
+        command.callback = serialized_suggest
+    confirmations, setups = [], []
+    try:
+        async with harness.Harness(http_latency=latency) as h:
+            send_message = h.http.responders[('POST', '/channels/{channel_id}/messages')]
+            confirmed_at = []
+
+            def record_confirmation(params, payload):
+                if params['channel_id'] == str(harness.GENERAL_CHANNEL_ID):
+                    confirmed_at.append(time.perf_counter())
+                return send_message(params, payload)
+
+            h.http.respond('POST', '/channels/{channel_id}/messages', record_confirmation)
+            for i in range(commands):
+                confirmed_at.clear()
+                started = time.perf_counter()
+                await h.message(f".suggest Add a stargazing channel, take {i}", harness.Harness.member_id(i))
+                setups.append(time.perf_counter() - started)
+                confirmations.append(confirmed_at[0] - started)
+    finally:
+        command.callback = original
+    return confirmations, setups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=50)
+    parser.add_argument('--http-latency-ms', type=float, default=50.0, help="Simulated REST round trip")
+    args = parser.parse_args()
+
+    print(f"{args.commands} commands, {args.http_latency_ms:.0f} ms per REST call")
+    print(f"{'setup':<12}{'confirm p50 ms':>16}{'confirm max ms':>16}{'done p50 ms':>13}")
+    for mode in ('serialized', 'concurrent'):
+        confirmations, setups = asyncio.run(run(mode, args.commands, args.http_latency_ms / 1000))
+        print(f"{mode:<12}{statistics.median(confirmations) * 1000:>16.0f}{max(confirmations) * 1000:>16.0f}{statistics.median(setups) * 1000:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
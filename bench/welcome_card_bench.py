@@ -0,0 +1,82 @@
+"""
+Renders welcome cards for a burst of joins and reports cards/sec and the avatar cache hit rate.
+Avatar downloads are served from fake assets (a generated PNG after a simulated CDN round trip);
+some joiners share an avatar, like default avatars and re-joins.
+
+    python bench/welcome_card_bench.py [--joins 500] [--distinct-avatars 200] [--cdn-latency-ms 40]
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from PIL import Image
+
+import bot
+import harness
+
+
+def fake_avatar_reads(latency):
+    """Replaces Asset.read with a CDN stand-in; returns the list of URLs it served."""
+    served = []
+    images = {}
+
+    async def read(asset):
+        served.append(asset.url)
+        await asyncio.sleep(latency)
+        if asset.url not in images:
+            buffer = io.BytesIO()
+            shade = len(images) % 200
+            Image.new('RGB', (256, 256), (40 + shade, 80, 255 - shade)).save(buffer, format='PNG')
+            images[asset.url] = buffer.getvalue()
+        return images[asset.url]
+
+    discord.Asset.read = read
+    return served
+
+
+async def run(args):
+    served = fake_avatar_reads(args.cdn_latency_ms / 1000)
+    rng = random.Random(7)
+    async with harness.Harness() as h:
+        members = []
+        for _ in range(args.joins):
+            # Avatar URLs are per user and hash, so a shared avatar means a repeat joiner
+            user = rng.randrange(args.distinct_avatars)
+            payload = harness.member_payload(harness.Harness.member_id(user))
+            payload['user']['avatar'] = f"avatar{user}"
+            members.append(discord.Member(data=payload, guild=h.guild, state=h.state))
+        await bot.welcome_cards.load()  # Fonts and background are a one-off start-up cost
+        started = time.perf_counter()
+        for offset in range(0, len(members), args.burst):
+            # Joins arrive in bursts; each burst renders concurrently like on_member_join does
+            await asyncio.gather(*(bot.welcome_cards.render(member) for member in members[offset:offset + args.burst]))
+        wall = time.perf_counter() - started
+    return wall, len(served)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--joins', type=int, default=500)
+    parser.add_argument('--burst', type=int, default=50, help="Joins rendered concurrently")
+    parser.add_argument('--distinct-avatars', type=int, default=200)
+    parser.add_argument('--cdn-latency-ms', type=float, default=40.0)
+    args = parser.parse_args()
+
+    wall, downloads = asyncio.run(run(args))
+    renders = sorted(bot.welcome_cards.render_samples)
+    print(f"joins:                {args.joins} in bursts of {args.burst}, {args.distinct_avatars} distinct avatars")
+    print(f"throughput:           {args.joins / wall:.1f} cards/sec")
+    print(f"render p50 / p99:     {renders[len(renders) // 2] * 1000:.0f} / {renders[int(len(renders) * 0.99) - 1] * 1000:.0f} ms")
+    print(f"avatar cache hit:     {bot.welcome_cards.avatar_hit_rate:.1%} ({downloads} downloads)")
+
+
+if __name__ == '__main__':
+    main()
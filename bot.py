@@ -1,25 +1,46 @@
 import discord
 from discord.ext import commands, tasks
+from discord import app_commands
 import os
 from dotenv import load_dotenv
 import datetime
 import re
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict, namedtuple
+from bisect import bisect_left
 import asyncio
 import sys
+import signal
+import struct
+import zlib
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+import atexit
+import io
 import aiohttp
 import json
+import gzip
 import random
+import sqlite3
+import threading
+import time
+import heapq
+import itertools
+from array import array
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import openai
-
-# Set up logging for cosmic debugging 🌌
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger('discord')
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
-logger.addHandler(handler)
+from jobs import JobOutput, encode_export_batch, execute_job, sweep_results, worker_main
+try:
+    from googleapiclient.discovery import build as build_drive_service
+    from google.oauth2 import service_account
+except ImportError:  # Drive library sync is disabled without the Google client libraries
+    build_drive_service = None
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Welcome cards fall back to a plain embed without Pillow
+    Image = None
 
 # Load environment variables from the starry .env file ✨
 load_dotenv()
@@ -29,12 +50,56 @@ YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')  # Add to .env for YouTube API
 # Placeholder for YouTube Channel ID - **IMPORTANT: Update this with your actual YouTube Channel ID**
 YOUTUBE_CHANNEL_ID = os.getenv('YOUTUBE_CHANNEL_ID', 'UCYourChannelId')
 openai.api_key = os.getenv("OPENAI_API_KEY")
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()  # 'text' or 'json'
+LOG_FILE = os.getenv('LOG_FILE')  # Optional size-rotated log file
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024  # Rotate the log file once it reaches this size
+LOG_FILE_BACKUPS = 5  # Rotated log files to keep
+GOOGLE_DRIVE_FOLDER_ID = os.getenv('GOOGLE_DRIVE_FOLDER_ID')  # Root folder of the notes library to index
+GOOGLE_SERVICE_ACCOUNT_FILE = os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE', 'service_account.json')  # Credentials with read access to that folder
+WELCOME_CARD_FONT_PATH = os.getenv('WELCOME_CARD_FONT', 'DejaVuSans-Bold.ttf')  # TrueType font for welcome cards
+MEMBER_CACHE_POLICY = os.getenv('MEMBER_CACHE_POLICY', 'all').lower()  # 'all', 'active' or 'none' (see build_member_cache_flags)
+
+# Set up logging for cosmic debugging 🌌
+class JsonLogFormatter(logging.Formatter):
+    """
+    Formats log records as single-line JSON objects.
+    """
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
 
-if not DISCORD_TOKEN:
-    logger.error("DISCORD_TOKEN not found! A star has fallen—please set the token and try again! 🌠")
-    sys.exit(1)
-else:
-    logger.info("DISCORD_TOKEN loaded successfully! Ready to launch into the cosmos! 🚀")
+def setup_logging():
+    """
+    Routes all logging through a queue so the event loop never blocks on console or file I/O.
+    A single listener thread owns the real handlers, so every record is emitted exactly once.
+    """
+    formatter = JsonLogFormatter() if LOG_FORMAT == 'json' else logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s')
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        handlers.append(RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8'))
+    for log_handler in handlers:
+        log_handler.setFormatter(formatter)
+
+    log_queue = SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.handlers.clear()
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(LOG_LEVEL)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+log_listener = setup_logging()
+logger = logging.getLogger('discord')
 
 # Bot setup with intents to see the universe 👀
 intents = discord.Intents.default()
@@ -42,10 +107,28 @@ intents.members = True
 intents.message_content = True
 # intents.voice_states = True  # Uncomment if voice features are needed (requires audioop)
 
+def build_member_cache_flags(policy):
+    """
+    Maps MEMBER_CACHE_POLICY to member cache flags.
+    'all' chunks every guild at startup and caches everyone (the classic behaviour).
+    'active' skips startup chunking and only caches members seen joining or updated while the bot runs;
+    members looked up with guild.fetch_member() are not added to the cache.
+    'none' keeps no members besides the bot itself; lookups always go to the API.
+    """
+    if policy == 'active':
+        return discord.MemberCacheFlags(voice=False, joined=True)
+    if policy == 'none':
+        return discord.MemberCacheFlags.none()
+    if policy != 'all':
+        logger.warning("Unknown MEMBER_CACHE_POLICY %r, caching all members", policy)
+    return discord.MemberCacheFlags.from_intents(intents)
+
 # Initialize bot with a cosmic prefix and slash command support 🌟
 bot = commands.Bot(
     command_prefix='.',
     intents=intents,
+    member_cache_flags=build_member_cache_flags(MEMBER_CACHE_POLICY),
+    chunk_guilds_at_startup=MEMBER_CACHE_POLICY not in ('active', 'none'),  # Other policies chunk on demand
     help_command=None  # Disable default help command to craft our own starry version ✨
 )
 
@@ -55,35 +138,2264 @@ HELPER_ROLE_ID = 1374320995942404216  # Helper role ID - **IMPORTANT: Update wit
 MOD_LOG_CHANNEL_ID = 1374377561790087210  # Moderation log channel ID - **IMPORTANT: Update with actual channel ID**
 STATUS_CHANNEL_ID = 1375511813713821727  # Status channel ID - **IMPORTANT: Update with actual channel ID**
 SUGGESTION_CHANNEL_ID = 1375094650003521636  # Suggestion channel ID - **IMPORTANT: Update with actual channel ID**
-SUGGESTION_CATEGORY_ID = 1376944299744301137  # Private suggestion discussion category - **IMPORTANT: Update with actual category ID**
+SUGGESTION_CATEGORY_ID = 1376944299744301137  # Private suggestion discussion category (unused: discussion threads hang off the suggestion message) - **IMPORTANT: Update with actual category ID**
 GUIDE_CHANNEL_ID = 1376473911717400598  # Guide channel ID - **IMPORTANT: Update with actual channel ID**
 MODMAIL_CHANNEL_ID = 1375161713619374140  # Modmail channel ID - **IMPORTANT: Update with actual channel ID**
 VERIFICATION_CHANNEL_ID = 123456789  # Verification channel ID - **IMPORTANT: Update with correct ID**
 QUARANTINE_ROLE_ID = 1374377545209872436  # Quarantine role ID - **IMPORTANT: Update with actual role ID**
 BUMP_CHANNEL_ID = 1375782287613886486  # Bump reminder channel - **IMPORTANT: Update with actual channel ID**
 BUMP_ROLE_ID = 1377934073250451537  # Bump role - **IMPORTANT: Update with actual role ID**
+BUMP_BOT_ID = 302050872383242240  # DISBOARD, whose success message marks a bump
+BUMP_SUCCESS_TEXT = "bump done"  # Lowercased text in the bump bot's success embed
+BUMP_COOLDOWN_SECONDS = 2 * 60 * 60  # Time before the server can be bumped again
 SOCIAL_MEDIA_CHANNEL_ID = 1375093303191535647  # Social media updates channel - **IMPORTANT: Update with actual channel ID**
 SOCIAL_MEDIA_ROLE_ID = 1376816953901060117  # Social media ping role - **IMPORTANT: Update with actual role ID**
 LINK_CHANNEL_ID = 1377973054751379627  # Resource linking channel - **IMPORTANT: Update with actual channel ID**
 WELCOME_CHANNEL_ID = 1376975443147620433 # Example Welcome channel ID - **IMPORTANT: Update with actual channel ID**
 DEFAULT_ROLE_ID = 1376975443147620433 # Example default role ID for new members - **IMPORTANT: Update with actual role ID**
+DATA_DIR = os.getenv('BOT_DATA_DIR', 'data')  # Where persistent bot state lives
+STATE_DB_PATH = os.path.join(DATA_DIR, 'bot_state.db')  # SQLite database for persistent state
+ID_BLOCK_SIZE = 20  # IDs reserved per storage round trip by the ID allocator
+CASES_PER_PAGE = 5  # Cases shown per page in .cases results
+EXPORT_DIR = os.path.join(DATA_DIR, 'exports')  # Where export files are written
+SNAPSHOT_PATH = os.path.join(DATA_DIR, 'state.snapshot')  # Binary snapshot of the in-memory state
+SNAPSHOT_INTERVAL_MINUTES = 5  # How often the state snapshot is refreshed (it is also written on SIGTERM)
+JOB_RESULT_DIR = os.path.join(DATA_DIR, 'jobs')  # Temp files for large worker job results
+EXPORT_BATCH_SIZE = 100  # Rows buffered per write (and records fetched per page) during exports
+EXPORT_PROGRESS_INTERVAL = 5  # Seconds between export progress updates
+EXPORT_ATTACH_LIMIT = 8 * 1024 * 1024  # Exports larger than this are kept on disk instead of uploaded
+EXPORT_RETENTION_SECONDS = 7 * 24 * 3600  # Exports kept on disk are deleted after this long
+SUGGESTION_UPVOTE_EMOJI = "✅"
+SUGGESTION_DOWNVOTE_EMOJI = "❌"
+SUGGESTION_APPROVE_SCORE = 10  # Net votes (✅ minus ❌) at which a pending suggestion is auto-approved
+SUGGESTION_REJECT_SCORE = -10  # Net votes at which a pending suggestion is auto-rejected
+SUGGESTION_RETRY_ATTEMPTS = 3  # Attempts for each background suggestion setup step
+AI_CACHE_MAX_ENTRIES = 2000  # Cached AI replies kept (least recently used are evicted first)
+AI_CACHE_TTL_SECONDS = 6 * 60 * 60  # How long a cached AI reply stays fresh
+AI_CONTEXT_TOKEN_BUDGET = 800  # Approximate tokens of channel history sent with each AI request
+AI_CONTEXT_MAX_TURNS = 12  # Turns kept per channel in the AI conversation ring buffer
+AI_CONTEXT_MAX_CHARS = 500  # Longer messages are truncated before being remembered
+AI_CONTEXT_MAX_CHANNELS = 5000  # Channels with remembered AI conversations (least recently active evicted first)
+AI_CONTEXT_IDLE_SECONDS = 30 * 60  # Conversations idle for longer than this are forgotten
+AI_STREAM_EDIT_INTERVAL = 1.0  # Minimum seconds between progressive edits of a streamed AI reply
+AI_STREAM_METRIC_SAMPLES = 500  # Time-to-first-token samples kept for .aistats
+AI_SYSTEM_PROMPT = "You are a helpful, friendly, and casual AI assistant in a Discord server. Reply like a normal human. Keep it brief, natural, and clear."
+STATUS_PING_COOLDOWN_SECONDS = 600  # Don't re-announce the same status for the same user in the same channel within this window
+DISCORD_MESSAGE_LIMIT = 2000  # Maximum characters in a single Discord message
+DISCORD_EMBED_TOTAL_LIMIT = 6000  # Maximum combined characters across all embeds in one message
+OUTBOUND_MAX_IN_FLIGHT = 4  # Concurrent sends allowed through the outbound dispatcher
+OUTBOUND_LATENCY_SAMPLES = 500  # Latency samples kept per outbound queue for metrics
+OUTBOUND_STATS_MAX_QUEUES = 200  # Outbound queues tracked for metrics before the least recently used is dropped
+HANDLER_LATENCY_SAMPLES = 500  # Latency samples kept per on_message handler for metrics
+DRIVE_SYNC_INTERVAL_MINUTES = 5  # How often the Drive changes feed is polled
+DRIVE_SEARCH_RESULTS = 5  # Library matches posted for a resource request
+LINK_CHECK_INTERVAL_MINUTES = 30  # How often stored links are swept for due health checks
+LINK_CHECK_OK_TTL_SECONDS = 24 * 60 * 60  # How long a healthy link's result is trusted before revalidation
+LINK_CHECK_BROKEN_TTL_SECONDS = 60 * 60  # Failing links are rechecked sooner
+LINK_CHECK_FAILURES_BEFORE_BROKEN = 2  # Consecutive failures (timeouts, 5xx) before a link is flagged; 404/410 flag immediately
+LINK_CHECK_WORKERS = 32  # Concurrent link checks in one sweep
+LINK_CHECK_MAX_CONNECTIONS = 64  # Pooled connections across all hosts
+LINK_CHECK_PER_HOST = 4  # Pooled connections to any single host
+LINK_CHECK_TIMEOUT_SECONDS = 15  # Per-request timeout for a link check
+LINK_DIGEST_MAX_ENTRIES = 20  # Broken links listed in one staff digest
+AUTOCOMPLETE_MAX_CHOICES = 25  # Discord's cap on autocomplete suggestions
+JOB_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Worker processes for CPU-heavy jobs (one core left for the event loop)
+JOB_INLINE_RESULT_BYTES = 256 * 1024  # Larger bytes results come back through a temp file instead of a pickle
+JOB_LATENCY_SAMPLES = 500  # Run/wait time samples kept for .jobstats
+WELCOME_CARD_SIZE = (1000, 300)  # Welcome card dimensions in pixels
+WELCOME_CARD_AVATAR_SIZE = 200  # Avatar diameter on the welcome card
+WELCOME_CARD_AVATAR_CACHE_SIZE = 512  # Decoded avatars kept for re-joins and repeat renders
+WELCOME_CARD_SAMPLES = 500  # Render time samples kept for .jobstats
+SPAM_WINDOW_SECONDS = 10  # Sliding window the spam detector looks at
+SPAM_RING_SIZE = 8  # Recent messages remembered per user
+SPAM_MAX_TRACKED_USERS = 100_000  # Users with a spam window (least recently active recycled first); ~32 MiB at the cap
+SPAM_SIMHASH_MAX_TOKENS = 64  # Words hashed per message for near-duplicate detection
+SPAM_SIMHASH_DISTANCE = 10  # Simhashes within this many differing bits (of 64) count as the same message
+SPAM_DUPLICATE_LIMIT = 3  # Earlier near-duplicates in the window that make a message spam
+SPAM_RATE_LIMIT = 8  # Messages in the window that count as flooding
+SPAM_MENTION_LIMIT = 10  # User/role mentions in the window that count as mass-mentioning
+SPAM_LINK_LIMIT = 6  # Links in the window that count as link spam
+SPAM_TIMEOUT_AFTER_INFRACTIONS = 3  # Infractions at which automod escalates from a warning to a timeout
+SPAM_TIMEOUT_MINUTES = 10  # First automod timeout; doubles with each further infraction
+SPAM_TIMEOUT_MAX_MINUTES = 24 * 60  # Longest automod timeout
+PROFILE_SAMPLE_INTERVAL = 0.005  # Seconds between stack samples during a profiler capture
+PROFILE_MAX_SECONDS = 120  # Longest profiler capture .profile-capture allows
+PROFILE_SLOW_CALLBACK_SECONDS = 0.1  # Event loop callbacks slower than this are recorded during a capture
+
+# Outbound send priorities (lower is sent first) 📬
+SEND_PRIORITY_MODERATION = 0
+SEND_PRIORITY_MODMAIL = 1
+SEND_PRIORITY_LOG = 2
+SEND_PRIORITY_AUTO_REPLY = 3
+SEND_PRIORITY_REMINDER = 3
+SEND_PRIORITY_NAMES = {0: "moderation", 1: "modmail", 2: "log", 3: "auto-reply/reminder"}
+
+# Worker job priorities (lower runs first) ⚙️
+JOB_PRIORITY_HIGH = 0
+JOB_PRIORITY_NORMAL = 1
+JOB_PRIORITY_LOW = 2
+JOB_PRIORITY_NAMES = {0: "high", 1: "normal", 2: "low"}
+
+# Optional per-status lifetimes; statuses not listed here never expire ⏳
+STATUS_TTL_SECONDS = {
+    "Sleeping 😴": 10 * 60 * 60,
+    "Do Later 🚧": 12 * 60 * 60,
+    "Studying 📚": 6 * 60 * 60,
+    "Outside 🚶‍♂️": 4 * 60 * 60,
+    "On Break ☕": 60 * 60
+}
+STATUS_BOARD_REFRESH_DELAY = 2  # Seconds expirations are batched before one status board refresh
+
+# Precomputed status-ping templates, formatted with the pinged user's mention 🌠
+STATUS_PING_TEMPLATES = {
+    "Free ✅": "🌟 {mention} is Free ✅—ready to chat and light up the galaxy! 🗣️",
+    "Sleeping 😴": "💤 {mention} is Sleeping 😴—dreaming in a nebula! They’ll reply soon! 🌙",
+    "Do Later 🚧": "⏳ {mention} is Do Later 🚧—on a cosmic mission! Catch them later! 🪐",
+    "Studying 📚": "📖 {mention} is Studying 📚—diving into knowledge! They’ll reply after! 🧠",
+    "Outside 🚶‍♂️": "🌳 {mention} is Outside 🚶‍♂️—stargazing IRL! They’ll be back! 🍃",
+    "On Break ☕": "☕ {mention} is On Break ☕—chilling in a nebula lounge! They’ll chat soon! 🛋️"
+}
+
+# Compact records for per-user moderation and reputation state 🗜️
+WarningRecord = namedtuple('WarningRecord', ['case_id', 'reason', 'moderator', 'timestamp'])  # timestamp: UNIX epoch seconds
+
+class UserCounters:
+    """
+    Integer counters keyed by user ID, stored as two sorted int64 arrays (16 bytes per user).
+    Reads never insert: a missing user simply reads as 0.
+    """
+    __slots__ = ('user_ids', 'counts')
+
+    def __init__(self):
+        self.user_ids = array('q')
+        self.counts = array('q')
+
+    def _find(self, user_id):
+        index = bisect_left(self.user_ids, user_id)
+        return index, index < len(self.user_ids) and self.user_ids[index] == user_id
+
+    def get(self, user_id, default=0):
+        index, found = self._find(user_id)
+        return self.counts[index] if found else default
+
+    __getitem__ = get
+
+    def __setitem__(self, user_id, value):
+        index, found = self._find(user_id)
+        if found:
+            self.counts[index] = value
+        else:
+            self.user_ids.insert(index, user_id)
+            self.counts.insert(index, value)
+
+    def add(self, user_id, delta=1):
+        """
+        Adds delta to a user's counter and returns the new value.
+        """
+        value = self.get(user_id) + delta
+        self[user_id] = value
+        return value
+
+    def __contains__(self, user_id):
+        return self._find(user_id)[1]
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def items(self):
+        return zip(self.user_ids, self.counts)
+
+    def update(self, mapping):
+        if not self.user_ids:
+            # Bulk load (e.g. from a snapshot) without per-entry inserts
+            ordered = sorted(mapping.items())
+            self.user_ids = array('q', (user_id for user_id, _ in ordered))
+            self.counts = array('q', (count for _, count in ordered))
+            return
+        for user_id, count in mapping.items():
+            self[user_id] = count
+
+    def copy(self):
+        clone = UserCounters()
+        clone.user_ids, clone.counts = array('q', self.user_ids), array('q', self.counts)
+        return clone
+
+    def keys(self):
+        return self.user_ids
+
+    def values(self):
+        return self.counts
 
 # In-memory storage (resets on bot restart—like a supernova! 💥)
 # For persistent storage, consider using a database (e.g., SQLite, PostgreSQL)
 user_statuses = {}  # {user_id: status}
+status_expiry = {}  # {user_id: unix time the status expires} for statuses with a TTL
+status_expiry_heap = []  # (expires_at, user_id); entries not matching status_expiry are stale and skipped
+status_expiry_timer = None  # The single timer handle, armed for the earliest expiry
+status_board_refresh_task = None  # Pending coalesced status board refresh
 suggestions = []  # List of suggestions
+suggestions_by_message = {}  # {message_id: suggestion} for reaction vote tallies
+suggestion_tasks = set()  # Strong references to background suggestion setup jobs
 resources = []  # List of requested resources
 links = []  # List of custom links: {'trigger': str, 'notes_name': str, 'file_link': str, 'user': int, 'channel': int}
-reputation = defaultdict(int)  # {user_id: points}
+reputation = UserCounters()  # {user_id: points}
 modmail_tickets = {}  # {ticket_id: {'user_id': str, 'status': 'open'|'closed', 'thread_id': int}}
-warnings = defaultdict(list)  # {user_id: [{'case_id': int, 'reason': str, 'moderator': int, 'timestamp': datetime}]}
-infractions = defaultdict(int)  # {user_id: infraction_count}
-case_id_counter = 1  # For moderation case IDs
-case_logs = {}  # {case_id: {'action': str, 'target': int, 'moderator': int, 'reason': str}}
+warnings = {}  # {user_id: [WarningRecord]}; read with warnings.get(user_id, ()) so lookups never insert
+infractions = UserCounters()  # {user_id: infraction_count}
 quarantined_users = set()  # Set of user IDs currently quarantined
 status_message = None  # To store the status message for updates
 last_instagram_post = None  # Track last Instagram post ID
 last_youtube_video = None  # Track last YouTube video ID
+status_ping_cooldowns = {}  # {(channel_id, user_id): (status, last_announced_monotonic)}
+
+# --- Outbound Dispatcher ---
+class OutboundDispatcher:
+    """
+    Central outbound message queue shared by every bot feature.
+    Each destination (channel, thread or user DM) gets its own priority queue, drained by a
+    short-lived worker. A priority-aware gate caps concurrent sends so moderation and modmail
+    traffic is never stuck behind a flood of logs or auto-replies, and adjacent low-priority
+    sends to the same destination are merged into a single message.
+    """
+    def __init__(self, max_in_flight=OUTBOUND_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.gate_waiters = []  # Heap of (priority, seq, future) waiting for a send slot
+        self.queues = {}  # {destination_id: heap of (priority, seq, enqueued_at, destination, content, kwargs, future)}
+        self.workers = {}  # {destination_id: asyncio.Task}
+        self.seq = itertools.count()
+        self.stats = OrderedDict()  # {(destination_id, priority): stats}, least recently used first
+        self.total_sent = 0
+
+    def send(self, destination, content=None, *, priority=SEND_PRIORITY_LOG, **kwargs):
+        """
+        Queues a message for a destination and returns a future resolving to the sent message.
+        Send errors (e.g. discord.Forbidden) are raised when the future is awaited.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = destination.id
+        heapq.heappush(self.queues.setdefault(key, []), (priority, next(self.seq), time.monotonic(), destination, content, kwargs, future))
+        worker = self.workers.get(key)
+        if worker is None or worker.done():
+            self.workers[key] = loop.create_task(self._drain(key))
+        return future
+
+    def post(self, destination, content=None, *, priority=SEND_PRIORITY_AUTO_REPLY, **kwargs):
+        """
+        Fire-and-forget variant of send(); failures are logged instead of raised.
+        """
+        future = self.send(destination, content, priority=priority, **kwargs)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future):
+        if not future.cancelled() and future.exception():
+            logger.error("Queued send failed: %s—a comet knocked the message off course! ☄️", future.exception())
+
+    async def _drain(self, key):
+        queue = self.queues[key]
+        try:
+            while queue:
+                batch = [heapq.heappop(queue)]
+                priority, _, _, destination, content, kwargs, _ = batch[0]
+                if priority >= SEND_PRIORITY_LOG:
+                    content, kwargs = self._merge_adjacent(queue, batch)
+                await self._acquire(priority)
+                try:
+                    message = await destination.send(content, **kwargs)
+                except Exception as e:
+                    for item in batch:
+                        if not item[6].done():
+                            item[6].set_exception(e)
+                else:
+                    for item in batch:
+                        if not item[6].done():
+                            item[6].set_result(message)
+                finally:
+                    self._release()
+                self._record(key, batch)
+        finally:
+            if not queue:
+                self.queues.pop(key, None)
+                self.workers.pop(key, None)
+
+    def _merge_adjacent(self, queue, batch):
+        """
+        Pulls queued sends of the same priority that can share one message into the batch.
+        Plain-text sends are joined with newlines; embed-only sends are combined (up to 10 per message).
+        """
+        priority, _, _, _, content, kwargs, _ = batch[0]
+        if content is not None and not kwargs:
+            merged = content
+            while queue and queue[0][0] == priority and queue[0][4] is not None and not queue[0][5]:
+                candidate = f"{merged}\n{queue[0][4]}"
+                if len(candidate) > DISCORD_MESSAGE_LIMIT:
+                    break
+                merged = candidate
+                batch.append(heapq.heappop(queue))
+            return merged, kwargs
+        if content is None and set(kwargs) == {'embed'}:
+            embeds = [kwargs['embed']]
+            total_size = len(kwargs['embed'])
+            while queue and len(embeds) < 10 and queue[0][0] == priority and queue[0][4] is None and set(queue[0][5]) == {'embed'}:
+                next_embed = queue[0][5]['embed']
+                if total_size + len(next_embed) > DISCORD_EMBED_TOTAL_LIMIT:
+                    break
+                total_size += len(next_embed)
+                embeds.append(next_embed)
+                batch.append(heapq.heappop(queue))
+            if len(embeds) > 1:
+                return None, {'embeds': embeds}
+        return content, kwargs
+
+    async def _acquire(self, priority):
+        if self.in_flight < self.max_in_flight and not self.gate_waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.gate_waiters, (priority, next(self.seq), future))
+        try:
+            await future  # The slot is handed over directly by _release
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        while self.gate_waiters:
+            _, _, future = heapq.heappop(self.gate_waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _record(self, key, batch):
+        now = time.monotonic()
+        stats_key = (key, batch[0][0])
+        stats = self.stats.get(stats_key)
+        if stats is None:
+            # One-off destinations (e.g. auto-reply DMs) would otherwise keep a sample buffer forever
+            if len(self.stats) >= OUTBOUND_STATS_MAX_QUEUES:
+                self.stats.popitem(last=False)
+            stats = self.stats[stats_key] = {'sent': 0, 'merged': 0, 'latencies': deque(maxlen=OUTBOUND_LATENCY_SAMPLES)}
+        else:
+            self.stats.move_to_end(stats_key)
+        self.total_sent += 1
+        stats['sent'] += 1
+        stats['merged'] += len(batch) - 1
+        for item in batch:
+            stats['latencies'].append(now - item[2])
+
+    def metrics(self):
+        """
+        Returns per-queue latency metrics keyed by (destination_id, priority).
+        Only the OUTBOUND_STATS_MAX_QUEUES most recently active queues are reported.
+        """
+        report = {}
+        for (key, priority), stats in list(self.stats.items()):
+            samples = sorted(stats['latencies'])
+            if not samples:
+                continue
+            report[(key, priority)] = {
+                'pending': sum(1 for item in self.queues.get(key, ()) if item[0] == priority),
+                'sent': stats['sent'],
+                'merged': stats['merged'],
+                'p50_ms': samples[len(samples) // 2] * 1000,
+                'p99_ms': samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+                'max_ms': samples[-1] * 1000
+            }
+        return report
+
+outbound = OutboundDispatcher()
+
+# --- ID Allocator ---
+class IdAllocator:
+    """
+    Hands out unique, persistent IDs with a separate sequence per entity type ('case', 'ticket', 'suggestion').
+    IDs are reserved from SQLite in blocks so most allocations never touch storage. Reservations run in
+    a BEGIN IMMEDIATE transaction, which keeps blocks unique across multiple worker processes.
+    Unused IDs from a block are skipped after a restart, so sequences may have gaps but never repeat.
+    """
+    def __init__(self, db_path, block_size=ID_BLOCK_SIZE):
+        self.db_path = db_path
+        self.block_size = block_size
+        self.blocks = {}  # {entity: [next_id, end_exclusive]}
+        self.locks = defaultdict(asyncio.Lock)  # One refill at a time per entity
+
+    def _reserve_block(self, entity):
+        """
+        Atomically reserves the next block of IDs for an entity type. Runs in a worker thread.
+        """
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS id_sequences (entity TEXT PRIMARY KEY, next_id INTEGER NOT NULL)")
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT next_id FROM id_sequences WHERE entity = ?", (entity,)).fetchone()
+            start = row[0] if row else 1
+            conn.execute("INSERT OR REPLACE INTO id_sequences (entity, next_id) VALUES (?, ?)", (entity, start + self.block_size))
+            conn.execute("COMMIT")
+            return start, start + self.block_size
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    async def next_id(self, entity):
+        """
+        Returns the next unique ID for an entity type.
+        """
+        block = self.blocks.get(entity)
+        if block and block[0] < block[1]:
+            block[0] += 1
+            return block[0] - 1
+        async with self.locks[entity]:
+            # Another coroutine may have refilled the block while we waited
+            block = self.blocks.get(entity)
+            if not block or block[0] >= block[1]:
+                start, end = await asyncio.to_thread(self._reserve_block, entity)
+                block = self.blocks[entity] = [start, end]
+            block[0] += 1
+            return block[0] - 1
+
+    def _read_next_id(self, entity):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            row = conn.execute("SELECT next_id FROM id_sequences WHERE entity = ?", (entity,)).fetchone()
+            return row[0] if row else None
+        except sqlite3.OperationalError:  # No sequence table yet
+            return None
+        finally:
+            conn.close()
+
+    async def reserved_next_id(self, entity):
+        """
+        Returns the first ID not yet reserved for an entity type (every issued ID is below it), or None.
+        """
+        return await asyncio.to_thread(self._read_next_id, entity)
+
+id_allocator = IdAllocator(STATE_DB_PATH)
+
+# --- Case Log Store ---
+class CaseStore:
+    """
+    Persistent moderation case log backed by SQLite.
+    Secondary indexes on target, moderator, action and creation time keep filtered queries fast
+    over hundreds of thousands of cases, and results are keyset-paginated by case ID (newest first).
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = None
+        self.lock = threading.Lock()  # The connection is shared across worker threads
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cases (
+                    case_id INTEGER PRIMARY KEY,
+                    action TEXT NOT NULL,
+                    target_id INTEGER,
+                    moderator_id INTEGER,
+                    reason TEXT,
+                    details TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_cases_target ON cases (target_id, case_id);
+                CREATE INDEX IF NOT EXISTS idx_cases_moderator ON cases (moderator_id, case_id);
+                CREATE INDEX IF NOT EXISTS idx_cases_action ON cases (action COLLATE NOCASE, case_id);
+                CREATE INDEX IF NOT EXISTS idx_cases_created ON cases (created_at);
+            """)
+        return self.conn
+
+    def _insert(self, record):
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO cases (case_id, action, target_id, moderator_id, reason, details, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (record['case_id'], record['action'], record['target'], record['moderator'], record['reason'], record['details'], record['created_at'])
+                )
+
+    def _get(self, case_id):
+        with self.lock:
+            row = self._connect().execute("SELECT * FROM cases WHERE case_id = ?", (case_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _query(self, target_id, moderator_id, action, since, until, before_case_id, limit):
+        clauses, params = [], []
+        if target_id is not None:
+            clauses.append("target_id = ?")
+            params.append(target_id)
+        if moderator_id is not None:
+            clauses.append("moderator_id = ?")
+            params.append(moderator_id)
+        if action:
+            clauses.append("action = ? COLLATE NOCASE")
+            params.append(action)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if before_case_id is not None:
+            clauses.append("case_id < ?")
+            params.append(before_case_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        with self.lock:
+            rows = self._connect().execute(f"SELECT * FROM cases {where} ORDER BY case_id DESC LIMIT ?", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def _max_case_id(self):
+        with self.lock:
+            return self._connect().execute("SELECT COALESCE(MAX(case_id), 0) FROM cases").fetchone()[0]
+
+    def _after(self, case_id, action):
+        with self.lock:
+            rows = self._connect().execute(
+                "SELECT * FROM cases WHERE case_id > ? AND action = ? COLLATE NOCASE ORDER BY case_id",
+                (case_id, action)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    async def add(self, record):
+        await asyncio.to_thread(self._insert, record)
+
+    async def max_case_id(self):
+        return await asyncio.to_thread(self._max_case_id)
+
+    async def after(self, case_id, action):
+        """
+        Returns cases of one action type recorded after `case_id`, oldest first.
+        """
+        return await asyncio.to_thread(self._after, case_id, action)
+
+    async def get(self, case_id):
+        return await asyncio.to_thread(self._get, case_id)
+
+    async def query(self, target_id=None, moderator_id=None, action=None, since=None, until=None, before_case_id=None, limit=CASES_PER_PAGE):
+        """
+        Returns up to `limit` cases matching the filters, newest first, older than `before_case_id`.
+        `since`/`until` are UNIX timestamps.
+        """
+        return await asyncio.to_thread(self._query, target_id, moderator_id, action, since, until, before_case_id, limit)
+
+case_store = CaseStore(STATE_DB_PATH)
+
+async def record_case(action, target, moderator, reason, details=None):
+    """
+    Allocates a case ID and stores a complete case record. Returns the case ID.
+    """
+    case_id = await id_allocator.next_id('case')
+    await case_store.add({
+        'case_id': case_id,
+        'action': action,
+        'target': target.id if target else None,
+        'moderator': moderator.id if moderator else None,
+        'reason': reason,
+        'details': details,
+        'created_at': time.time()
+    })
+    return case_id
+
+def add_warning(user_id, case_id, reason, moderator_id, timestamp=None):
+    """
+    Stores a warning record and bumps the user's infraction count. Returns the new infraction count.
+    """
+    record = WarningRecord(case_id, sys.intern(reason), moderator_id, int(timestamp if timestamp is not None else time.time()))
+    warnings.setdefault(user_id, []).append(record)
+    return infractions.add(user_id)
+
+# --- Streaming Exports ---
+EXPORT_FIELDS = {
+    'transcript': ['message_id', 'created_at', 'author_id', 'author_name', 'content', 'embeds', 'attachments'],
+    'cases': ['case_id', 'action', 'target_id', 'moderator_id', 'reason', 'details', 'created_at'],
+    'warnings': ['user_id', 'case_id', 'reason', 'moderator', 'timestamp'],
+    'reputation': ['user_id', 'points']
+}
+export_tasks = set()  # Strong references to running export jobs
+
+class ExportWriter:
+    """
+    Streams rows to a gzip-compressed JSONL or CSV file.
+    Rows are buffered in small fixed-size batches. Each batch is encoded and compressed in a worker
+    process as its own gzip member (members concatenate into one valid file) and appended from a
+    worker thread, so memory stays constant and the event loop never does the CPU work.
+    """
+    def __init__(self, path, fmt, fieldnames):
+        self.path = path
+        self.fmt = fmt
+        self.fieldnames = fieldnames
+        self.buffer = []
+        self.file = None
+        self.header_pending = fmt == 'csv'
+
+    def _append(self, chunk):
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.file = open(self.path, 'wb')
+        self.file.write(chunk)
+
+    def _close(self):
+        if self.file is None:
+            self._append(gzip.compress(b''))  # No rows and no header: still a valid, empty gzip file
+        self.file.close()
+
+    def _abort(self):
+        try:
+            if self.file is not None:
+                self.file.close()
+        finally:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    async def _flush(self):
+        batch, self.buffer = self.buffer, []
+        if not batch and not self.header_pending:
+            return
+        chunk = await job_runner.run(encode_export_batch, self.fmt, self.fieldnames, batch, self.header_pending, priority=JOB_PRIORITY_LOW, name='export batch')
+        self.header_pending = False
+        if isinstance(chunk, JobOutput):
+            chunk = await asyncio.to_thread(chunk.read)
+        await asyncio.to_thread(self._append, chunk)
+
+    async def write(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= EXPORT_BATCH_SIZE:
+            await self._flush()
+
+    async def close(self):
+        await self._flush()
+        await asyncio.to_thread(self._close)
+
+    async def abort(self):
+        """
+        Closes the file and deletes the partial export.
+        """
+        self.buffer = []
+        await asyncio.to_thread(self._abort)
+
+def prune_exports(max_age=EXPORT_RETENTION_SECONDS):
+    """
+    Deletes export files older than max_age from EXPORT_DIR. Runs in a worker thread.
+    """
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(EXPORT_DIR))
+    except FileNotFoundError:
+        return 0
+    removed = 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+async def iter_thread_messages(thread):
+    """
+    Yields transcript rows for a thread, oldest first, one history page at a time.
+    """
+    async for msg in thread.history(limit=None, oldest_first=True):
+        yield {
+            'message_id': msg.id,
+            'created_at': msg.created_at.isoformat(),
+            'author_id': msg.author.id,
+            'author_name': str(msg.author),
+            'content': msg.content,
+            # Modmail relays are posted as embeds, so keep their text in the transcript
+            'embeds': " | ".join(f"{embed.title or ''}: {embed.description or ''}" for embed in msg.embeds),
+            'attachments': " ".join(attachment.url for attachment in msg.attachments)
+        }
+
+async def iter_cases():
+    """
+    Yields every stored case, newest first, paging through the case store by keyset.
+    """
+    before_case_id = None
+    while True:
+        page = await case_store.query(before_case_id=before_case_id, limit=EXPORT_BATCH_SIZE)
+        if not page:
+            return
+        for case in page:
+            yield case
+        before_case_id = page[-1]['case_id']
+
+async def iter_warnings():
+    for user_id, user_warnings in list(warnings.items()):
+        for warn_entry in list(user_warnings):
+            yield {
+                'user_id': user_id,
+                **warn_entry._asdict(),
+                'timestamp': datetime.datetime.fromtimestamp(warn_entry.timestamp, datetime.timezone.utc).isoformat()
+            }
+
+async def iter_reputation():
+    for user_id, points in list(reputation.items()):
+        yield {'user_id': user_id, 'points': points}
+
+async def run_export(job_id, kind, fmt, rows, destination, status_message=None):
+    """
+    Streams an export to disk, reports progress on the status message, then attaches the file
+    to the destination and deletes it. Files too large to upload stay on disk until
+    EXPORT_RETENTION_SECONDS have passed; partial files from failed exports are removed.
+    """
+    path = os.path.join(EXPORT_DIR, f"{kind}-{job_id}.{fmt}.gz")
+    writer = ExportWriter(path, fmt, EXPORT_FIELDS[kind])
+    row_count = 0
+    last_progress = time.monotonic()
+    try:
+        pruned = await asyncio.to_thread(prune_exports)
+        if pruned:
+            logger.info("Pruned %s expired export files from %s", pruned, EXPORT_DIR)
+        async for row in rows:
+            await writer.write(row)
+            row_count += 1
+            if status_message and time.monotonic() - last_progress >= EXPORT_PROGRESS_INTERVAL:
+                last_progress = time.monotonic()
+                await status_message.edit(content=f"📦 Export #{job_id} ({kind}) in progress... {row_count} rows streamed so far! 🚀")
+        await writer.close()
+
+        size = os.path.getsize(path)
+        if size <= EXPORT_ATTACH_LIMIT:
+            await outbound.send(destination, f"📦 Export #{job_id} ({kind}, {row_count} rows) is ready! 🌟", file=discord.File(path), priority=SEND_PRIORITY_LOG)
+            await asyncio.to_thread(os.remove, path)  # The upload is the copy that matters now
+        else:
+            await outbound.send(destination, f"📦 Export #{job_id} ({kind}, {row_count} rows) is too large to upload and was saved locally at `{path}`! 💾", priority=SEND_PRIORITY_LOG)
+        if status_message:
+            await status_message.edit(content=f"✅ Export #{job_id} ({kind}) finished with {row_count} rows! 📦")
+        logger.info("Export #%s (%s) finished: %s rows, %s bytes at %s", job_id, kind, row_count, size, path)
+    except Exception as e:
+        logger.error("Error in export #%s (%s): %s", job_id, kind, e)
+        await writer.abort()
+        if status_message:
+            await status_message.edit(content=f"⚠️ Export #{job_id} ({kind}) failed: {str(e)} 🚖")
+        await log_action("Error in export", None, None, f"Export #{job_id} ({kind}): {str(e)}")
+
+async def start_export(kind, fmt, rows, destination, status_message=None):
+    """
+    Starts an export as a background job and returns its job ID.
+    """
+    job_id = await id_allocator.next_id('export')
+    task = asyncio.create_task(run_export(job_id, kind, fmt, rows, destination, status_message))
+    export_tasks.add(task)
+    task.add_done_callback(export_tasks.discard)
+    return job_id
+
+# --- AI Response Cache ---
+class AIResponseCache:
+    """
+    LRU cache of AI replies keyed by normalized prompt, with a TTL and a size cap.
+    Concurrent identical prompts share a single upstream call (single-flight), and entries
+    are persisted to SQLite so the cache survives restarts.
+    """
+    def __init__(self, db_path, max_entries=AI_CACHE_MAX_ENTRIES, ttl=AI_CACHE_TTL_SECONDS):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # {prompt_key: (reply, created_at)}, least recently used first
+        self.inflight = {}  # {prompt_key: Future} for upstream calls in progress
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loaded = False
+
+    @staticmethod
+    def normalize(prompt):
+        """
+        Normalizes a prompt so trivial differences (case, spacing, trailing punctuation) share a cache entry.
+        """
+        return re.sub(r'\s+', ' ', prompt.lower()).strip(" ?!.,~")
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS ai_cache (prompt_key TEXT PRIMARY KEY, reply TEXT NOT NULL, created_at REAL NOT NULL)")
+        return conn
+
+    def _load_rows(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM ai_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            return conn.execute("SELECT prompt_key, reply, created_at FROM ai_cache ORDER BY created_at DESC LIMIT ?", (self.max_entries,)).fetchall()
+        finally:
+            conn.close()
+
+    def _persist(self, key, reply, created_at):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO ai_cache (prompt_key, reply, created_at) VALUES (?, ?, ?)", (key, reply, created_at))
+                # Keep the table within the same cap as the in-memory cache
+                conn.execute("DELETE FROM ai_cache WHERE prompt_key NOT IN (SELECT prompt_key FROM ai_cache ORDER BY created_at DESC LIMIT ?)", (self.max_entries,))
+        finally:
+            conn.close()
+
+    async def load(self):
+        """
+        Loads persisted, unexpired entries. Safe to call more than once.
+        """
+        if self.loaded:
+            return
+        rows = await asyncio.to_thread(self._load_rows)
+        for key, reply, created_at in reversed(rows):
+            self.entries[key] = (reply, created_at)
+        self.loaded = True
+        logger.info("Loaded %s cached AI replies from the cosmic archives! 🧠", len(rows))
+
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        reply, created_at = entry
+        if time.time() - created_at >= self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return reply
+
+    def _store(self, key, reply, created_at):
+        self.entries[key] = (reply, created_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_or_create(self, prompt, create_reply):
+        """
+        Returns a cached reply for the prompt, or awaits create_reply() once for all concurrent callers.
+        """
+        key = self.normalize(prompt)
+        reply = self._lookup(key)
+        if reply is not None:
+            self.hits += 1
+            return reply
+        inflight = self.inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            reply = await create_reply()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else was waiting
+            raise
+        finally:
+            self.inflight.pop(key, None)
+        future.set_result(reply)
+        created_at = time.time()
+        self._store(key, reply, created_at)
+        try:
+            await asyncio.to_thread(self._persist, key, reply, created_at)
+        except Exception as e:
+            logger.warning("Could not persist AI cache entry: %s", e)
+        return reply
+
+    def metrics(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
+
+ai_cache = AIResponseCache(STATE_DB_PATH)
+
+# --- AI Conversation Memory ---
+class ChannelContextStore:
+    """
+    Rolling per-channel conversation memory for AI replies.
+    Each channel keeps a fixed-size ring buffer of (role, content, approx_tokens) turns; channels are
+    kept in least-recently-active order so idle ones are evicted cheaply and the total stays bounded.
+    """
+    def __init__(self, max_channels=AI_CONTEXT_MAX_CHANNELS, max_turns=AI_CONTEXT_MAX_TURNS, idle_seconds=AI_CONTEXT_IDLE_SECONDS):
+        self.max_channels = max_channels
+        self.max_turns = max_turns
+        self.idle_seconds = idle_seconds
+        self.channels = OrderedDict()  # {channel_id: [last_active_monotonic, deque of (role, content, tokens)]}
+
+    @staticmethod
+    def estimate_tokens(text):
+        """
+        Cheap token estimate (~4 characters per token plus per-message overhead).
+        """
+        return len(text) // 4 + 4
+
+    def evict_idle(self):
+        now = time.monotonic()
+        while self.channels:
+            channel_id, (last_active, _) = next(iter(self.channels.items()))
+            if now - last_active < self.idle_seconds and len(self.channels) <= self.max_channels:
+                break
+            del self.channels[channel_id]
+
+    def record(self, channel_id, role, content):
+        """
+        Appends a turn to a channel's history, truncating very long messages.
+        """
+        content = content[:AI_CONTEXT_MAX_CHARS]
+        entry = self.channels.get(channel_id)
+        if entry is None:
+            entry = self.channels[channel_id] = [0.0, deque(maxlen=self.max_turns)]
+        entry[0] = time.monotonic()
+        entry[1].append((role, content, self.estimate_tokens(content)))
+        self.channels.move_to_end(channel_id)
+        self.evict_idle()
+
+    def history(self, channel_id, token_budget=AI_CONTEXT_TOKEN_BUDGET):
+        """
+        Returns the most recent turns for a channel that fit in the token budget, oldest first.
+        """
+        entry = self.channels.get(channel_id)
+        if entry is None:
+            return []
+        if time.monotonic() - entry[0] >= self.idle_seconds:
+            del self.channels[channel_id]
+            return []
+        selected = []
+        used = 0
+        for role, content, tokens in reversed(entry[1]):
+            if used + tokens > token_budget:
+                break
+            used += tokens
+            selected.append({"role": role, "content": content})
+        selected.reverse()
+        return selected
+
+ai_context = ChannelContextStore()
+
+# --- AI Reply Streaming ---
+ai_reply_tasks = {}  # {prompt_message_id: Task} for replies that are cancelled if the prompt is deleted
+ai_first_token_samples = deque(maxlen=AI_STREAM_METRIC_SAMPLES)  # Seconds from prompt to first visible token
+
+async def request_ai_completion(messages):
+    """
+    Requests a complete (non-streamed) AI reply.
+    """
+    # The OpenAI client is synchronous, so keep it off the event loop
+    response = await asyncio.to_thread(
+        openai.ChatCompletion.create,
+        model="gpt-3.5-turbo",
+        messages=messages,
+        max_tokens=150,
+        temperature=0.7
+    )
+    return response.choices[0].message.content.strip()
+
+async def stream_ai_reply(messages, placeholder, started_at):
+    """
+    Streams an AI reply into the placeholder message, coalescing tokens into at most one edit
+    every AI_STREAM_EDIT_INTERVAL seconds. Falls back to a regular completion if streaming fails
+    before the first token arrives. Returns the full reply text.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        # Runs in a worker thread and hands chunks back to the event loop
+        try:
+            for chunk in openai.ChatCompletion.create(model="gpt-3.5-turbo", messages=messages, max_tokens=150, temperature=0.7, stream=True):
+                if stop.is_set():
+                    break
+                token = chunk['choices'][0]['delta'].get('content')
+                if token:
+                    loop.call_soon_threadsafe(queue.put_nowait, token)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    producer = asyncio.create_task(asyncio.to_thread(produce))
+    parts = []
+    shown = ""
+    last_edit = 0.0
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                if parts:
+                    raise item
+                logger.warning("AI streaming failed before the first token, falling back: %s", item)
+                reply = await request_ai_completion(messages)
+                ai_first_token_samples.append(time.monotonic() - started_at)
+                await placeholder.edit(content=reply)
+                return reply
+            parts.append(item)
+            now = time.monotonic()
+            if not shown:
+                ai_first_token_samples.append(now - started_at)
+            if not shown or now - last_edit >= AI_STREAM_EDIT_INTERVAL:
+                shown = "".join(parts)
+                last_edit = now
+                await placeholder.edit(content=shown[:DISCORD_MESSAGE_LIMIT])
+    finally:
+        # Stops the worker thread early if we were cancelled (e.g. the prompt was deleted)
+        stop.set()
+        producer.cancel()
+
+    reply = "".join(parts).strip()
+    if reply != shown:
+        await placeholder.edit(content=reply[:DISCORD_MESSAGE_LIMIT])
+    return reply
+
+# --- Drive Library Sync ---
+class DriveLibrary:
+    """
+    Local index of a Google Drive folder tree, kept current from the Drive changes feed.
+    The tree is listed once; afterwards only changes since the saved page token are fetched,
+    so no folder is ever re-listed. The index lives in SQLite and is mirrored in memory for lookups.
+    The Drive service is injectable so the sync logic can run against a local stand-in.
+    """
+    FOLDER_MIME = 'application/vnd.google-apps.folder'
+    FILE_FIELDS = 'id, name, mimeType, parents, webViewLink, trashed'
+
+    def __init__(self, db_path, root_folder_id, service_factory=None):
+        self.db_path = db_path
+        self.root_folder_id = root_folder_id
+        self.service_factory = service_factory or self._build_service
+        self.service = None
+        self.conn = None
+        self.lock = threading.Lock()
+        self.files = {}  # {file_id: {'name', 'mime_type', 'parent_id', 'web_link'}}
+        self.page_token = None
+        self.last_sync = None
+
+    @staticmethod
+    def _build_service():
+        credentials = service_account.Credentials.from_service_account_file(GOOGLE_SERVICE_ACCOUNT_FILE, scopes=['https://www.googleapis.com/auth/drive.readonly'])
+        return build_drive_service('drive', 'v3', credentials=credentials, cache_discovery=False)
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS drive_files (
+                    file_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    mime_type TEXT NOT NULL,
+                    parent_id TEXT,
+                    web_link TEXT
+                );
+                CREATE TABLE IF NOT EXISTS drive_state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """)
+        return self.conn
+
+    def _load(self):
+        with self.lock:
+            conn = self._connect()
+            rows = conn.execute("SELECT file_id, name, mime_type, parent_id, web_link FROM drive_files").fetchall()
+            token = conn.execute("SELECT value FROM drive_state WHERE key = 'page_token'").fetchone()
+            root = conn.execute("SELECT value FROM drive_state WHERE key = 'root_folder_id'").fetchone()
+        if root and root[0] != self.root_folder_id:
+            return {}, None  # Configured folder changed; start over with a full listing
+        files = {file_id: {'name': name, 'mime_type': mime_type, 'parent_id': parent_id, 'web_link': web_link} for file_id, name, mime_type, parent_id, web_link in rows}
+        return files, token[0] if token else None
+
+    def _save(self, upserts, removed, page_token, replace_all=False):
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                if replace_all:
+                    conn.execute("DELETE FROM drive_files")
+                conn.executemany("DELETE FROM drive_files WHERE file_id = ?", [(file_id,) for file_id in removed])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO drive_files (file_id, name, mime_type, parent_id, web_link) VALUES (?, ?, ?, ?, ?)",
+                    [(file_id, entry['name'], entry['mime_type'], entry['parent_id'], entry['web_link']) for file_id, entry in upserts.items()]
+                )
+                conn.execute("INSERT OR REPLACE INTO drive_state (key, value) VALUES ('page_token', ?)", (page_token,))
+                conn.execute("INSERT OR REPLACE INTO drive_state (key, value) VALUES ('root_folder_id', ?)", (self.root_folder_id,))
+
+    def _entry(self, drive_file, parent_id):
+        return {'name': drive_file['name'], 'mime_type': drive_file['mimeType'], 'parent_id': parent_id, 'web_link': drive_file.get('webViewLink')}
+
+    def _list_tree(self, files, children, folders):
+        """
+        Lists every file below the given folders into the index and returns the new entries by ID.
+        """
+        listed, folders = {}, list(folders)
+        while folders:
+            folder_id = folders.pop()
+            request_token = None
+            while True:
+                response = self.service.files().list(
+                    q=f"'{folder_id}' in parents and trashed = false",
+                    fields=f"nextPageToken, files({self.FILE_FIELDS})",
+                    pageSize=1000,
+                    pageToken=request_token
+                ).execute()
+                for drive_file in response.get('files', []):
+                    listed[drive_file['id']] = self._index(files, children, drive_file['id'], self._entry(drive_file, folder_id))
+                    if drive_file['mimeType'] == self.FOLDER_MIME:
+                        folders.append(drive_file['id'])
+                request_token = response.get('nextPageToken')
+                if not request_token:
+                    break
+        return listed
+
+    def _full_listing(self):
+        """
+        Lists the folder tree once. The start token is taken first so nothing changed mid-listing is missed.
+        """
+        start_token = self.service.changes().getStartPageToken().execute()['startPageToken']
+        files = {}
+        self._list_tree(files, defaultdict(set), [self.root_folder_id])
+        return files, start_token
+
+    @staticmethod
+    def children_index(files):
+        """
+        Builds {parent_id: set of child IDs} for an index dict.
+        """
+        children = defaultdict(set)
+        for file_id, entry in files.items():
+            children[entry['parent_id']].add(file_id)
+        return children
+
+    @staticmethod
+    def _unlink(children, parent_id, file_id):
+        siblings = children.get(parent_id)
+        if siblings is not None:
+            siblings.discard(file_id)
+            if not siblings:
+                del children[parent_id]
+
+    def _index(self, files, children, file_id, entry):
+        previous = files.get(file_id)
+        if previous is not None:
+            self._unlink(children, previous['parent_id'], file_id)
+        files[file_id] = entry
+        children[entry['parent_id']].add(file_id)
+        return entry
+
+    def _is_indexed_folder(self, files, folder_id):
+        return folder_id == self.root_folder_id or (folder_id in files and files[folder_id]['mime_type'] == self.FOLDER_MIME)
+
+    def _remove_subtree(self, files, children, file_id, removed):
+        stack = [file_id]
+        while stack:
+            doomed_id = stack.pop()
+            entry = files.pop(doomed_id, None)
+            if entry is None:
+                continue
+            self._unlink(children, entry['parent_id'], doomed_id)
+            stack.extend(children.pop(doomed_id, ()))
+            removed.add(doomed_id)
+
+    def apply_changes(self, files, changes, children=None):
+        """
+        Applies a batch of Drive change records to an index dict in place.
+        Returns (upserted entries by ID, removed IDs). Files whose parent isn't indexed are dropped,
+        and children created in the same batch as their folder are resolved regardless of order.
+        Pass the children_index() of files to reuse it across batches; it is kept in step.
+        Folders that newly joined the tree (moved in or restored from the trash) are listed
+        in full, since the feed doesn't repeat changes for what they already contain.
+        """
+        if children is None:
+            children = self.children_index(files)
+        upserts, removed, pending = {}, set(), {}
+        for change in changes:
+            file_id = change['fileId']
+            drive_file = change.get('file')
+            pending.pop(file_id, None)
+            if change.get('removed') or not drive_file or drive_file.get('trashed'):
+                self._remove_subtree(files, children, file_id, removed)
+            else:
+                pending[file_id] = drive_file
+        arriving_folders = [file_id for file_id, drive_file in pending.items() if drive_file['mimeType'] == self.FOLDER_MIME and file_id not in files]
+        progress = True
+        while pending and progress:
+            progress = False
+            for file_id, drive_file in list(pending.items()):
+                parent_id = next((parent for parent in drive_file.get('parents', []) if self._is_indexed_folder(files, parent)), None)
+                if parent_id:
+                    upserts[file_id] = self._index(files, children, file_id, self._entry(drive_file, parent_id))
+                    removed.discard(file_id)
+                    del pending[file_id]
+                    progress = True
+        for file_id in pending:
+            # Moved out of the library tree
+            self._remove_subtree(files, children, file_id, removed)
+        arriving_folders = [file_id for file_id in arriving_folders if file_id in files]
+        if arriving_folders:
+            for file_id, entry in self._list_tree(files, children, arriving_folders).items():
+                upserts[file_id] = entry
+                removed.discard(file_id)
+        for file_id in removed:
+            upserts.pop(file_id, None)
+        return upserts, removed
+
+    def _sync(self):
+        if self.service is None:
+            self.service = self.service_factory()
+        if self.page_token is None:
+            files, page_token = self._full_listing()
+            self._save(files, (), page_token, replace_all=True)
+            return files, page_token, len(files)
+        files = dict(self.files)
+        children = self.children_index(files)
+        page_token, changed = self.page_token, 0
+        while True:
+            response = self.service.changes().list(
+                pageToken=page_token,
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({self.FILE_FIELDS}))",
+                pageSize=1000,
+                includeRemoved=True,
+                spaces='drive'
+            ).execute()
+            upserts, removed = self.apply_changes(files, response.get('changes', []), children)
+            changed += len(upserts) + len(removed)
+            page_token = response.get('nextPageToken') or response['newStartPageToken']
+            self._save(upserts, removed, page_token)
+            if 'newStartPageToken' in response:
+                break
+        return files, page_token, changed
+
+    async def load(self):
+        self.files, self.page_token = await asyncio.to_thread(self._load)
+
+    async def sync(self):
+        """
+        Runs one full listing (first time) or incremental sync. Returns the number of entries changed.
+        """
+        files, self.page_token, changed = await asyncio.to_thread(self._sync)
+        self.files = files  # Swapped in whole so readers never see a half-applied batch
+        self.last_sync = time.time()
+        return changed
+
+    def resolve(self, file_link):
+        """
+        Returns the indexed entry for a Drive URL or file ID, or None.
+        """
+        match = re.search(r'(?:/d/|[?&]id=)([\w-]+)', file_link)
+        return self.files.get(match.group(1) if match else file_link)
+
+    def find_by_name(self, name):
+        """
+        Returns (file_id, entry) for the indexed file whose name matches exactly (case-insensitive), or None.
+        """
+        name_lower = name.lower()
+        for file_id, entry in self.files.items():
+            if entry['mime_type'] != self.FOLDER_MIME and entry['name'].lower() == name_lower:
+                return file_id, entry
+        return None
+
+    def search(self, *terms, limit=5):
+        """
+        Returns up to `limit` indexed files whose names contain every term (case-insensitive).
+        """
+        terms = [term.lower() for term in terms]
+        results = []
+        for entry in self.files.values():
+            if entry['mime_type'] != self.FOLDER_MIME and all(term in entry['name'].lower() for term in terms):
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+        return results
+
+drive_library = DriveLibrary(STATE_DB_PATH, GOOGLE_DRIVE_FOLDER_ID) if GOOGLE_DRIVE_FOLDER_ID and build_drive_service else None
+
+# --- Link Health Checks ---
+class LinkHealthChecker:
+    """
+    Periodically validates stored links through one pooled aiohttp session.
+    The connector caps total and per-host connections, a fixed pool of workers drains the due URLs,
+    and results are cached with a TTL and revalidated with ETag/Last-Modified when they expire.
+    """
+    def __init__(self):
+        self.session = None
+        self.results = {}  # {url: {'ok', 'status', 'checked_at', 'failures', 'etag', 'last_modified'}}
+        self.reported_broken = set()  # Broken URLs already included in a staff digest
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=LINK_CHECK_MAX_CONNECTIONS, limit_per_host=LINK_CHECK_PER_HOST, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=LINK_CHECK_TIMEOUT_SECONDS),
+                headers={'User-Agent': 'ResourceRepositoryBot link checker'}
+            )
+        return self.session
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+
+    def is_due(self, url, now):
+        result = self.results.get(url)
+        if not result:
+            return True
+        ttl = LINK_CHECK_OK_TTL_SECONDS if result['ok'] else LINK_CHECK_BROKEN_TTL_SECONDS
+        return now - result['checked_at'] >= ttl
+
+    def is_broken(self, url):
+        result = self.results.get(url)
+        return bool(result) and not result['ok'] and result['failures'] >= LINK_CHECK_FAILURES_BEFORE_BROKEN
+
+    async def _request(self, method, url, headers):
+        async with self._session().request(method, url, headers=headers, allow_redirects=True) as resp:
+            return resp.status, resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+
+    async def check(self, url):
+        """
+        Checks one URL with a conditional HEAD, falling back to a one-byte ranged GET
+        for servers that don't support HEAD. Updates and returns the cached result.
+        """
+        previous = self.results.get(url) or {}
+        headers = {}
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+        try:
+            status, etag, last_modified = await self._request('HEAD', url, headers)
+            if status in (403, 405, 501):
+                status, etag, last_modified = await self._request('GET', url, {**headers, 'Range': 'bytes=0-0'})
+        except Exception as e:  # Includes malformed stored links; one bad URL must not sink the whole sweep
+            status, etag, last_modified = f"{type(e).__name__}", None, None
+        if status == 304:
+            ok = True
+            etag, last_modified = previous.get('etag'), previous.get('last_modified')
+        else:
+            ok = isinstance(status, int) and status < 400
+        failures = 0 if ok else previous.get('failures', 0) + 1
+        if isinstance(status, int) and status in (404, 410):
+            failures = max(failures, LINK_CHECK_FAILURES_BEFORE_BROKEN)  # Gone is gone; don't wait for repeats
+        result = self.results[url] = {
+            'ok': ok, 'status': previous.get('status') if status == 304 else status, 'checked_at': time.time(),
+            'failures': failures, 'etag': etag, 'last_modified': last_modified
+        }
+        return result
+
+    async def run_cycle(self, urls):
+        """
+        Checks every due URL with a bounded worker pool. Returns the links newly found broken.
+        """
+        now = time.time()
+        due = asyncio.Queue()
+        for url in dict.fromkeys(urls):
+            if self.is_due(url, now):
+                due.put_nowait(url)
+
+        async def worker():
+            while not due.empty():
+                await self.check(due.get_nowait())
+
+        await asyncio.gather(*(worker() for _ in range(min(LINK_CHECK_WORKERS, due.qsize()))))
+        current = set(urls)
+        self.results = {url: result for url, result in self.results.items() if url in current}
+        broken = {url for url in current if self.is_broken(url)}
+        newly_broken = broken - self.reported_broken
+        self.reported_broken = broken
+        return newly_broken
+
+link_health = LinkHealthChecker()
+
+# --- Autocomplete Indexes ---
+class PrefixIndex:
+    """
+    Case-insensitive prefix trie for slash-command autocomplete.
+    Entries are added and removed incrementally; completing a prefix walks only the prefix path
+    and then the nearest matches breadth-first, so shorter (closer) keys come first.
+    """
+    _ENTRIES = object()  # Node key holding {value: label} for keys ending at that node
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, key, value, label=None):
+        node = self.root
+        for char in key.lower():
+            node = node.setdefault(char, {})
+        node.setdefault(self._ENTRIES, {})[value] = label if label is not None else str(value)
+
+    def remove(self, key, value):
+        path, node = [], self.root
+        for char in key.lower():
+            if char not in node:
+                return
+            path.append((node, char))
+            node = node[char]
+        entries = node.get(self._ENTRIES)
+        if not entries or value not in entries:
+            return
+        del entries[value]
+        if not entries:
+            del node[self._ENTRIES]
+        # Prune branches that no longer lead anywhere
+        for parent, char in reversed(path):
+            if parent[char]:
+                break
+            del parent[char]
+
+    def complete(self, prefix, limit=AUTOCOMPLETE_MAX_CHOICES):
+        """
+        Returns up to `limit` (value, label) pairs whose key starts with the prefix.
+        """
+        node = self.root
+        for char in prefix.lower():
+            node = node.get(char)
+            if node is None:
+                return []
+        results, seen, frontier = [], set(), deque([node])
+        while frontier and len(results) < limit:
+            node = frontier.popleft()
+            for key, child in node.items():
+                if key is self._ENTRIES:
+                    for value, label in child.items():
+                        if value not in seen and len(results) < limit:
+                            seen.add(value)
+                            results.append((value, label))
+                else:
+                    frontier.append(child)
+        return results
+
+link_trigger_index = PrefixIndex()
+ticket_indexes = {'open': PrefixIndex(), 'closed': PrefixIndex()}
+banned_user_index = PrefixIndex()
+command_name_index = PrefixIndex()
+
+def index_ticket(ticket_id, ticket):
+    """
+    Files a modmail ticket under its current status for autocomplete.
+    """
+    for index in ticket_indexes.values():
+        index.remove(ticket_id, ticket_id)
+    ticket_indexes[ticket['status']].add(ticket_id, ticket_id, f"#{ticket_id} (user {ticket['user_id']})")
+
+def index_banned_user(user):
+    banned_user_index.add(user.name, str(user.id), f"{user.name} ({user.id})")
+    banned_user_index.add(str(user.id), str(user.id), f"{user.name} ({user.id})")
+
+def unindex_banned_user(user):
+    banned_user_index.remove(user.name, str(user.id))
+    banned_user_index.remove(str(user.id), str(user.id))
+
+def build_command_name_index():
+    for cmd in bot.commands:
+        if not cmd.hidden:
+            for name in (cmd.name, *cmd.aliases):
+                command_name_index.add(name, cmd.name, f".{cmd.name}" if name == cmd.name else f".{name} → .{cmd.name}")
+
+async def load_banned_user_index(guild):
+    """
+    Indexes the guild's ban list once; ban and unban events keep it current afterwards.
+    """
+    async for entry in guild.bans(limit=None):
+        index_banned_user(entry.user)
+
+async def load_banned_user_indexes():
+    """
+    Started from setup_hook: indexes every guild's ban list once the guild cache is ready.
+    """
+    await bot.wait_until_ready()
+    for guild in bot.guilds:
+        if guild.me.guild_permissions.ban_members:
+            try:
+                await load_banned_user_index(guild)
+            except discord.HTTPException as e:
+                logger.warning("Could not load the ban list of %s for autocomplete: %s", guild.name, e)
+
+def autocomplete_choices(index, current):
+    return [app_commands.Choice(name=label[:100], value=value) for value, label in index.complete(current)]
+
+# --- Worker Process Jobs ---
+class Job:
+    """
+    Handle for a submitted job. Await `future` for the result; cancel it to drop the job.
+    """
+    def __init__(self, job_id, name, priority, func, args, future):
+        self.job_id = job_id
+        self.name = name
+        self.priority = priority
+        self.func = func
+        self.args = args
+        self.future = future
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+
+    def cancel(self):
+        # Queued jobs are skipped when dequeued; a running job finishes in its worker and its result is discarded
+        return self.future.cancel()
+
+class JobRunner:
+    """
+    Priority-ordered process pool for CPU-heavy work, so it never competes with the gateway heartbeat.
+    At most one job per worker is handed to the pool; the rest wait in a heap so higher priorities go first.
+    A broken pool (e.g. a worker was killed) is replaced on the next dispatch.
+    """
+    def __init__(self, workers=JOB_WORKERS):
+        self.workers = workers
+        self.pool = None
+        self.heap = []
+        self.sequence = itertools.count()
+        self.running = {}  # {job_id: Job}
+        self.stats = {'completed': 0, 'failed': 0, 'cancelled': 0, 'pool_restarts': 0}
+        self.run_samples = deque(maxlen=JOB_LATENCY_SAMPLES)
+        self.wait_samples = deque(maxlen=JOB_LATENCY_SAMPLES)
+
+    def _pool(self):
+        if self.pool is None:
+            os.makedirs(JOB_RESULT_DIR, exist_ok=True)
+            # Spawned (not forked) workers don't inherit the event loop, sockets or logging threads
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self.pool
+
+    def submit(self, func, *args, priority=JOB_PRIORITY_NORMAL, name=None):
+        """
+        Queues func(*args) to run in a worker process and returns its Job handle.
+        func and args must be picklable (module-level functions and plain data).
+        """
+        job_id = next(self.sequence)
+        job = Job(job_id, name or func.__name__, priority, func, args, asyncio.get_running_loop().create_future())
+        heapq.heappush(self.heap, (priority, job_id, job))
+        self._pump()
+        return job
+
+    async def run(self, func, *args, priority=JOB_PRIORITY_NORMAL, name=None):
+        """
+        Runs func(*args) in a worker process and returns its result. Large bytes results come back as
+        a JobOutput; its read() returns the bytes and deletes the temp file.
+        func must live in the jobs module (or the standard library) so workers never import bot.py.
+        Cancelling the caller cancels the job.
+        """
+        return await self.submit(func, *args, priority=priority, name=name).future
+
+    def _pump(self):
+        while self.heap and len(self.running) < self.workers:
+            _, _, job = heapq.heappop(self.heap)
+            if job.future.done():
+                self.stats['cancelled'] += 1
+                continue
+            job.started_at = time.monotonic()
+            self.wait_samples.append(job.started_at - job.submitted_at)
+            self.running[job.job_id] = job
+            try:
+                pool_future = self._dispatch(job)
+            except BrokenProcessPool:
+                self._restart_pool()
+                pool_future = self._dispatch(job)
+            asyncio.wrap_future(pool_future).add_done_callback(lambda done, job=job: self._finish(job, done))
+
+    def _dispatch(self, job):
+        # Submitting may start a worker; keep it from re-running bot.py as its __main__
+        with worker_main():
+            return self._pool().submit(execute_job, job.func, job.args, JOB_RESULT_DIR, JOB_INLINE_RESULT_BYTES)
+
+    def _restart_pool(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = None
+        self.stats['pool_restarts'] += 1
+
+    def _finish(self, job, done):
+        self.running.pop(job.job_id, None)
+        self.run_samples.append(time.monotonic() - job.started_at)
+        error = done.exception() if not done.cancelled() else asyncio.CancelledError()
+        if isinstance(error, BrokenProcessPool):
+            self._restart_pool()
+        if job.future.done():
+            # Cancelled while running; drop whatever the worker produced
+            self.stats['cancelled'] += 1
+            if error is None and isinstance(done.result(), JobOutput):
+                done.result().cleanup()
+        elif error is not None:
+            self.stats['failed'] += 1
+            job.future.set_exception(error)
+        else:
+            self.stats['completed'] += 1
+            job.future.set_result(done.result())
+        self._pump()
+
+    def metrics(self):
+        queued = [job for _, _, job in self.heap if not job.future.done()]
+        runs, waits = sorted(self.run_samples), sorted(self.wait_samples)
+        return {
+            **self.stats,
+            'workers': self.workers,
+            'running': len(self.running),
+            'queued': len(queued),
+            'queued_by_priority': {priority: sum(1 for job in queued if job.priority == priority) for priority in sorted({job.priority for job in queued})},
+            'run_p50': runs[len(runs) // 2] if runs else None,
+            'run_p99': runs[min(len(runs) - 1, int(len(runs) * 0.99))] if runs else None,
+            'wait_p50': waits[len(waits) // 2] if waits else None
+        }
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def sweep(self):
+        """
+        Deletes result files a previous run left in JOB_RESULT_DIR.
+        """
+        removed = await asyncio.to_thread(sweep_results, JOB_RESULT_DIR)
+        if removed:
+            logger.info("Removed %s leftover job result files from %s", removed, JOB_RESULT_DIR)
+
+job_runner = JobRunner()
+
+# --- Welcome Cards ---
+class WelcomeCardRenderer:
+    """
+    Renders welcome card images for new members.
+    Fonts, the card background and the avatar mask are built once; avatars are fetched through
+    discord.py's pooled HTTP session and kept decoded in an LRU cache, and cards are drawn in a
+    worker thread and encoded straight into memory.
+    """
+    def __init__(self):
+        self.background = None
+        self.avatar_mask = None
+        self.title_font = None
+        self.subtitle_font = None
+        self.avatars = OrderedDict()  # {avatar URL: resized RGBA avatar}
+        self.avatar_fetches = {}  # {avatar URL: in-flight download-and-decode task}, shared by concurrent joins
+        self.avatar_stats = {'hits': 0, 'misses': 0}
+        self.render_samples = deque(maxlen=WELCOME_CARD_SAMPLES)
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def _load_font(self, size):
+        try:
+            return ImageFont.truetype(WELCOME_CARD_FONT_PATH, size)
+        except OSError:
+            return ImageFont.load_default()
+
+    def _load(self):
+        width, height = WELCOME_CARD_SIZE
+        # Vertical night-sky gradient with a scattering of stars, drawn once
+        background = Image.new('RGB', (1, height))
+        for y in range(height):
+            shade = y / height
+            background.putpixel((0, y), (int(20 + 40 * shade), int(12 + 20 * shade), int(60 + 70 * shade)))
+        background = background.resize((width, height))
+        draw = ImageDraw.Draw(background)
+        stars = random.Random(42)
+        for _ in range(120):
+            x, y, radius = stars.randrange(width), stars.randrange(height), stars.choice((1, 1, 2))
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=(255, 255, 230))
+        size = WELCOME_CARD_AVATAR_SIZE
+        mask = Image.new('L', (size, size), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, size - 1, size - 1), fill=255)
+        self.background, self.avatar_mask = background, mask
+        self.title_font, self.subtitle_font = self._load_font(56), self._load_font(32)
+
+    async def load(self):
+        if self.available and self.background is None:
+            await asyncio.to_thread(self._load)
+
+    def _decode_avatar(self, data):
+        size = WELCOME_CARD_AVATAR_SIZE
+        return Image.open(io.BytesIO(data)).convert('RGBA').resize((size, size))
+
+    async def _avatar(self, member):
+        asset = member.display_avatar.replace(size=256, format='png')
+        # Asset URLs include the avatar hash, so a changed avatar never hits a stale entry
+        avatar = self.avatars.get(asset.url)
+        if avatar is not None:
+            self.avatars.move_to_end(asset.url)
+            self.avatar_stats['hits'] += 1
+            return avatar
+        fetch = self.avatar_fetches.get(asset.url)
+        if fetch is None:
+            self.avatar_stats['misses'] += 1
+            fetch = asyncio.create_task(self._fetch_avatar(asset))
+            self.avatar_fetches[asset.url] = fetch
+            fetch.add_done_callback(lambda done, url=asset.url: self.avatar_fetches.pop(url, None))
+        else:
+            self.avatar_stats['hits'] += 1
+        # Shielded so one cancelled join doesn't cancel the download the others are waiting on
+        return await asyncio.shield(fetch)
+
+    async def _fetch_avatar(self, asset):
+        avatar = await asyncio.to_thread(self._decode_avatar, await asset.read())
+        self.avatars[asset.url] = avatar
+        if len(self.avatars) > WELCOME_CARD_AVATAR_CACHE_SIZE:
+            self.avatars.popitem(last=False)
+        return avatar
+
+    @property
+    def avatar_hit_rate(self):
+        lookups = self.avatar_stats['hits'] + self.avatar_stats['misses']
+        return self.avatar_stats['hits'] / lookups if lookups else None
+
+    def _render(self, avatar, name, member_number):
+        card = self.background.copy()
+        height = card.height
+        size = WELCOME_CARD_AVATAR_SIZE
+        top = (height - size) // 2
+        card.paste(avatar, (48, top), self.avatar_mask)
+        draw = ImageDraw.Draw(card)
+        text_left = 48 + size + 40
+        draw.text((text_left, top + 30), f"Welcome, {name}!"[:32], font=self.title_font, fill=(255, 255, 255))
+        draw.text((text_left, top + 110), f"Cosmic traveller #{member_number}", font=self.subtitle_font, fill=(200, 210, 255))
+        buffer = io.BytesIO()
+        card.save(buffer, format='PNG', compress_level=1)  # Fast compression; cards are small anyway
+        return buffer.getvalue()
+
+    async def render(self, member):
+        """
+        Returns a PNG welcome card for the member as bytes.
+        """
+        await self.load()
+        started = time.monotonic()
+        avatar = await self._avatar(member)
+        data = await asyncio.to_thread(self._render, avatar, member.display_name, member.guild.member_count)
+        self.render_samples.append(time.monotonic() - started)
+        return data
+
+welcome_cards = WelcomeCardRenderer()
+
+# --- Spam Detection ---
+SIMHASH_SPREAD = [sum(((byte >> bit) & 1) << (8 * bit) for bit in range(8)) for byte in range(256)]  # Byte -> 8 one-byte lanes
+
+def simhash(tokens):
+    """
+    64-bit simhash of a token list. Each token hash is spread into 64 one-byte lanes so a single
+    integer addition updates every bit counter at once (valid for up to 255 tokens).
+    """
+    lanes = 0
+    for token in tokens:
+        token_hash = hash(token)
+        for shift in range(8):
+            lanes += SIMHASH_SPREAD[(token_hash >> (8 * shift)) & 0xFF] << (64 * shift)
+    half = len(tokens) / 2
+    result = 0
+    for bit, count in enumerate(lanes.to_bytes(64, 'little')):
+        if count > half:
+            result |= 1 << bit
+    return result
+
+class SpamDetector:
+    """
+    Per-user sliding windows of recent messages kept in fixed-size ring buffers.
+    Every tracked user owns one slot of SPAM_RING_SIZE entries in flat typed arrays
+    (timestamps, simhashes, mention and link counts). The arrays grow one slot at a time up to
+    SPAM_MAX_TRACKED_USERS, after which the least recently active user's slot is recycled.
+    At the default cap that is about 32 MiB: 161 bytes per user of arrays plus the user -> slot index
+    (see bench/spam_bench.py).
+    """
+    def __init__(self, max_users=SPAM_MAX_TRACKED_USERS, ring_size=SPAM_RING_SIZE):
+        self.ring_size = ring_size
+        self.max_users = max_users
+        self.slots = OrderedDict()  # {user_id: slot}, least recently active first
+        self.times = array('d')
+        self.hashes = array('Q')
+        self.mentions = array('H')
+        self.links = array('H')
+        self.positions = array('B')
+
+    def _slot(self, user_id):
+        slot = self.slots.get(user_id)
+        if slot is not None:
+            self.slots.move_to_end(user_id)
+            return slot
+        if len(self.positions) < self.max_users:
+            slot = len(self.positions)
+            self.positions.append(0)
+            for column in (self.hashes, self.mentions, self.links):
+                column.extend([0] * self.ring_size)
+            self.times.extend([float('-inf')] * self.ring_size)
+        else:
+            _, slot = self.slots.popitem(last=False)
+        self.slots[user_id] = slot
+        self.reset_slot(slot)
+        return slot
+
+    def reset_slot(self, slot):
+        base = slot * self.ring_size
+        for index in range(base, base + self.ring_size):
+            self.times[index] = float('-inf')  # Empty entries are never inside the window
+        self.positions[slot] = 0
+
+    def check(self, user_id, content_lower, mention_count, link_count, now=None):
+        """
+        Records a message and returns a reason string if the user's recent messages look like spam.
+        """
+        now = time.monotonic() if now is None else now
+        tokens = content_lower.split()[:SPAM_SIMHASH_MAX_TOKENS]
+        fingerprint = simhash(tokens) if tokens else 0  # 0 marks "no text"; it never counts as a duplicate
+        slot = self._slot(user_id)
+        base = slot * self.ring_size
+        cutoff = now - SPAM_WINDOW_SECONDS
+        recent = duplicates = 0
+        window_mentions, window_links = mention_count, link_count
+        for index in range(base, base + self.ring_size):
+            if self.times[index] < cutoff:
+                continue
+            recent += 1
+            window_mentions += self.mentions[index]
+            window_links += self.links[index]
+            other = self.hashes[index]
+            if fingerprint and other and bin(fingerprint ^ other).count('1') <= SPAM_SIMHASH_DISTANCE:
+                duplicates += 1
+        index = base + self.positions[slot]
+        self.times[index] = now
+        self.hashes[index] = fingerprint
+        self.mentions[index] = min(mention_count, 0xFFFF)
+        self.links[index] = min(link_count, 0xFFFF)
+        self.positions[slot] = (self.positions[slot] + 1) % self.ring_size
+
+        if duplicates >= SPAM_DUPLICATE_LIMIT:
+            reason = f"Repeated the same message {duplicates + 1} times in {SPAM_WINDOW_SECONDS}s"
+        elif recent + 1 >= SPAM_RATE_LIMIT:
+            reason = f"Sent {recent + 1} messages in {SPAM_WINDOW_SECONDS}s"
+        elif window_mentions >= SPAM_MENTION_LIMIT:
+            reason = f"Mentioned {window_mentions} users or roles in {SPAM_WINDOW_SECONDS}s"
+        elif window_links >= SPAM_LINK_LIMIT:
+            reason = f"Posted {window_links} links in {SPAM_WINDOW_SECONDS}s"
+        else:
+            return None
+        self.reset_slot(slot)  # One detection per burst
+        return reason
+
+spam_detector = SpamDetector()
+
+# --- Bump Tracking ---
+class BumpTracker:
+    """
+    Remembers when the server was last bumped and keeps exactly one reminder scheduled for
+    when the bump cooldown ends. State lives in SQLite so the schedule survives restarts.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.last_bump_at = None  # Unix time of the last successful bump
+        self.reminded_for = None  # last_bump_at value the reminder was already sent for (0 = never bumped)
+        self.task = None
+        self.sending = False  # True while the reminder is being sent; the task must not be cancelled then
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS bump_state (key TEXT PRIMARY KEY, value REAL)")
+        return self.conn
+
+    def _load(self):
+        with self.lock:
+            rows = dict(self._connect().execute("SELECT key, value FROM bump_state").fetchall())
+        return rows.get('last_bump_at'), rows.get('reminded_for')
+
+    def _save(self):
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO bump_state (key, value) VALUES (?, ?)",
+                    [('last_bump_at', self.last_bump_at), ('reminded_for', self.reminded_for)]
+                )
+
+    async def load(self):
+        self.last_bump_at, self.reminded_for = await asyncio.to_thread(self._load)
+
+    def next_reminder_at(self):
+        """
+        Returns when the pending reminder is due, or None if it has already been sent.
+        """
+        if self.last_bump_at is None:
+            return None if self.reminded_for == 0 else time.time()
+        if self.reminded_for == self.last_bump_at:
+            return None
+        return self.last_bump_at + BUMP_COOLDOWN_SECONDS
+
+    def schedule(self):
+        """
+        (Re)arms the single reminder task for the current state.
+        A reminder that is already being sent is left to finish; it only marks the bump it was sent for.
+        """
+        if self.task and not self.task.done() and not self.sending:
+            self.task.cancel()
+        due_at = self.next_reminder_at()
+        self.task = asyncio.create_task(self._remind_at(due_at)) if due_at is not None else None
+
+    async def _remind_at(self, due_at):
+        await asyncio.sleep(max(0, due_at - time.time()))
+        await bot.wait_until_ready()  # Scheduled from setup_hook, before channels are cached
+        bumped_at = self.last_bump_at
+        self.sending = True
+        try:
+            sent = await send_bump_reminder()
+        finally:
+            self.sending = False
+        if sent:
+            self.reminded_for = bumped_at if bumped_at is not None else 0
+            await asyncio.to_thread(self._save)
+
+    async def record_bump(self, bumped_at):
+        self.last_bump_at = bumped_at
+        await asyncio.to_thread(self._save)
+        self.schedule()
+
+bump_tracker = BumpTracker(STATE_DB_PATH)
+
+def is_bump_success(message):
+    """
+    True if the message is the bump bot confirming a successful bump in the bump channel's guild.
+    /bump can be run in any channel and the bump bot answers where it was run, so the channel isn't checked.
+    """
+    if message.author.id != BUMP_BOT_ID or message.guild is None:
+        return False
+    bump_channel = bot.get_channel(BUMP_CHANNEL_ID)
+    if bump_channel is not None and bump_channel.guild.id != message.guild.id:
+        return False  # Bumps of other servers the bot is in don't reset this server's cooldown
+    return any(BUMP_SUCCESS_TEXT in (embed.description or '').lower() for embed in message.embeds)
+
+# --- Staff Roster ---
+class StaffRoster:
+    """
+    Persisted set of member IDs holding a staff role, so staff can be found without the member
+    cache or a scan of the guild's member list. Kept current from member updates, audit log
+    role changes, staff messages and members leaving.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.member_ids = set()
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS staff_members (member_id INTEGER PRIMARY KEY)")
+        return self.conn
+
+    def _load(self):
+        with self.lock:
+            return {row[0] for row in self._connect().execute("SELECT member_id FROM staff_members")}
+
+    def _write(self, sql, member_id):
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(sql, (member_id,))
+
+    async def load(self):
+        self.member_ids = await asyncio.to_thread(self._load)
+
+    async def add(self, member_id):
+        if member_id not in self.member_ids:
+            self.member_ids.add(member_id)
+            await asyncio.to_thread(self._write, "INSERT OR IGNORE INTO staff_members (member_id) VALUES (?)", member_id)
+
+    async def discard(self, member_id):
+        if member_id in self.member_ids:
+            self.member_ids.discard(member_id)
+            await asyncio.to_thread(self._write, "DELETE FROM staff_members WHERE member_id = ?", member_id)
+
+    async def update(self, member_id, is_staff):
+        if is_staff:
+            await self.add(member_id)
+        else:
+            await self.discard(member_id)
+
+staff_roster = StaffRoster(STATE_DB_PATH)
+
+def has_staff_role(member):
+    return any(role.id in STAFF_ROLE_IDS for role in getattr(member, 'roles', ()))
+
+# --- State Snapshots ---
+class StateSnapshot:
+    """
+    Versioned binary snapshot format for the hot in-memory state.
+    Layout: header (magic, version, section count), then per section an 8-byte name, a kind byte
+    and a payload length, then a CRC32 over everything before it. Integer maps and sets are stored
+    as packed int64 arrays; record-shaped sections as compact JSON.
+    """
+    MAGIC = b'RRBS'
+    VERSION = 2  # 2: warnings are [case_id, reason, moderator, epoch] lists instead of dicts
+    READABLE_VERSIONS = (1, 2)
+    HEADER = struct.Struct('<4sHH')
+    SECTION = struct.Struct('<8sBI')
+    CHECKSUM = struct.Struct('<I')
+    KIND_JSON, KIND_INT_MAP, KIND_INT_SET = 0, 1, 2
+
+    @classmethod
+    def encode(cls, sections):
+        """
+        sections: {name: (kind, value)}. Returns the snapshot bytes.
+        """
+        parts = [cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(sections))]
+        for name, (kind, value) in sections.items():
+            if kind == cls.KIND_INT_MAP:
+                payload = array('q', value.keys()).tobytes() + array('q', value.values()).tobytes()
+            elif kind == cls.KIND_INT_SET:
+                payload = array('q', value).tobytes()
+            else:
+                payload = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            parts.append(cls.SECTION.pack(name.encode('ascii'), kind, len(payload)))
+            parts.append(payload)
+        body = b''.join(parts)
+        return body + cls.CHECKSUM.pack(zlib.crc32(body))
+
+    @classmethod
+    def decode(cls, data):
+        """
+        Returns {name: value}. Raises ValueError if the snapshot is corrupt or from another version.
+        """
+        body, (checksum,) = data[:-cls.CHECKSUM.size], cls.CHECKSUM.unpack(data[-cls.CHECKSUM.size:])
+        if zlib.crc32(body) != checksum:
+            raise ValueError("checksum mismatch")
+        magic, version, count = cls.HEADER.unpack_from(body)
+        if magic != cls.MAGIC or version not in cls.READABLE_VERSIONS:
+            raise ValueError(f"unsupported snapshot (magic {magic!r}, version {version})")
+        sections, offset = {}, cls.HEADER.size
+        for _ in range(count):
+            raw_name, kind, length = cls.SECTION.unpack_from(body, offset)
+            offset += cls.SECTION.size
+            payload = body[offset:offset + length]
+            offset += length
+            name = raw_name.rstrip(b'\0').decode('ascii')
+            if kind == cls.KIND_INT_MAP:
+                numbers = array('q')
+                numbers.frombytes(payload)
+                half = len(numbers) // 2
+                sections[name] = dict(zip(numbers[:half], numbers[half:]))
+            elif kind == cls.KIND_INT_SET:
+                numbers = array('q')
+                numbers.frombytes(payload)
+                sections[name] = set(numbers)
+            else:
+                sections[name] = json.loads(payload)
+        return sections
+
+def capture_state():
+    """
+    Takes shallow copies of the hot state on the event loop; encoding happens in a worker thread.
+    """
+    now = time.time()
+    return {
+        'reput': (StateSnapshot.KIND_INT_MAP, reputation.copy()),
+        'infract': (StateSnapshot.KIND_INT_MAP, infractions.copy()),
+        'quaran': (StateSnapshot.KIND_INT_SET, set(quarantined_users)),
+        'status': (StateSnapshot.KIND_JSON, [[user_id, status, status_expiry.get(user_id)] for user_id, status in user_statuses.items() if status_expiry.get(user_id, now + 1) > now]),
+        'tickets': (StateSnapshot.KIND_JSON, {ticket_id: dict(ticket) for ticket_id, ticket in modmail_tickets.items()}),
+        'links': (StateSnapshot.KIND_JSON, list(links)),
+        'resource': (StateSnapshot.KIND_JSON, list(resources)),
+        'warnings': (StateSnapshot.KIND_JSON, {str(user_id): list(entries) for user_id, entries in warnings.items() if entries}),
+        'suggest': (StateSnapshot.KIND_JSON, [dict(suggestion) for suggestion in suggestions])
+    }
+
+def write_snapshot_file(path, data):
+    """
+    Writes the snapshot to a temp file, syncs it, then renames it over the old one atomically.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+async def save_state_snapshot():
+    """
+    Writes a snapshot of the hot state, stamped with the journal high-water marks it reflects.
+    The marks are read before the state is captured: a case recorded in between is then both in the
+    snapshot and above the mark, and the replay skips it, instead of being in neither.
+    """
+    meta = {
+        'saved_at': time.time(),
+        'case_high_water': await case_store.max_case_id(),
+        'ticket_next_id': await id_allocator.reserved_next_id('ticket')
+    }
+    sections = capture_state()
+    sections['meta'] = (StateSnapshot.KIND_JSON, meta)
+    started = time.monotonic()
+    data = await asyncio.to_thread(StateSnapshot.encode, sections)
+    await asyncio.to_thread(write_snapshot_file, SNAPSHOT_PATH, data)
+    logger.info("Saved state snapshot (%d bytes) in %.0fms", len(data), (time.monotonic() - started) * 1000)
+
+def read_snapshot_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return StateSnapshot.decode(f.read())
+    except FileNotFoundError:
+        return None
+
+async def load_state_snapshot():
+    """
+    Restores the hot state from the last snapshot if it is consistent with the SQLite journal,
+    then replays warnings recorded in the case log after the snapshot was taken.
+    """
+    started = time.monotonic()
+    try:
+        sections = await asyncio.to_thread(read_snapshot_file, SNAPSHOT_PATH)
+    except (ValueError, struct.error) as e:
+        logger.error("Ignoring unreadable state snapshot: %s", e)
+        return
+    if sections is None:
+        logger.info("No state snapshot found; starting fresh")
+        return
+
+    meta = sections['meta']
+    case_high_water = await case_store.max_case_id()
+    ticket_next_id = await id_allocator.reserved_next_id('ticket')
+    ticket_ids = [int(ticket_id) for ticket_id in sections['tickets']]
+    if meta['case_high_water'] > case_high_water or (ticket_ids and (ticket_next_id is None or max(ticket_ids) >= ticket_next_id)):
+        # The snapshot has seen cases or tickets the database never recorded: it belongs to another database
+        logger.error("State snapshot is ahead of the database journal (cases %s > %s); ignoring it", meta['case_high_water'], case_high_water)
+        return
+
+    reputation.update(sections['reput'])
+    infractions.update(sections['infract'])
+    quarantined_users.update(sections['quaran'])
+    now = time.time()
+    for user_id, status, expires_at in sections['status']:
+        if expires_at is None or expires_at > now:
+            user_statuses[user_id] = status
+            if expires_at is not None:
+                status_expiry[user_id] = expires_at
+                heapq.heappush(status_expiry_heap, (expires_at, user_id))
+    arm_status_expiry_timer()
+    for ticket_id, ticket in sections['tickets'].items():
+        modmail_tickets[ticket_id] = ticket
+        index_ticket(ticket_id, ticket)
+    for link in sections['links']:
+        links.append(link)
+        link_trigger_index.add(link['trigger'], link['trigger'], f"{link['trigger']} → {link['notes_name']}")
+    resources.extend(sections['resource'])
+    for user_id, entries in sections['warnings'].items():
+        records = []
+        for entry in entries:
+            if isinstance(entry, dict):  # Version 1 snapshot
+                entry = [entry['case_id'], entry['reason'], entry['moderator'], datetime.datetime.fromisoformat(entry['timestamp']).timestamp()]
+            case_id, reason, moderator_id, timestamp = entry
+            records.append(WarningRecord(case_id, sys.intern(reason), moderator_id, int(timestamp)))
+        warnings[int(user_id)] = records
+    for suggestion in sections['suggest']:
+        suggestions.append(suggestion)
+        suggestions_by_message[suggestion['message_id']] = suggestion
+
+    # Warnings issued after the snapshot's high-water mark are in the case log; replay the ones it doesn't hold
+    replayed = 0
+    for case in await case_store.after(meta['case_high_water'], action='Warn'):
+        if any(record.case_id == case['case_id'] for record in warnings.get(case['target_id'], ())):
+            continue
+        add_warning(case['target_id'], case['case_id'], case['reason'], case['moderator_id'], case['created_at'])
+        replayed += 1
+    logger.info("Restored state snapshot from %s in %.0fms (%d warnings replayed from the case log)",
+                datetime.datetime.fromtimestamp(meta['saved_at'], datetime.timezone.utc).isoformat(), (time.monotonic() - started) * 1000, replayed)
+
+shutdown_tasks = set()  # Strong reference to the running shutdown, so it can't be garbage collected mid-save
+
+def request_shutdown():
+    """
+    SIGTERM/SIGINT handler: starts one snapshot-and-close. Repeated signals are ignored.
+    """
+    if shutdown_tasks or bot.is_closed():
+        logger.info("Shutdown already in progress; ignoring repeated signal")
+        return
+    task = asyncio.create_task(shutdown_with_snapshot())
+    shutdown_tasks.add(task)
+    task.add_done_callback(shutdown_tasks.discard)
+
+async def shutdown_with_snapshot():
+    try:
+        await save_state_snapshot()
+    except Exception as e:
+        logger.error("Failed to save state snapshot on shutdown: %s", e)
+    await bot.close()
+
+# --- Event Loop Profiler ---
+class SlowCallbackRecorder(logging.Handler):
+    """
+    Collects asyncio's debug-mode "Executing ... took N seconds" warnings during a capture.
+    """
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.records = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith('Executing '):
+            self.records.append(message)
+
+class LoopProfiler:
+    """
+    On-demand sampling profiler for the event loop thread.
+    Nothing is installed while idle: the sampler thread, asyncio debug mode and the slow-callback
+    recorder only exist for the duration of a capture.
+    """
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.running = False
+
+    def _sample(self, thread_id, stop_event, counts):
+        while not stop_event.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                counts[';'.join(reversed(stack))] += 1
+
+    async def capture(self, seconds):
+        """
+        Samples the loop thread for the given number of seconds.
+        Returns (collapsed stack lines, slow callback messages, sample count).
+        """
+        if self.running:
+            raise RuntimeError("a capture is already running")
+        self.running = True
+        loop = asyncio.get_running_loop()
+        counts = defaultdict(int)
+        stop_event = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(threading.get_ident(), stop_event, counts), name='loop-profiler', daemon=True)
+        recorder = SlowCallbackRecorder()
+        asyncio_logger = logging.getLogger('asyncio')
+        previous_debug, previous_threshold = loop.get_debug(), loop.slow_callback_duration
+        previous_level = asyncio_logger.level
+        try:
+            # asyncio logs slow callbacks at WARNING; a stricter LOG_LEVEL would drop them before the recorder
+            asyncio_logger.setLevel(logging.WARNING)
+            asyncio_logger.addHandler(recorder)
+            loop.slow_callback_duration = PROFILE_SLOW_CALLBACK_SECONDS
+            loop.set_debug(True)
+            sampler.start()
+            await asyncio.sleep(seconds)
+        finally:
+            stop_event.set()
+            loop.set_debug(previous_debug)
+            loop.slow_callback_duration = previous_threshold
+            asyncio_logger.removeHandler(recorder)
+            asyncio_logger.setLevel(previous_level)
+            self.running = False
+        await asyncio.to_thread(sampler.join)
+        collapsed = [f"{stack} {count}" for stack, count in sorted(counts.items(), key=lambda item: item[1], reverse=True)]
+        return collapsed, recorder.records, sum(counts.values())
+
+loop_profiler = LoopProfiler()
 
 # Utility Functions to Light Up the Galaxy 🌠
 async def log_action(action, target, moderator, reason, extra_info=None):
@@ -92,12 +2404,12 @@ async def log_action(action, target, moderator, reason, extra_info=None):
     """
     channel = bot.get_channel(MOD_LOG_CHANNEL_ID)
     if not channel:
-        logger.error(f"Moderation log channel with ID {MOD_LOG_CHANNEL_ID} not found! A black hole must have swallowed it! 🕳️")
+        logger.error("Moderation log channel with ID %s not found! A black hole must have swallowed it! 🕳️", MOD_LOG_CHANNEL_ID)
         return
 
     bot_member = channel.guild.me
     if not channel.permissions_for(bot_member).send_messages:
-        logger.error(f"Bot lacks send_messages permission in mod log channel {MOD_LOG_CHANNEL_ID}!")
+        logger.error("Bot lacks send_messages permission in mod log channel %s!", MOD_LOG_CHANNEL_ID)
         return
 
     try:
@@ -113,10 +2425,10 @@ async def log_action(action, target, moderator, reason, extra_info=None):
         embed.add_field(name="Reason", value=reason or "No reason provided", inline=False)
         if extra_info:
             embed.add_field(name="Details", value=extra_info, inline=False)
-        await channel.send(embed=embed)
-        logger.info(f"Logged action: {action} for {target} by {moderator}")
+        outbound.post(channel, embed=embed, priority=SEND_PRIORITY_LOG)
+        logger.info("Logged action: %s for %s by %s", action, target, moderator)
     except Exception as e:
-        logger.error(f"Error in log_action: {str(e)}—a meteor shower disrupted the logs! ☄️")
+        logger.error("Error in log_action: %s—a meteor shower disrupted the logs! ☄️", e)
 
 async def notify_user(user, action, reason, duration=None):
     """
@@ -124,11 +2436,11 @@ async def notify_user(user, action, reason, duration=None):
     """
     try:
         if duration:
-            await user.send(f"⏰ A cosmic event! You’ve been {action.lower()} in the server for {duration} seconds! Reason: {reason} 📜 Let’s align the stars better next time! 🌟")
+            await outbound.send(user, f"⏰ A cosmic event! You’ve been {action.lower()} in the server for {duration} seconds! Reason: {reason} 📜 Let’s align the stars better next time! 🌟", priority=SEND_PRIORITY_MODERATION)
         else:
-            await user.send(f"🚨 A galactic notice! You’ve been {action.lower()} in the server! Reason: {reason} 📜 Let’s keep the universe harmonious! 🌟")
+            await outbound.send(user, f"🚨 A galactic notice! You’ve been {action.lower()} in the server! Reason: {reason} 📜 Let’s keep the universe harmonious! 🌟", priority=SEND_PRIORITY_MODERATION)
     except discord.Forbidden:
-        logger.warning(f"Could not notify {user.id}: Bot is blocked or user has DMs disabled. Their star is out of reach! 🌠")
+        logger.warning("Could not notify %s: Bot is blocked or user has DMs disabled. Their star is out of reach! 🌠", user.id)
 
 async def check_bot_permissions(ctx, required_perms):
     """
@@ -157,6 +2469,58 @@ async def check_bot_permissions(ctx, required_perms):
                 return False
     return True
 
+async def resolve_member(guild, user_id):
+    """
+    Returns the guild member for a user ID, asking the API when the member isn't cached.
+    Returns None if the user is not in the guild.
+    """
+    member = guild.get_member(user_id)
+    if member:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
+
+async def add_staff_to_thread(thread):
+    """
+    Adds every staff member to a private thread without scanning the guild's member list.
+    Editing a staff role mention into a thread message adds the role's members silently;
+    if the role can't be mentioned, falls back to the role's cached members plus the staff
+    roster, fetching roster members one by one when they aren't cached (the 'active' and 'none'
+    member cache policies). If nobody could be added, staff are told in the thread.
+    """
+    staff_roles = [role for role in (thread.guild.get_role(role_id) for role_id in STAFF_ROLE_IDS) if role]
+    can_mention_any = thread.permissions_for(thread.guild.me).mention_everyone
+    mentionable = [role for role in staff_roles if role.mentionable or can_mention_any]
+    if mentionable:
+        summon = await thread.send("🛰️ Summoning the cosmic crew...")
+        await summon.edit(content=' '.join(role.mention for role in mentionable), allowed_mentions=discord.AllowedMentions(roles=True))
+    unmentionable = [role for role in staff_roles if role not in mentionable]
+    added = set()
+    for role in unmentionable:
+        for member in role.members:
+            if member.id not in added:
+                added.add(member.id)
+                await staff_roster.add(member.id)
+                await thread.add_user(member)
+    if unmentionable:
+        role_ids = {role.id for role in unmentionable}
+        for member_id in sorted(staff_roster.member_ids - added):
+            try:
+                member = await resolve_member(thread.guild, member_id)
+            except discord.HTTPException as e:
+                logger.warning("Could not fetch staff member %s for thread %s: %s", member_id, thread.id, e)
+                continue
+            if member is None or not any(role.id in role_ids for role in member.roles):
+                await staff_roster.discard(member_id)  # Left the guild or lost the role while we weren't watching
+                continue
+            added.add(member_id)
+            await thread.add_user(member)
+    if not mentionable and not added:
+        logger.warning("No staff could be added to thread %s: staff roles %s are missing, unmentionable or empty", thread.id, STAFF_ROLE_IDS)
+        await thread.send("⚠️ I couldn't add any staff to this thread automatically! A staff member will need to join it from the channel's thread list. 🛠️")
+
 async def update_status_board():
     """
     Updates the status board message in the designated status channel.
@@ -164,13 +2528,13 @@ async def update_status_board():
     global status_message
     channel = bot.get_channel(STATUS_CHANNEL_ID)
     if not channel:
-        logger.error(f"Status channel with ID {STATUS_CHANNEL_ID} not found! It’s lost in the cosmos! 🌌")
+        logger.error("Status channel with ID %s not found! It’s lost in the cosmos! 🌌", STATUS_CHANNEL_ID)
         return
 
     bot_member = channel.guild.me
     channel_perms = channel.permissions_for(bot_member)
     if not (channel_perms.send_messages and channel_perms.manage_messages and channel_perms.read_message_history):
-        logger.error(f"Bot lacks permissions in status channel {STATUS_CHANNEL_ID}: send_messages={channel_perms.send_messages}, manage_messages={channel_perms.manage_messages}, read_message_history={channel_perms.read_message_history}")
+        logger.error("Bot lacks permissions in status channel %s: send_messages=%s, manage_messages=%s, read_message_history=%s", STATUS_CHANNEL_ID, channel_perms.send_messages, channel_perms.manage_messages, channel_perms.read_message_history)
         return
 
     embed = discord.Embed(
@@ -179,16 +2543,21 @@ async def update_status_board():
         color=discord.Color.green(),
         timestamp=datetime.datetime.now(datetime.timezone.utc)
     )
-    if not user_statuses:
+    now = time.time()
+    for user_id in list(user_statuses):
+        status = get_user_status(user_id, now)  # Expired entries are dropped here even if the timer hasn't fired
+        if status is None:
+            continue
+        user = bot.get_user(user_id)
+        if user:
+            expires_at = status_expiry.get(user_id)
+            value = f"{status}\n⏳ clears <t:{int(expires_at)}:R>" if expires_at else status
+            embed.add_field(name=f"🌠 {user.display_name}", value=value, inline=True)
+        else:
+            # Remove user if not found (e.g., left the guild)
+            clear_user_status(user_id)
+    if not embed.fields:
         embed.add_field(name="🌌 Cosmic Void", value="The galaxy is silent... Set your status with `.f`, `.s`, etc., to light up the stars! ✨", inline=False)
-    else:
-        for user_id, status in list(user_statuses.items()):
-            user = bot.get_user(user_id)
-            if user:
-                embed.add_field(name=f"🌠 {user.display_name}", value=status, inline=True)
-            else:
-                # Remove user if not found (e.g., left the guild)
-                user_statuses.pop(user_id, None)
 
     try:
         if status_message:
@@ -216,9 +2585,149 @@ async def update_status_board():
         status_message = await channel.send(embed=embed)
         logger.info("Created a new status message! A new star is born! 🌟")
     except Exception as e:
-        logger.error(f"Error updating status board: {str(e)}—a cosmic storm disrupted the update! ⛈️")
+        logger.error("Error updating status board: %s—a cosmic storm disrupted the update! ⛈️", e)
         await log_action("Error in update_status_board", None, None, str(e))
 
+def set_user_status(user_id, status):
+    """
+    Sets a user's status and, if the status has a TTL, schedules its expiry on the shared timer heap.
+    """
+    user_statuses[user_id] = status
+    ttl = STATUS_TTL_SECONDS.get(status)
+    if ttl is None:
+        status_expiry.pop(user_id, None)
+        return
+    expires_at = time.time() + ttl
+    status_expiry[user_id] = expires_at
+    heapq.heappush(status_expiry_heap, (expires_at, user_id))
+    if status_expiry_heap[0] == (expires_at, user_id):
+        arm_status_expiry_timer()
+
+def clear_user_status(user_id):
+    status_expiry.pop(user_id, None)
+    return user_statuses.pop(user_id, None)
+
+def get_user_status(user_id, now=None):
+    """
+    Returns a user's live status, dropping it on the spot if it has already expired.
+    """
+    expires_at = status_expiry.get(user_id)
+    if expires_at is not None and expires_at <= (now or time.time()):
+        clear_user_status(user_id)
+        return None
+    return user_statuses.get(user_id)
+
+def arm_status_expiry_timer():
+    """
+    Points the single expiry timer at the earliest live entry on the heap.
+    """
+    global status_expiry_timer
+    while status_expiry_heap and status_expiry.get(status_expiry_heap[0][1]) != status_expiry_heap[0][0]:
+        heapq.heappop(status_expiry_heap)  # Stale: the status was changed or cleared since
+    if status_expiry_timer:
+        status_expiry_timer.cancel()
+        status_expiry_timer = None
+    if status_expiry_heap:
+        delay = max(0, status_expiry_heap[0][0] - time.time())
+        status_expiry_timer = asyncio.get_running_loop().call_later(delay, expire_statuses)
+
+def expire_statuses():
+    """
+    Timer callback: clears every status that is due and requests one board refresh for all of them.
+    """
+    global status_expiry_timer
+    status_expiry_timer = None
+    now = time.time()
+    expired = 0
+    while status_expiry_heap and status_expiry_heap[0][0] <= now:
+        expires_at, user_id = heapq.heappop(status_expiry_heap)
+        if status_expiry.get(user_id) == expires_at:
+            clear_user_status(user_id)
+            expired += 1
+    if expired:
+        schedule_status_board_refresh()
+    arm_status_expiry_timer()
+
+def schedule_status_board_refresh():
+    """
+    Refreshes the status board once after a short delay, however many times it is requested meanwhile.
+    """
+    global status_board_refresh_task
+    if status_board_refresh_task and not status_board_refresh_task.done():
+        return
+
+    async def refresh():
+        await asyncio.sleep(STATUS_BOARD_REFRESH_DELAY)
+        await update_status_board()
+
+    status_board_refresh_task = asyncio.create_task(refresh())
+
+def build_status_ping_reply(message):
+    """
+    Builds a single reply announcing the statuses of every mentioned user.
+    Users whose status was already announced in this channel within the cooldown are skipped.
+    Returns None when there is nothing to announce.
+    """
+    now = time.monotonic()
+    lines = []
+    seen = set()
+    for user in message.mentions:
+        if user.id in seen:
+            continue
+        seen.add(user.id)
+        status = get_user_status(user.id)
+        template = STATUS_PING_TEMPLATES.get(status)
+        if not template:
+            continue
+        key = (message.channel.id, user.id)
+        previous = status_ping_cooldowns.get(key)
+        if previous and previous[0] == status and now - previous[1] < STATUS_PING_COOLDOWN_SECONDS:
+            continue
+        status_ping_cooldowns[key] = (status, now)
+        lines.append(template.format(mention=user.mention))
+
+    # Drop expired cooldown entries so the table doesn't grow forever in busy servers
+    if len(status_ping_cooldowns) > 10000:
+        for stale_key in [k for k, (_, ts) in status_ping_cooldowns.items() if now - ts >= STATUS_PING_COOLDOWN_SECONDS]:
+            del status_ping_cooldowns[stale_key]
+
+    return "\n".join(lines) if lines else None
+
+def split_message_lines(text, limit=DISCORD_MESSAGE_LIMIT):
+    """
+    Splits newline-separated text into chunks that fit in a single Discord message.
+    """
+    chunks = []
+    current = ""
+    for line in text.split("\n"):
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit and current:
+            chunks.append(current)
+            current = line[:limit]
+        else:
+            current = candidate[:limit]
+    if current:
+        chunks.append(current)
+    return chunks
+
+def format_case_summary(case):
+    """
+    Formats a stored case record for display in an embed field.
+    """
+    target = f"<@{case['target_id']}>" if case['target_id'] else "None"
+    moderator = f"<@{case['moderator_id']}>" if case['moderator_id'] else "Auto-Mod 🤖"
+    created = datetime.datetime.fromtimestamp(case['created_at'], datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+    summary = f"**Target:** {target}\n**Moderator:** {moderator}\n**Reason:** {case['reason'] or 'No reason provided'}\n**Timestamp:** {created}"
+    if case['details']:
+        summary += f"\n**Details:** {case['details']}"
+    return summary
+
+def parse_case_date(value):
+    """
+    Parses a YYYY-MM-DD date (UTC) into a UNIX timestamp for case queries.
+    """
+    return datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time(), tzinfo=datetime.timezone.utc).timestamp()
+
 # --- Custom Help View ---
 class HelpView(discord.ui.View):
     def __init__(self, bot_instance, user, commands_list, specific_command=None):
@@ -389,6 +2898,70 @@ class ResourceView(discord.ui.View):
             except discord.NotFound:
                 pass
 
+# --- Case Log View ---
+class CaseLogView(discord.ui.View):
+    def __init__(self, user, filters, first_page):
+        super().__init__(timeout=180)
+        self.user = user
+        self.filters = filters  # Keyword arguments for case_store.query
+        self.page = first_page
+        self.cursors = [None]  # Keyset cursors (before_case_id) of every page visited so far
+        self.message = None # To store the message for editing
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.prev_button.disabled = len(self.cursors) <= 1
+        self.next_button.disabled = len(self.page) < CASES_PER_PAGE
+
+    def get_embed(self):
+        embed = discord.Embed(
+            title="🗂️ Cosmic Case Files 🗂️",
+            color=discord.Color.dark_red(),
+            timestamp=datetime.datetime.now(datetime.timezone.utc)
+        )
+        if not self.page:
+            embed.add_field(name="🌌 Cosmic Void", value="No cases match these filters.", inline=False)
+        for case in self.page:
+            embed.add_field(name=f"📜 Case #{case['case_id']} — {case['action']}", value=format_case_summary(case), inline=False)
+        embed.set_footer(
+            text=f"Page {len(self.cursors)} | Requested by {self.user.display_name}",
+            icon_url=self.user.avatar.url if self.user.avatar else None
+        )
+        return embed
+
+    @discord.ui.button(label="⬅️ Previous", style=discord.ButtonStyle.primary)
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.user.id:
+            await interaction.response.send_message("🚫 Only the cosmic traveler who requested these cases can turn the pages! 🗂️", ephemeral=True)
+            return
+
+        self.cursors.pop()
+        self.page = await case_store.query(before_case_id=self.cursors[-1], **self.filters)
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+
+    @discord.ui.button(label="Next ➡️", style=discord.ButtonStyle.primary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.user.id:
+            await interaction.response.send_message("🚫 Only the cosmic traveler who requested these cases can turn the pages! 🗂️", ephemeral=True)
+            return
+
+        next_page = await case_store.query(before_case_id=self.page[-1]['case_id'], **self.filters)
+        if next_page:
+            self.cursors.append(self.page[-1]['case_id'])
+            self.page = next_page
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+
+    async def on_timeout(self):
+        if self.message:
+            for item in self.children:
+                item.disabled = True
+            try:
+                await self.message.edit(view=self)
+            except discord.NotFound:
+                pass
+
 # --- Social Media Button View ---
 class SocialMediaView(discord.ui.View):
     def __init__(self, post_url):
@@ -396,6 +2969,32 @@ class SocialMediaView(discord.ui.View):
         self.add_item(discord.ui.Button(label="View Post", style=discord.ButtonStyle.link, url=post_url))
 
 # --- Event Handlers ---
+startup_tasks = set()  # Strong references to background work started from setup_hook
+
+@bot.event
+async def setup_hook():
+    """
+    Runs once before connecting: restores the state snapshot and bump schedule, and arranges for a
+    snapshot to be written on shutdown. on_ready runs again on every reconnect, so nothing here belongs there.
+    """
+    await load_state_snapshot()
+    await job_runner.sweep()
+    await bump_tracker.load()
+    bump_tracker.schedule()
+    await staff_roster.load()
+    # Autocomplete indexes don't depend on anything on_ready does, so they're built here exactly once
+    build_command_name_index()
+    task = asyncio.create_task(load_banned_user_indexes())
+    startup_tasks.add(task)
+    task.add_done_callback(startup_tasks.discard)
+    loop = asyncio.get_running_loop()
+    for shutdown_signal in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(shutdown_signal, request_shutdown)
+        except (NotImplementedError, RuntimeError):  # Not supported on Windows event loops
+            pass
+    snapshot_state.start()
+
 @bot.event
 async def on_ready():
     """
@@ -403,12 +3002,17 @@ async def on_ready():
     Performs initial setup, syncs slash commands, updates status board, and initializes social media tracking.
     """
     global status_message, last_instagram_post, last_youtube_video
-    logger.info(f'Bot is online as {bot.user}! 🌟 Ready to make your server a magical constellation! 🪄')
+    logger.info("Bot is online as %s! 🌟 Ready to make your server a magical constellation! 🪄", bot.user)
+    logger.info("Member cache policy '%s': %d members cached across %d guilds", MEMBER_CACHE_POLICY, sum(len(guild.members) for guild in bot.guilds), len(bot.guilds))
     activity = discord.Activity(type=discord.ActivityType.watching, name="The Resource Repository 📚")
     await bot.change_presence(activity=activity)
+    try:
+        await ai_cache.load()
+    except Exception as e:
+        logger.error("Error loading AI reply cache: %s", e)
     try:
         synced = await bot.tree.sync()
-        logger.info(f"Slash commands synced successfully: {len(synced)} commands are now shining in the galaxy! 🌟")
+        logger.info("Slash commands synced successfully: %s commands are now shining in the galaxy! 🌟", len(synced))
         await update_status_board()
         # Initialize social media tracking
         async with aiohttp.ClientSession() as session:
@@ -420,11 +3024,11 @@ async def on_ready():
                         data = await resp.json()
                         if data.get('data'):
                             last_instagram_post = data['data'][0]['id']
-                            logger.info(f"Initialized last Instagram post: {last_instagram_post}")
+                            logger.info("Initialized last Instagram post: %s", last_instagram_post)
                         else:
                             logger.warning("Instagram API returned no data.")
                     else:
-                        logger.warning(f"Failed to fetch Instagram posts: HTTP {resp.status} - {await resp.text()}")
+                        logger.warning("Failed to fetch Instagram posts: HTTP %s - %s", resp.status, await resp.text())
             else:
                 logger.info("Instagram token not set. Skipping Instagram updates.")
 
@@ -436,326 +3040,480 @@ async def on_ready():
                         data = await resp.json()
                         if data.get('items'):
                             last_youtube_video = data['items'][0]['id']['videoId']
-                            logger.info(f"Initialized last YouTube video: {last_youtube_video}")
+                            logger.info("Initialized last YouTube video: %s", last_youtube_video)
                         else:
                             logger.warning("YouTube API returned no data.")
                     else:
-                        logger.warning(f"Failed to fetch YouTube videos: HTTP {resp.status} - {await resp.text()}")
+                        logger.warning("Failed to fetch YouTube videos: HTTP %s - %s", resp.status, await resp.text())
             else:
                 if not YOUTUBE_API_KEY:
                     logger.info("YouTube API key not set. Skipping YouTube updates.")
                 elif YOUTUBE_CHANNEL_ID == 'UCYourChannelId':
                     logger.warning("YouTube Channel ID not updated. Skipping YouTube updates.")
 
-        # Start tasks
-        bump_reminder.start()
-        check_social_media.start()
+        # Start tasks; on_ready runs again after every reconnect, when they are already running
+        if not check_social_media.is_running():
+            check_social_media.start()
+        if drive_library and not sync_drive_library.is_running():
+            await drive_library.load()
+            sync_drive_library.start()
+        if not check_link_health.is_running():
+            check_link_health.start()
+        await welcome_cards.load()
     except discord.errors.Forbidden:
         logger.error("Failed to sync slash commands: Missing applications.commands scope. Please re-invite the bot with the correct scope! 🚫")
     except Exception as e:
-        logger.error(f"Error in on_ready: {str(e)}—a cosmic storm disrupted startup! ⛈️")
+        logger.error("Error in on_ready: %s—a cosmic storm disrupted startup! ⛈️", e)
 
-@bot.event
-async def on_message(message):
+# --- Message Handler Pipeline ---
+message_handlers = []  # Registered on_message feature handlers, see message_handler()
+handler_stats = defaultdict(lambda: {'runs': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'samples': deque(maxlen=HANDLER_LATENCY_SAMPLES)})  # {handler_name: stats}
+pipeline_stats = {'messages': 0, 'started_at': time.monotonic()}  # Message throughput since startup
+pending_handler_tasks = set()  # Strong references to in-flight handler batches
+
+def message_handler(*, dm_only=False, guild_only=False, channel_id=None, thread_parent_id=None, needs_reference=False, needs_mentions=False, keywords=None):
     """
-    Processes incoming messages for auto-responses, reputation, modmail, and other features.
+    Registers an on_message feature handler together with cheap prefilters.
+    A handler only runs when every prefilter matches, so most messages skip most features.
+    Handlers are called as handler(message, content_lower).
     """
-    if message.author.bot:
-        return
+    def decorator(func):
+        message_handlers.append({
+            'name': func.__name__,
+            'func': func,
+            'dm_only': dm_only,
+            'guild_only': guild_only,
+            'channel_id': channel_id,
+            'thread_parent_id': thread_parent_id,
+            'needs_reference': needs_reference,
+            'needs_mentions': needs_mentions,
+            'keywords': tuple(keywords) if keywords else None
+        })
+        return func
+    return decorator
 
+def handler_matches(handler, message, content_lower):
+    """
+    Checks a handler's prefilters against a message without any awaits or API calls.
+    """
+    if handler['dm_only'] and not isinstance(message.channel, discord.DMChannel):
+        return False
+    if handler['guild_only'] and message.guild is None:
+        return False
+    if handler['channel_id'] is not None and message.channel.id != handler['channel_id']:
+        return False
+    if handler['thread_parent_id'] is not None and not (isinstance(message.channel, discord.Thread) and message.channel.parent_id == handler['thread_parent_id']):
+        return False
+    if handler['needs_reference'] and not message.reference:
+        return False
+    if handler['needs_mentions'] and not message.mentions:
+        return False
+    if handler['keywords'] and not any(keyword in content_lower for keyword in handler['keywords']):
+        return False
+    return True
+
+async def run_message_handler(handler, message, content_lower):
+    """
+    Runs a single handler, isolating its failures and recording how long it took.
+    """
+    stats = handler_stats[handler['name']]
+    start = time.perf_counter()
     try:
-        content_lower = message.content.lower()
+        await handler['func'](message, content_lower)
+    except Exception as e:
+        stats['errors'] += 1
+        logger.error("Error in message handler %s: %s", handler['name'], e)
+        await log_action(f"Error in {handler['name']}", message.author, None, str(e))
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stats['runs'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        stats['samples'].append(elapsed_ms)
+
+async def dispatch_message_handlers(message, content_lower, matching):
+    """
+    Runs all matching handlers for a message concurrently.
+    """
+    await asyncio.gather(*(run_message_handler(handler, message, content_lower) for handler in matching))
+
+# Creative Auto-Responders
+AUTO_REPLY_GREETINGS = ['hello', 'hi', 'hey']
+AUTO_REPLY_FAREWELLS = ['bye', 'goodbye', 'see ya']
+AUTO_REPLY_MORNING = ['good morning', 'morning']
+AUTO_REPLY_NIGHT = ['good night', 'night']
+
+@message_handler(keywords=AUTO_REPLY_GREETINGS + AUTO_REPLY_FAREWELLS + AUTO_REPLY_MORNING + AUTO_REPLY_NIGHT)
+async def handle_auto_responders(message, content_lower):
+    responses = [
+        f"🌠 Yo, {message.author.mention}! What's good in the galaxy? 🚀",
+        f"✨ Hey there, {message.author.mention}! Ready to explore the cosmos? 🌌",
+        f"🪐 Greetings, {message.author.mention}! Let's make some starry magic! 🪄"
+    ]
+    farewell_responses = [
+        f"🌌 Catch you later, {message.author.mention}! Fly safe among the stars! ✨",
+        f"💫 Farewell, {message.author.mention}! May your cosmic journey be epic! 🚀"
+    ]
+    morning_responses = [
+        f"☀️ Rise and shine, {message.author.mention}! A new day in the galaxy awaits! 🌟",
+        f"🌅 Good morning, {message.author.mention}! Let’s conquer the cosmos today! 🚀"
+    ]
+    night_responses = [
+        f"🌙 Sweet dreams, {message.author.mention}! Sleep tight under the starry sky! 💤",
+        f"✨ Good night, {message.author.mention}! May your dreams be out of this world! 🌌"
+    ]
+
+    if any(g in content_lower for g in AUTO_REPLY_GREETINGS):
+        outbound.post(message.channel, random.choice(responses), priority=SEND_PRIORITY_AUTO_REPLY)
+    elif any(f in content_lower for f in AUTO_REPLY_FAREWELLS):
+        outbound.post(message.channel, random.choice(farewell_responses), priority=SEND_PRIORITY_AUTO_REPLY)
+    elif any(m in content_lower for m in AUTO_REPLY_MORNING):
+        outbound.post(message.channel, random.choice(morning_responses), priority=SEND_PRIORITY_AUTO_REPLY)
+    elif any(n in content_lower for n in AUTO_REPLY_NIGHT):
+        outbound.post(message.channel, random.choice(night_responses), priority=SEND_PRIORITY_AUTO_REPLY)
+
+# Reputation System
+@message_handler(needs_reference=True, keywords=['thanks', 'tysm', 'thank you'])
+async def handle_reputation(message, content_lower):
+    try:
+        replied_message = await message.channel.fetch_message(message.reference.message_id)
+        if replied_message.author != message.author and not replied_message.author.bot:
+            helper = replied_message.author
+            thanker = message.author
+            reputation.add(helper.id)
+            outbound.post(message.channel, f"🌟 {helper.mention}, you’re a galactic hero! {thanker.mention} thanked you, earning you +1 rep point! ✨", priority=SEND_PRIORITY_AUTO_REPLY)
+            await log_action("Reputation Awarded", helper, thanker, f"{thanker.display_name} thanked {helper.display_name} (+1 rep)")
+    except discord.NotFound:
+        outbound.post(message.channel, "⚠️ The message you replied to vanished into a black hole! Couldn’t award rep points. 🕳️", priority=SEND_PRIORITY_AUTO_REPLY)
+
+# Status-Based Ping Response (one coalesced reply per message)
+@message_handler(guild_only=True, needs_mentions=True)
+async def handle_status_pings(message, content_lower):
+    status_reply = build_status_ping_reply(message)
+    if status_reply:
+        for chunk in split_message_lines(status_reply):
+            outbound.post(message.channel, chunk, priority=SEND_PRIORITY_AUTO_REPLY)
+
+# AI Mention Replies
+@message_handler(needs_mentions=True)
+async def handle_ai_mention(message, content_lower):
+    if bot.user not in message.mentions:
+        return
+    prompt: str = message.content.replace(f"<@{bot.user.id}>", "").replace(f"<@!{bot.user.id}>", "").strip()
+    if not prompt:
+        outbound.post(message.channel, "Hi there! You mentioned me — what's up?", priority=SEND_PRIORITY_AUTO_REPLY)
+        return
 
-        # Creative Auto-Responders
-        greetings = ['hello', 'hi', 'hey']
-        farewells = ['bye', 'goodbye', 'see ya']
-        morning = ['good morning', 'morning']
-        night = ['good night', 'night']
-        
-        responses = [
-            f"🌠 Yo, {message.author.mention}! What's good in the galaxy? 🚀",
-            f"✨ Hey there, {message.author.mention}! Ready to explore the cosmos? 🌌",
-            f"🪐 Greetings, {message.author.mention}! Let's make some starry magic! 🪄"
-        ]
-        farewell_responses = [
-            f"🌌 Catch you later, {message.author.mention}! Fly safe among the stars! ✨",
-            f"💫 Farewell, {message.author.mention}! May your cosmic journey be epic! 🚀"
-        ]
-        morning_responses = [
-            f"☀️ Rise and shine, {message.author.mention}! A new day in the galaxy awaits! 🌟",
-            f"🌅 Good morning, {message.author.mention}! Let’s conquer the cosmos today! 🚀"
-        ]
-        night_responses = [
-            f"🌙 Sweet dreams, {message.author.mention}! Sleep tight under the starry sky! 💤",
-            f"✨ Good night, {message.author.mention}! May your dreams be out of this world! 🌌"
-        ]
-
-        if any(g in content_lower for g in greetings):
-            await message.channel.send(random.choice(responses))
-        elif any(f in content_lower for f in farewells):
-            await message.channel.send(random.choice(farewell_responses))
-        elif any(m in content_lower for m in morning):
-            await message.channel.send(random.choice(morning_responses))
-        elif any(n in content_lower for n in night):
-            await message.channel.send(random.choice(night_responses))
-
-        # Reputation System
-        if message.reference and ('thanks' in content_lower or 'tysm' in content_lower or 'thank you' in content_lower):
-            try:
-                replied_message = await message.channel.fetch_message(message.reference.message_id)
-                if replied_message.author != message.author and not replied_message.author.bot:
-                    helper = replied_message.author
-                    thanker = message.author
-                    reputation[helper.id] += 1
-                    await message.channel.send(f"🌟 {helper.mention}, you’re a galactic hero! {thanker.mention} thanked you, earning you +1 rep point! ✨")
-                    await log_action("Reputation Awarded", helper, thanker, f"{thanker.display_name} thanked {helper.display_name} (+1 rep)")
-            except discord.NotFound:
-                await message.channel.send("⚠️ The message you replied to vanished into a black hole! Couldn’t award rep points. 🕳️")
-
-        # Status-Based Ping Response
-        if message.mentions and not isinstance(message.channel, discord.DMChannel):
-            for user in message.mentions:
-                if user.id in user_statuses:
-                    status = user_statuses[user.id]
-                    status_responses = { # Renamed to avoid conflict
-                        "Free ✅": f"🌟 {user.mention} is Free ✅—ready to chat and light up the galaxy! 🗣️",
-                        "Sleeping 😴": f"💤 {user.mention} is Sleeping 😴—dreaming in a nebula! They’ll reply soon! 🌙",
-                        "Do Later 🚧": f"⏳ {user.mention} is Do Later 🚧—on a cosmic mission! Catch them later! 🪐",
-                        "Studying 📚": f"📖 {user.mention} is Studying 📚—diving into knowledge! They’ll reply after! 🧠",
-                        "Outside 🚶‍♂️": f"🌳 {user.mention} is Outside 🚶‍♂️—stargazing IRL! They’ll be back! 🍃",
-                        "On Break ☕": f"☕ {user.mention} is On Break ☕—chilling in a nebula lounge! They’ll chat soon! 🛋️"
-                    }
-                    if status in status_responses:
-                        await message.channel.send(status_responses[status])
-                        
-        if hasattr(message, "mentions") and bot.user in message.mentions and not message.author.bot:
-            prompt: str = message.content.replace(f"<@{bot.user.id}>", "").replace(f"<@!{bot.user.id}>", "").strip()
-            if not prompt:
-                await message.channel.send("Hi there! You mentioned me — what's up?")
-                return
+    started_at = time.monotonic()
+    history = ai_context.history(message.channel.id)
+    messages = [{"role": "system", "content": AI_SYSTEM_PROMPT}, *history, {"role": "user", "content": prompt}]
+    placeholder = None
+
+    async def create_reply():
+        nonlocal placeholder
+        placeholder = await outbound.send(message.channel, "💭 Thinking among the stars...", reference=message, mention_author=False, priority=SEND_PRIORITY_AUTO_REPLY)
+        return await stream_ai_reply(messages, placeholder, started_at)
 
+    # Only context-free prompts are cacheable; replies inside a conversation depend on its history
+    task = asyncio.create_task(ai_cache.get_or_create(prompt, create_reply) if not history else create_reply())
+    ai_reply_tasks[message.id] = task
+    try:
+        ai_reply = await task
+    except asyncio.CancelledError:
+        if message.id in ai_reply_tasks:
+            # Not our deletion: another prompt sharing this reply was deleted mid-stream
+            outbound.post(message.channel, "Oops, something went wrong. Try again soon!", priority=SEND_PRIORITY_AUTO_REPLY)
+        elif placeholder:
             try:
-                await message.channel.typing()
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a helpful, friendly, and casual AI assistant in a Discord server. Reply like a normal human. Keep it brief, natural, and clear."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=150,
-                    temperature=0.7
-                )
-                ai_reply = response.choices[0].message.content.strip()
-                await message.channel.send(ai_reply)
+                await placeholder.delete()
+            except discord.HTTPException:
+                pass
+        return
+    except Exception as e:
+        logger.error("AI reply error: %s", e)
+        if placeholder:
+            await placeholder.edit(content="Oops, something went wrong. Try again soon!")
+        else:
+            outbound.post(message.channel, "Oops, something went wrong. Try again soon!", priority=SEND_PRIORITY_AUTO_REPLY)
+        return
+    finally:
+        ai_reply_tasks.pop(message.id, None)
+
+    ai_context.record(message.channel.id, "user", f"{message.author.display_name}: {prompt}")
+    ai_context.record(message.channel.id, "assistant", ai_reply)
+    if placeholder is None:
+        # Served from the cache or shared with an identical in-flight prompt
+        ai_first_token_samples.append(time.monotonic() - started_at)
+        outbound.post(message.channel, ai_reply, priority=SEND_PRIORITY_AUTO_REPLY)
+
+# Past Paper Search (Mock Response)
+@message_handler(keywords=['past paper'])
+async def handle_past_papers(message, content_lower):
+    match = re.search(r'past paper (\w+) (\d{4})', content_lower)
+    if match:
+        subject, year = match.groups()
+        outbound.post(message.channel, f"📜 Searching the cosmic archives for {subject} past papers from {year}! 🕰️ Check back soon for links! 📚", priority=SEND_PRIORITY_AUTO_REPLY)
+        # In a real implementation, integrate with an external API or database
+        # Example: Fetching from a Google Drive folder or a custom API
+        # For demonstration, this remains a mock response.
+
+# Helper Ping
+@message_handler(guild_only=True, keywords=['help me'])
+async def handle_helper_ping(message, content_lower):
+    helper_role = message.guild.get_role(HELPER_ROLE_ID)
+    if helper_role:
+        outbound.post(message.channel, f"🆘 Cosmic SOS! {helper_role.mention}, {message.author.mention} needs your stellar help! 🦸‍♂️", priority=SEND_PRIORITY_AUTO_REPLY)
+        await log_action("Helper Ping", message.author, None, "User requested help with 'help me'")
+    else:
+        outbound.post(message.channel, f"⚠️ Helper role not found! Please set up the role with ID {HELPER_ROLE_ID}! 🕳️", priority=SEND_PRIORITY_AUTO_REPLY)
+
+# Resource Linking
+@message_handler(channel_id=LINK_CHANNEL_ID, keywords=['i want'])
+async def handle_resource_linking(message, content_lower):
+    match = re.search(r'i want (\w+) of (\w+)', content_lower)
+    if match:
+        resource, board = match.groups()
+        matches = drive_library.search(resource, board, limit=DRIVE_SEARCH_RESULTS) if drive_library else []
+        if matches:
+            found = "\n".join(f"📎 [{entry['name']}]({entry['web_link']})" for entry in matches)
+            outbound.post(message.channel, f"📚 Found {resource} for {board} in the cosmic library! 🌌\n{found}", priority=SEND_PRIORITY_AUTO_REPLY)
+            return
+        resources.append({'resource': resource, 'board': board, 'user': message.author.id, 'channel': message.channel.id})
+        outbound.post(message.channel, f"📚 Added {resource} for {board} to the cosmic library! 🌌 View with `.listlink`! 📖", priority=SEND_PRIORITY_AUTO_REPLY)
+
+# Custom Link Trigger
+@message_handler()
+async def handle_link_triggers(message, content_lower):
+    for link in links:
+        if link['trigger'] in content_lower:
+            # Drive-backed links follow renames and moves through the library index
+            entry = drive_library.resolve(link['file_link']) if drive_library else None
+            hyperlink = f"[{entry['name']}]({entry['web_link']})" if entry and entry['web_link'] else f"[{link['notes_name']}]({link['file_link']})"
+            outbound.post(message.channel, f"📎 Found a cosmic link! Notes: {hyperlink} for {link['notes_name']}! 🌟", priority=SEND_PRIORITY_AUTO_REPLY)
+            await log_action("Link Triggered", message.author, None, f"Trigger: {link['trigger']}, Notes: {link['notes_name']}, Link: {link['file_link']}")
+            break
+
+# Modmail System
+@message_handler(dm_only=True)
+async def handle_modmail_dm(message, content_lower):
+    ticket_id = None
+    # Find an existing open ticket for this user
+    for tid, ticket_data in modmail_tickets.items():
+        if ticket_data['user_id'] == str(message.author.id) and ticket_data['status'] == 'open':
+            ticket_id = tid
+            break
+
+    modmail_channel = bot.get_channel(MODMAIL_CHANNEL_ID)
+    if not modmail_channel:
+        await outbound.send(message.channel, f"⚠️ Modmail channel not found! Please inform staff to set up channel ID {MODMAIL_CHANNEL_ID}. 🕳️", priority=SEND_PRIORITY_MODMAIL)
+        return
 
-            except Exception as e:
-                logger.error(f"AI reply error: {e}")
-                await message.channel.send("Oops, something went wrong. Try again soon!")
-
-
-        # Past Paper Search (Mock Response)
-        match = re.search(r'past paper (\w+) (\d{4})', content_lower)
-        if match:
-            subject, year = match.groups()
-            await message.channel.send(f"📜 Searching the cosmic archives for {subject} past papers from {year}! 🕰️ Check back soon for links! 📚")
-            # In a real implementation, integrate with an external API or database
-            # Example: Fetching from a Google Drive folder or a custom API
-            # For demonstration, this remains a mock response.
-
-        # Helper Ping
-        if 'help me' in content_lower and not isinstance(message.channel, discord.DMChannel):
-            helper_role = message.guild.get_role(HELPER_ROLE_ID)
-            if helper_role:
-                await message.channel.send(f"🆘 Cosmic SOS! {helper_role.mention}, {message.author.mention} needs your stellar help! 🦸‍♂️")
-                await log_action("Helper Ping", message.author, None, "User requested help with 'help me'")
-            else:
-                await message.channel.send(f"⚠️ Helper role not found! Please set up the role with ID {HELPER_ROLE_ID}! 🕳️")
-
-        # Resource Linking
-        if message.channel.id == LINK_CHANNEL_ID:
-            match = re.search(r'i want (\w+) of (\w+)', content_lower)
-            if match:
-                resource, board = match.groups()
-                resources.append({'resource': resource, 'board': board, 'user': message.author.id, 'channel': message.channel.id})
-                await message.channel.send(f"📚 Added {resource} for {board} to the cosmic library! 🌌 View with `.listlink`! 📖")
-
-        # Custom Link Trigger
-        for link in links:
-            if link['trigger'] in content_lower:
-                hyperlink = f"[{link['notes_name']}]({link['file_link']})"
-                await message.channel.send(f"📎 Found a cosmic link! Notes: {hyperlink} for {link['notes_name']}! 🌟")
-                await log_action("Link Triggered", message.author, None, f"Trigger: {link['trigger']}, Notes: {link['notes_name']}, Link: {link['file_link']}")
-                break
+    bot_member_in_guild = modmail_channel.guild.me
+    if not bot_member_in_guild:
+        logger.error("Bot member not found in guild %s for modmail operations.", modmail_channel.guild.id)
+        await outbound.send(message.channel, "⚠️ The bot is not properly set up in the server for modmail. Please inform staff! 🛠️", priority=SEND_PRIORITY_MODMAIL)
+        return
 
-        # Modmail System
-        if isinstance(message.channel, discord.DMChannel):
-            ticket_id = None
-            # Find an existing open ticket for this user
-            for tid, ticket_data in modmail_tickets.items():
-                if ticket_data['user_id'] == str(message.author.id) and ticket_data['status'] == 'open':
-                    ticket_id = tid
-                    break
+    channel_perms = modmail_channel.permissions_for(bot_member_in_guild)
+    if not channel_perms.manage_threads:
+        await outbound.send(message.channel, "⚠️ I need `manage_threads` permission in the modmail channel to create tickets! 🛠️", priority=SEND_PRIORITY_MODMAIL)
+        return
 
-            modmail_channel = bot.get_channel(MODMAIL_CHANNEL_ID)
-            if not modmail_channel:
-                await message.channel.send(f"⚠️ Modmail channel not found! Please inform staff to set up channel ID {MODMAIL_CHANNEL_ID}. 🕳️")
-                return
+    if not ticket_id:
+        # No open ticket found, create a new one
+        try:
+            new_ticket_id = await id_allocator.next_id('ticket')
 
-            bot_member_in_guild = modmail_channel.guild.get_member(bot.user.id)
-            if not bot_member_in_guild:
-                logger.error(f"Bot member not found in guild {modmail_channel.guild.id} for modmail operations.")
-                await message.channel.send("⚠️ The bot is not properly set up in the server for modmail. Please inform staff! 🛠️")
-                return
+            thread = await modmail_channel.create_thread(
+                name=f"🌟 Modmail Ticket #{new_ticket_id} - {message.author.name}",
+                auto_archive_duration=1440, # Archive after 24 hours of inactivity
+                type=discord.ChannelType.private_thread # For private discussions with staff
+            )
 
-            channel_perms = modmail_channel.permissions_for(bot_member_in_guild)
-            if not channel_perms.manage_threads:
-                await message.channel.send("⚠️ I need `manage_threads` permission in the modmail channel to create tickets! 🛠️")
-                return
+            # Add user to the thread
+            await thread.add_user(message.author)
 
-            if not ticket_id:
-                # No open ticket found, create a new one
-                try:
-                    # Increment case_id_counter for a unique ticket_id
-                    global case_id_counter
-                    new_ticket_id = case_id_counter
-                    case_id_counter += 1
-
-                    thread = await modmail_channel.create_thread(
-                        name=f"🌟 Modmail Ticket #{new_ticket_id} - {message.author.name}",
-                        auto_archive_duration=1440, # Archive after 24 hours of inactivity
-                        type=discord.ChannelType.private_thread # For private discussions with staff
-                    )
-                    
-                    # Add user to the thread
-                    await thread.add_user(message.author)
-                    
-                    # Add staff members to the thread
-                    for member in modmail_channel.guild.members:
-                        if any(role.id in STAFF_ROLE_IDS for role in member.roles):
-                            await thread.add_user(member)
-
-                    modmail_tickets[str(new_ticket_id)] = { # Store as string key
-                        'user_id': str(message.author.id),
-                        'status': 'open',
-                        'thread_id': thread.id
-                    }
-                    await message.channel.send(f"📮 📖 Ticket #{new_ticket_id} opened! The cosmic crew will reply soon! 🌠")
-                    await log_action("Modmail Ticket Created", message.author, None, f"Ticket #{new_ticket_id} opened")
-                    ticket_id = str(new_ticket_id) # Set current ticket_id
-
-                except discord.Forbidden:
-                    await message.channel.send("⚠️ I need `manage_threads` permission in the modmail channel to create tickets! 🛠️")
-                    return
-                except Exception as e:
-                    logger.error(f"Error creating modmail ticket: {str(e)}")
-                    await message.channel.send(f"⚠️ Failed to create modmail ticket: {str(e)}. Try again! 🌟")
-                    await log_action("Error creating modmail ticket", message.author, None, str(e))
-                    return
-            
-            # Now, handle the message for the existing or newly created ticket
-            ticket = modmail_tickets[ticket_id]
-            thread = discord.utils.get(modmail_channel.threads, id=ticket['thread_id'])
-            
-            # If thread not found (e.g., deleted or bot restarted without proper persistence), try to refetch or create a new one
-            if not thread:
-                try:
-                    thread = await modmail_channel.guild.fetch_channel(ticket['thread_id'])
-                except discord.NotFound:
-                    logger.warning(f"Modmail thread {ticket['thread_id']} not found, attempting to recreate.")
-                    # Recreate thread if not found, but it's better to make this more robust
-                    # This is a fallback; persistent storage would avoid this
-                    await message.channel.send(f"⚠️ Warning: associated modmail thread for ticket #{ticket_id} not found. Attempting to recreate... 🕳️")
-                    
-                    try:
-                        staff_role = modmail_channel.guild.get_role(STAFF_ROLE_IDS[0])
-                        if not staff_role:
-                            await message.channel.send(f"⚠️ Staff role (ID: {STAFF_ROLE_IDS[0]}) not found! Please inform staff! 🌟")
-                            return
-
-                        thread = await modmail_channel.create_thread(
-                            name=f"🌟 Modmail Ticket #{ticket_id} - {message.author.name}",
-                            auto_archive_duration=1440,
-                            type=discord.ChannelType.private_thread
-                        )
-                        await thread.add_user(message.author)
-                        for member in modmail_channel.guild.members:
-                            if any(role.id in STAFF_ROLE_IDS for role in member.roles): # Corrected: `member.roles`
-                                await thread.add_user(member)
-                        ticket['thread_id'] = thread.id # Update thread ID in stored data
-                        await message.channel.send(f"✅ Recreated thread for ticket #{ticket_id}. Please resend your message if it wasn't delivered.")
-                        await log_action("Modmail Thread Recreated", message.author, None, f"Thread recreated for ticket #{ticket_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to recreate modmail thread for ticket {ticket_id}: {e}")
-                        await message.channel.send(f"⚠️ Failed to recreate modmail thread. Please contact staff directly or try again later. 🛠️")
-                        return
-
-            if ticket['status'] != 'open':
-                await message.channel.send(f"🔒 Ticket #{ticket_id} is closed. Wait for staff to reopen or start a new conversation with `.modmail`! 🌌")
-                return
+            # Add staff members to the thread
+            await add_staff_to_thread(thread)
 
-            embed = discord.Embed(
-                title=f"📬 Ticket #{ticket_id} Message from User",
-                description=message.content,
-                color=discord.Color.purple(),
-                timestamp=datetime.datetime.now(datetime.timezone.utc)
-            )
-            embed.set_author(name=message.author.display_name, icon_url=message.author.avatar.url if message.author.avatar else '')
-            await thread.send(embed=embed)
-
-        # Staff Modmail Replies
-        if isinstance(message.channel, discord.Thread) and message.channel.parent_id == MODMAIL_CHANNEL_ID:
-            ticket_id_found = None
-            for tid, ticket_data in modmail_tickets.items():
-                if ticket_data['thread_id'] == message.channel.id:
-                    ticket_id_found = tid
-                    break
+            modmail_tickets[str(new_ticket_id)] = { # Store as string key
+                'user_id': str(message.author.id),
+                'status': 'open',
+                'thread_id': thread.id
+            }
+            index_ticket(str(new_ticket_id), modmail_tickets[str(new_ticket_id)])
+            await outbound.send(message.channel, f"📮 📖 Ticket #{new_ticket_id} opened! The cosmic crew will reply soon! 🌠", priority=SEND_PRIORITY_MODMAIL)
+            await log_action("Modmail Ticket Created", message.author, None, f"Ticket #{new_ticket_id} opened")
+            ticket_id = str(new_ticket_id) # Set current ticket_id
+
+        except discord.Forbidden:
+            await outbound.send(message.channel, "⚠️ I need `manage_threads` permission in the modmail channel to create tickets! 🛠️", priority=SEND_PRIORITY_MODMAIL)
+            return
+        except Exception as e:
+            logger.error("Error creating modmail ticket: %s", e)
+            await outbound.send(message.channel, f"⚠️ Failed to create modmail ticket: {str(e)}. Try again! 🌟", priority=SEND_PRIORITY_MODMAIL)
+            await log_action("Error creating modmail ticket", message.author, None, str(e))
+            return
+
+    # Now, handle the message for the existing or newly created ticket
+    ticket = modmail_tickets[ticket_id]
+    thread = discord.utils.get(modmail_channel.threads, id=ticket['thread_id'])
+
+    # If thread not found (e.g., deleted or bot restarted without proper persistence), try to refetch or create a new one
+    if not thread:
+        try:
+            thread = await modmail_channel.guild.fetch_channel(ticket['thread_id'])
+        except discord.NotFound:
+            logger.warning("Modmail thread %s not found, attempting to recreate.", ticket['thread_id'])
+            # Recreate thread if not found, but it's better to make this more robust
+            # This is a fallback; persistent storage would avoid this
+            await outbound.send(message.channel, f"⚠️ Warning: associated modmail thread for ticket #{ticket_id} not found. Attempting to recreate... 🕳️", priority=SEND_PRIORITY_MODMAIL)
 
-            if not ticket_id_found:
-                await message.channel.send("⚠️ This thread isn’t an active modmail ticket! Please report this error if it persists. 🛠️")
-                return
+            try:
+                staff_role = modmail_channel.guild.get_role(STAFF_ROLE_IDS[0])
+                if not staff_role:
+                    await outbound.send(message.channel, f"⚠️ Staff role (ID: {STAFF_ROLE_IDS[0]}) not found! Please inform staff! 🌟", priority=SEND_PRIORITY_MODMAIL)
+                    return
 
-            ticket = modmail_tickets[ticket_id_found]
-            if ticket['status'] != 'open':
-                await message.channel.send("🔒 This ticket is closed! Use `.modmailopen <ticket_id>` to reopen! 🔓")
+                thread = await modmail_channel.create_thread(
+                    name=f"🌟 Modmail Ticket #{ticket_id} - {message.author.name}",
+                    auto_archive_duration=1440,
+                    type=discord.ChannelType.private_thread
+                )
+                await thread.add_user(message.author)
+                await add_staff_to_thread(thread)
+                ticket['thread_id'] = thread.id # Update thread ID in stored data
+                await outbound.send(message.channel, f"✅ Recreated thread for ticket #{ticket_id}. Please resend your message if it wasn't delivered.", priority=SEND_PRIORITY_MODMAIL)
+                await log_action("Modmail Thread Recreated", message.author, None, f"Thread recreated for ticket #{ticket_id}")
+            except Exception as e:
+                logger.error("Failed to recreate modmail thread for ticket %s: %s", ticket_id, e)
+                await outbound.send(message.channel, f"⚠️ Failed to recreate modmail thread. Please contact staff directly or try again later. 🛠️", priority=SEND_PRIORITY_MODMAIL)
                 return
 
-            # Prevent bot replies from being sent back to the user via modmail
-            if message.author.bot:
-                return
+    if ticket['status'] != 'open':
+        await outbound.send(message.channel, f"🔒 Ticket #{ticket_id} is closed. Wait for staff to reopen or start a new conversation with `.modmail`! 🌌", priority=SEND_PRIORITY_MODMAIL)
+        return
 
-            # Check if the author is a staff member
-            if message.guild and any(role.id in STAFF_ROLE_IDS for role in message.author.roles):
-                user = await bot.fetch_user(int(ticket['user_id'])) # Using fetch_user for more robust user retrieval
-                if not user:
-                    await message.channel.send("⚠️ User not found! They may have left the server. Cannot send reply. 🌌")
-                    return
+    embed = discord.Embed(
+        title=f"📬 Ticket #{ticket_id} Message from User",
+        description=message.content,
+        color=discord.Color.purple(),
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    embed.set_author(name=message.author.display_name, icon_url=message.author.avatar.url if message.author.avatar else '')
+    await outbound.send(thread, embed=embed, priority=SEND_PRIORITY_MODMAIL)
+
+# Staff Modmail Replies
+@message_handler(thread_parent_id=MODMAIL_CHANNEL_ID)
+async def handle_modmail_staff_reply(message, content_lower):
+    ticket_id_found = None
+    for tid, ticket_data in modmail_tickets.items():
+        if ticket_data['thread_id'] == message.channel.id:
+            ticket_id_found = tid
+            break
+
+    if not ticket_id_found:
+        await outbound.send(message.channel, "⚠️ This thread isn’t an active modmail ticket! Please report this error if it persists. 🛠️", priority=SEND_PRIORITY_MODMAIL)
+        return
 
-                embed = discord.Embed(
-                    title=f"📡 Ticket #{ticket_id_found} Reply from Staff",
-                    description=message.content,
-                    color=discord.Color.blue(),
-                    timestamp=datetime.datetime.now(datetime.timezone.utc)
-                )
-                embed.set_author(name=message.author.display_name, icon_url=message.author.avatar.url if message.author.avatar else None)
-                try:
-                    await user.send(embed=embed)
-                    await message.add_reaction("✅") # React with a checkmark to confirm sending
-                    await log_action("Modmail Reply Sent", user, message.author, f"Ticket #{ticket_id_found}: {message.content}")
-                except discord.Forbidden:
-                    await message.channel.send(f"⚠️ Could not send reply to {user.display_name}! Their DMs are disabled. 📖️")
-                    await message.add_reaction("❌") # React with an X to indicate failure
-                except Exception as e:
-                    logger.error(f"Error sending modmail reply: {e}")
-                    await message.channel.send(f"⚠️ An error occurred while sending the reply: {e}. Please try again.")
-                    await message.add_reaction("❌")
+    ticket = modmail_tickets[ticket_id_found]
+    if ticket['status'] != 'open':
+        await outbound.send(message.channel, "🔒 This ticket is closed! Use `.modmailopen <ticket_id>` to reopen! 🔓", priority=SEND_PRIORITY_MODMAIL)
+        return
 
+    # Check if the author is a staff member
+    if message.guild and any(role.id in STAFF_ROLE_IDS for role in message.author.roles):
+        user = await bot.fetch_user(int(ticket['user_id'])) # Using fetch_user for more robust user retrieval
+        if not user:
+            await outbound.send(message.channel, "⚠️ User not found! They may have left the server. Cannot send reply. 🌌", priority=SEND_PRIORITY_MODMAIL)
+            return
+
+        embed = discord.Embed(
+            title=f"📡 Ticket #{ticket_id_found} Reply from Staff",
+            description=message.content,
+            color=discord.Color.blue(),
+            timestamp=datetime.datetime.now(datetime.timezone.utc)
+        )
+        embed.set_author(name=message.author.display_name, icon_url=message.author.avatar.url if message.author.avatar else None)
+        try:
+            await outbound.send(user, embed=embed, priority=SEND_PRIORITY_MODMAIL)
+            await message.add_reaction("✅") # React with a checkmark to confirm sending
+            await log_action("Modmail Reply Sent", user, message.author, f"Ticket #{ticket_id_found}: {message.content}")
+        except discord.Forbidden:
+            await outbound.send(message.channel, f"⚠️ Could not send reply to {user.display_name}! Their DMs are disabled. 📖️", priority=SEND_PRIORITY_MODMAIL)
+            await message.add_reaction("❌") # React with an X to indicate failure
+        except Exception as e:
+            logger.error("Error sending modmail reply: %s", e)
+            await outbound.send(message.channel, f"⚠️ An error occurred while sending the reply: {e}. Please try again.", priority=SEND_PRIORITY_MODMAIL)
+            await message.add_reaction("❌")
+
+async def enforce_spam(message, reason):
+    """
+    Removes a spam message and escalates through the usual warning, infraction and timeout paths.
+    """
+    try:
+        member = message.author
+        try:
+            await message.delete()
+        except (discord.Forbidden, discord.NotFound):
+            pass
+        reason = f"Automod: {reason}"
+        case_id = await record_case("Warn", member, bot.user, reason)
+        infraction_count = add_warning(member.id, case_id, reason, bot.user.id)
+        await log_action("Automod Warn", member, bot.user, reason, f"Case ID: {case_id}, Infractions: {infraction_count}")
+        if infraction_count < SPAM_TIMEOUT_AFTER_INFRACTIONS:
+            await notify_user(member, "warned", reason)
+            return
+        minutes = min(SPAM_TIMEOUT_MINUTES * 2 ** (infraction_count - SPAM_TIMEOUT_AFTER_INFRACTIONS), SPAM_TIMEOUT_MAX_MINUTES)
+        try:
+            await member.timeout(datetime.timedelta(minutes=minutes), reason=reason)
+        except discord.Forbidden:
+            logger.warning("Automod could not time out %s: missing permissions or role too low", member)
+            return
+        case_id = await record_case("Timeout", member, bot.user, reason, f"Duration: {minutes} minutes")
+        await notify_user(member, "timed out", reason, minutes * 60)
+        await log_action("Automod Timeout", member, bot.user, reason, f"Case ID: {case_id}, Duration: {minutes} minutes")
     except Exception as e:
-        logger.error(f"Error in on_message: {str(e)}")
-        await message.channel.send(f"⚠️ A cosmic storm hit: {str(e)}. Try again or contact support! 🚖")
-        # Log the error, but be careful not to create a recursive loop if logging itself fails
-        await log_action("Error in on_message", message.author, None, str(e))
+        logger.error("Error in automod for %s: %s", message.author, e)
+        await log_action("Error in automod", message.author, None, str(e))
+
+@bot.event
+async def on_message(message):
+    """
+    Screens a message for spam, runs the matching feature handlers in the background, then processes commands.
+    """
+    if message.author.bot:
+        if is_bump_success(message):
+            await bump_tracker.record_bump(message.created_at.timestamp())
+            bumper = getattr(message.interaction_metadata, 'user', None)
+            await log_action("Server Bumped", bumper, None, f"Next bump reminder <t:{int(bump_tracker.last_bump_at + BUMP_COOLDOWN_SECONDS)}:R>")
+        return
+
+    pipeline_stats['messages'] += 1
+    content_lower = message.content.lower()
+    if message.guild:
+        # Staff are exempt, so their messages never take a slot in the detector
+        is_staff_author = has_staff_role(message.author)
+        if is_staff_author:
+            spam_reason = None
+            if message.author.id not in staff_roster.member_ids:
+                await staff_roster.add(message.author.id)
+        else:
+            mention_count = len(message.raw_mentions) + len(message.raw_role_mentions) + (1 if message.mention_everyone else 0)
+            spam_reason = spam_detector.check(message.author.id, content_lower, mention_count, content_lower.count('://'))
+        if spam_reason:
+            # Spam gets no auto-replies and no commands
+            task = asyncio.create_task(enforce_spam(message, spam_reason))
+            pending_handler_tasks.add(task)
+            task.add_done_callback(pending_handler_tasks.discard)
+            return
+    matching = [handler for handler in message_handlers if handler_matches(handler, message, content_lower)]
+    if matching:
+        task = asyncio.create_task(dispatch_message_handlers(message, content_lower, matching))
+        pending_handler_tasks.add(task)
+        task.add_done_callback(pending_handler_tasks.discard)
 
-    await bot.process_commands(message) # Process commands after custom message handling
+    await bot.process_commands(message) # Commands never wait on slow feature work
 
 @bot.event
 async def on_member_join(member):
@@ -770,16 +3528,24 @@ async def on_member_join(member):
             color=discord.Color.blue(),
             timestamp=datetime.datetime.now(datetime.timezone.utc)
         )
-        welcome_embed.set_thumbnail(url=member.avatar.url if member.avatar else None)
         welcome_embed.add_field(name="🚀 Get Started", value="Type `.help` to see all commands!", inline=False)
-        
+        card_file = None
+        if welcome_cards.available:
+            try:
+                card_file = discord.File(io.BytesIO(await welcome_cards.render(member)), filename='welcome.png')
+                welcome_embed.set_image(url="attachment://welcome.png")
+            except Exception as e:
+                logger.warning("Welcome card render failed for %s, sending a plain welcome: %s", member.name, e)
+        if card_file is None:
+            welcome_embed.set_thumbnail(url=member.avatar.url if member.avatar else None)
+
         try:
-            await welcome_channel.send(f"Welcome {member.mention}!", embed=welcome_embed)
-            logger.info(f"Sent welcome message to {member.name}")
+            await outbound.send(welcome_channel, f"Welcome {member.mention}!", embed=welcome_embed, file=card_file, priority=SEND_PRIORITY_REMINDER)
+            logger.info("Sent welcome message to %s", member.name)
         except discord.Forbidden:
-            logger.error(f"Bot lacks permission to send messages in welcome channel {WELCOME_CHANNEL_ID}!")
+            logger.error("Bot lacks permission to send messages in welcome channel %s!", WELCOME_CHANNEL_ID)
         except Exception as e:
-            logger.error(f"Error sending welcome message: {e}")
+            logger.error("Error sending welcome message: %s", e)
 
     default_role = member.guild.get_role(DEFAULT_ROLE_ID)
     if default_role:
@@ -788,41 +3554,198 @@ async def on_member_join(member):
             bot_member = member.guild.me
             if bot_member.top_role.position > default_role.position and bot_member.guild_permissions.manage_roles:
                 await member.add_roles(default_role)
-                logger.info(f"Assigned default role '{default_role.name}' to {member.name}")
+                logger.info("Assigned default role '%s' to %s", default_role.name, member.name)
             else:
-                logger.warning(f"Could not assign default role to {member.name}. Bot role too low or missing 'manage_roles' permission.")
+                logger.warning("Could not assign default role to %s. Bot role too low or missing 'manage_roles' permission.", member.name)
         except discord.Forbidden:
-            logger.error(f"Bot lacks permission to assign roles in guild {member.guild.name}!")
+            logger.error("Bot lacks permission to assign roles in guild %s!", member.guild.name)
         except Exception as e:
-            logger.error(f"Error assigning default role: {e}")
+            logger.error("Error assigning default role: %s", e)
+
+
+@bot.event
+async def on_member_ban(guild, user):
+    """
+    Keeps the banned-user autocomplete index current.
+    """
+    index_banned_user(user)
+
+@bot.event
+async def on_member_unban(guild, user):
+    unindex_banned_user(user)
+
+@bot.event
+async def on_member_update(before, after):
+    """
+    Keeps the staff roster current for cached members.
+    """
+    if has_staff_role(before) != has_staff_role(after):
+        await staff_roster.update(after.id, has_staff_role(after))
+
+@bot.event
+async def on_audit_log_entry_create(entry):
+    """
+    Keeps the staff roster current for role changes on members that aren't cached, which never
+    produce on_member_update.
+    """
+    if entry.action != discord.AuditLogAction.member_role_update or entry.target is None:
+        return
+    added = {role.id for role in getattr(entry.changes.after, 'roles', None) or ()}
+    removed = {role.id for role in getattr(entry.changes.before, 'roles', None) or ()}
+    if added.intersection(STAFF_ROLE_IDS):
+        await staff_roster.add(entry.target.id)
+    elif removed.intersection(STAFF_ROLE_IDS):
+        member = entry.guild.get_member(entry.target.id)
+        if member is None or not has_staff_role(member):
+            await staff_roster.discard(entry.target.id)
+
+@bot.event
+async def on_raw_member_remove(payload):
+    await staff_roster.discard(payload.user.id)
+
+@bot.event
+async def on_raw_reaction_add(payload):
+    """
+    Counts suggestion votes straight from the gateway event, without fetching the message.
+    """
+    await apply_suggestion_vote(payload, 1)
+
+@bot.event
+async def on_raw_reaction_remove(payload):
+    """
+    Removes a suggestion vote when a reaction is taken back.
+    """
+    await apply_suggestion_vote(payload, -1)
+
+async def apply_suggestion_vote(payload, delta):
+    """
+    Updates the in-memory vote counters for a suggestion and applies threshold-based status changes.
+    """
+    suggestion = suggestions_by_message.get(payload.message_id)
+    if suggestion is None or payload.user_id == bot.user.id:
+        return
+    emoji = str(payload.emoji)
+    if emoji == SUGGESTION_UPVOTE_EMOJI:
+        suggestion['upvotes'] = max(0, suggestion['upvotes'] + delta)
+    elif emoji == SUGGESTION_DOWNVOTE_EMOJI:
+        suggestion['downvotes'] = max(0, suggestion['downvotes'] + delta)
+    else:
+        return
+
+    if suggestion['status'] != 'pending':
+        return
+    score = suggestion['upvotes'] - suggestion['downvotes']
+    if score >= SUGGESTION_APPROVE_SCORE:
+        new_status = 'approved'
+    elif score <= SUGGESTION_REJECT_SCORE:
+        new_status = 'rejected'
+    else:
+        return
+
+    suggestion['status'] = new_status
+    channel = bot.get_channel(payload.channel_id)
+    if channel:
+        outbound.post(channel, f"🗳️ Suggestion #{suggestion['id']} has been auto-{new_status} by the community with a score of {score}! 🌟", priority=SEND_PRIORITY_AUTO_REPLY)
+    await log_action("Suggestion Auto-Status", None, None, f"Suggestion #{suggestion['id']} {new_status} (✅ {suggestion['upvotes']} / ❌ {suggestion['downvotes']})")
 
+@bot.event
+async def on_raw_message_delete(payload):
+    """
+    Cancels an in-progress AI reply when the prompt that triggered it is deleted.
+    """
+    task = ai_reply_tasks.pop(payload.message_id, None)
+    if task:
+        task.cancel()
 
 # --- Tasks ---
-@tasks.loop(hours=2)
-async def bump_reminder():
+async def send_bump_reminder():
     """
-    Sends a bump reminder message in the designated bump channel.
+    Sends a bump reminder message in the designated bump channel. Returns True if it was sent.
+    Scheduled by bump_tracker for when the bump cooldown ends.
     """
     channel = bot.get_channel(BUMP_CHANNEL_ID)
     role = channel.guild.get_role(BUMP_ROLE_ID) if channel else None
 
     if not channel or not role:
-        logger.error(f"Either bump channel {BUMP_CHANNEL_ID} or role {BUMP_ROLE_ID} not found for bump reminder!")
-        return
+        logger.error("Either bump channel %s or role %s not found for bump reminder!", BUMP_CHANNEL_ID, BUMP_ROLE_ID)
+        return False
 
     bot_member = channel.guild.me
     # Corrected permission check
     if not channel.permissions_for(bot_member).send_messages:
-        logger.error(f"Bot lacks permission to send bump reminder in channel {BUMP_CHANNEL_ID}!")
-        return
+        logger.error("Bot lacks permission to send bump reminder in channel %s!", BUMP_CHANNEL_ID)
+        return False
     try:
-        await channel.send(f"▴ **Bump Reminder**\nThe server can be bumped again!\n{role.mention}, bump the server by using `/bump`! 😖")
+        await outbound.send(channel, f"▴ **Bump Reminder**\nThe server can be bumped again!\n{role.mention}, bump the server by using `/bump`! 😖", priority=SEND_PRIORITY_REMINDER)
         await log_action("Bump Reminder", None, None, f"Sent bump reminder in {channel.name}")
+        return True
     except discord.Forbidden:
-        logger.error(f"Bot lacks permission to send bump reminder in channel {BUMP_CHANNEL_ID}! 🚖")
+        logger.error("Bot lacks permission to send bump reminder in channel %s! 🚖", BUMP_CHANNEL_ID)
     except Exception as e:
-        logger.error(f"Error in bump_reminder: {str(e)}")
+        logger.error("Error in bump_reminder: %s", e)
         await log_action("Error in bump_reminder", None, None, str(e))
+    return False
+
+@tasks.loop(minutes=DRIVE_SYNC_INTERVAL_MINUTES)
+async def sync_drive_library():
+    """
+    Pulls changes to the notes library from the Google Drive changes feed.
+    """
+    try:
+        changed = await drive_library.sync()
+        if changed:
+            logger.info("Drive library sync applied %d changes (%d files indexed)", changed, len(drive_library.files))
+    except Exception as e:
+        logger.error("Error in sync_drive_library: %s", e)
+        await log_action("Error in sync_drive_library", None, None, str(e))
+
+@tasks.loop(minutes=LINK_CHECK_INTERVAL_MINUTES)
+async def check_link_health():
+    """
+    Revalidates stored links whose cached result has expired and sends staff a digest of newly broken ones.
+    """
+    try:
+        newly_broken = await link_health.run_cycle([link['file_link'] for link in links if link['file_link'].startswith(('http://', 'https://'))])
+        if not newly_broken:
+            return
+        channel = bot.get_channel(MOD_LOG_CHANNEL_ID)
+        if not channel:
+            logger.warning("Found %d broken links but the mod log channel is missing", len(newly_broken))
+            return
+        broken_links = [link for link in links if link['file_link'] in newly_broken]
+        embed = discord.Embed(
+            title="🔗 Broken Link Digest",
+            description=f"{len(newly_broken)} link(s) stopped responding. Fix them with `.link` or check `.listlink`! 🛠️",
+            color=discord.Color.orange(),
+            timestamp=datetime.datetime.now(datetime.timezone.utc)
+        )
+        for link in broken_links[:LINK_DIGEST_MAX_ENTRIES]:
+            result = link_health.results[link['file_link']]
+            embed.add_field(name=f"{link['trigger']} — {link['notes_name']}", value=f"{link['file_link']}\n**Status:** {result['status']}", inline=False)
+        if len(broken_links) > LINK_DIGEST_MAX_ENTRIES:
+            embed.set_footer(text=f"...and {len(broken_links) - LINK_DIGEST_MAX_ENTRIES} more")
+        outbound.post(channel, embed=embed, priority=SEND_PRIORITY_LOG)
+    except Exception as e:
+        logger.error("Error in check_link_health: %s", e)
+        await log_action("Error in check_link_health", None, None, str(e))
+
+@check_link_health.after_loop
+async def close_link_health_session():
+    await link_health.close()
+
+@tasks.loop(minutes=SNAPSHOT_INTERVAL_MINUTES)
+async def snapshot_state():
+    """
+    Periodically refreshes the state snapshot so a crash loses at most a few minutes of state.
+    """
+    try:
+        await save_state_snapshot()
+    except Exception as e:
+        logger.error("Error in snapshot_state: %s", e)
+
+@snapshot_state.before_loop
+async def wait_before_first_snapshot():
+    await asyncio.sleep(SNAPSHOT_INTERVAL_MINUTES * 60)  # The state was just loaded; nothing new to save yet
 
 @tasks.loop(minutes=30)
 async def check_social_media():
@@ -834,12 +3757,12 @@ async def check_social_media():
     role = channel.guild.get_role(SOCIAL_MEDIA_ROLE_ID) if channel else None
 
     if not channel or not role:
-        logger.error(f"Either Social media channel {SOCIAL_MEDIA_CHANNEL_ID} or role {SOCIAL_MEDIA_ROLE_ID} not found! Skipping social media checks.")
+        logger.error("Either Social media channel %s or role %s not found! Skipping social media checks.", SOCIAL_MEDIA_CHANNEL_ID, SOCIAL_MEDIA_ROLE_ID)
         return
 
     bot_member = channel.guild.me
     if not channel.permissions_for(bot_member).send_messages:
-        logger.error(f"Bot lacks send_messages permission in social media channel {SOCIAL_MEDIA_CHANNEL_ID}! Skipping social media checks.")
+        logger.error("Bot lacks send_messages permission in social media channel %s! Skipping social media checks.", SOCIAL_MEDIA_CHANNEL_ID)
         return
 
     async with aiohttp.ClientSession() as session:
@@ -862,7 +3785,7 @@ async def check_social_media():
                                 embed.set_image(url=latest_post['media_url'])
                                 embed.set_footer(text="Follow us on Instagram: @your_instagram_handle") # Update Instagram handle
                                 view = SocialMediaView(latest_post['permalink'])
-                                await channel.send(f"{role.mention} A new post just landed on Instagram! 📖", embed=embed, view=view)
+                                await outbound.send(channel, f"{role.mention} A new post just landed on Instagram! 📖", embed=embed, view=view, priority=SEND_PRIORITY_REMINDER)
                                 await log_action("Instagram Update", None, None, reason=f"New post: {latest_post['id']}")
                                 last_instagram_post = latest_post['id']
                             elif not last_instagram_post:
@@ -870,7 +3793,7 @@ async def check_social_media():
                         else:
                             logger.warning("Instagram API returned no data.")
                     else:
-                        logger.warning(f"Failed to fetch Instagram posts: HTTP {resp.status} - {await resp.text()}")
+                        logger.warning("Failed to fetch Instagram posts: HTTP %s - %s", resp.status, await resp.text())
             else:
                 logger.info("Instagram token not set. Skipping Instagram updates.")
 
@@ -893,7 +3816,7 @@ async def check_social_media():
                                 embed.set_image(url=latest_video['snippet']['thumbnails']['high']['url']) # Corrected: Access from snippet
                                 embed.set_footer(text="Subscribe: @your_youtube_channel_handle") # Update YouTube handle
                                 view = SocialMediaView(f"https://www.youtube.com/watch?v={video_id}") # Corrected YouTube URL
-                                await channel.send(f"{role.mention} A new video just dropped on YouTube! 🚖", embed=embed, view=view)
+                                await outbound.send(channel, f"{role.mention} A new video just dropped on YouTube! 🚖", embed=embed, view=view, priority=SEND_PRIORITY_REMINDER)
                                 await log_action("YouTube Update", None, None, f"New video: {video_id}")
                                 last_youtube_video = video_id # Corrected: Use last_youtube_video
                             elif not last_youtube_video:
@@ -901,18 +3824,18 @@ async def check_social_media():
                         else:
                             logger.warning("YouTube API returned no data.")
                     else:
-                        logger.warning(f"Failed to fetch YouTube videos: HTTP {resp.status} - {await resp.text()}")
+                        logger.warning("Failed to fetch YouTube videos: HTTP %s - %s", resp.status, await resp.text())
             else:
                 if not YOUTUBE_API_KEY:
                     logger.info("YouTube API key not set. Skipping YouTube updates.")
                 elif YOUTUBE_CHANNEL_ID == 'UCYourChannelId':
                     logger.warning("YouTube Channel ID not updated. Skipping YouTube updates.")
         except Exception as e:
-            logger.error(f"Error in check_social_media: {str(e)}")
+            logger.error("Error in check_social_media: %s", e)
             await log_action("Error in check_social_media", None, None, str(e))
 
 # --- Help Commands ---
-@bot.command(name='help')
+@bot.hybrid_command(name='help')
 async def help_command(ctx, *, command_name: str = None):
     """
     Display this help menu or info about a specific command.
@@ -940,12 +3863,16 @@ async def help_command(ctx, *, command_name: str = None):
         embed = await view.get_embed()
         view.message = await ctx.send(embed=embed, view=view) # Store message for pagination
     except Exception as e:
-        logger.error(f"Error in help_command: {str(e)}")
+        logger.error("Error in help_command: %s", e)
         await ctx.send(f"⚠️ A cosmic storm hit: {str(e)}. Try again or contact support! 🚖")
         await log_action("Error in help_command", ctx.author, None, str(e))
 help_command.description = "Display this help menu or info about a specific command."
 help_command.usage = ".help [command]"
 
+@help_command.autocomplete('command_name')
+async def help_command_autocomplete(interaction: discord.Interaction, current: str):
+    return autocomplete_choices(command_name_index, current.lstrip('.'))
+
 
 @bot.command(name='helpallcmd', aliases=['allcommands', 'commands'])
 async def help_all_commands(ctx):
@@ -972,7 +3899,7 @@ async def help_all_commands(ctx):
         embed.set_footer(text=f"Requested by {ctx.author.display_name}", icon_url=ctx.author.avatar.url if ctx.author.avatar else None)
         await ctx.send(embed=embed)
     except Exception as e:
-        logger.error(f"Error in help_all_commands: {str(e)}")
+        logger.error("Error in help_all_commands: %s", e)
         await ctx.send(f"⚠️ A cosmic storm hit: {str(e)}. Try again! 🚖")
         await log_action("Error in help_all_commands", ctx.author, None, str(e))
 help_all_commands.description = "List all available commands."
@@ -995,26 +3922,12 @@ async def warn(ctx, member: discord.Member, *, reason: str = "No reason provided
     Warns a user and logs the warning.
     Usage: .warn <user> [reason]
     """
-    global case_id_counter
     try:
-        case_id = case_id_counter
-        case_id_counter += 1
-        warnings[member.id].append({
-            'case_id': case_id,
-            'reason': reason,
-            'moderator': ctx.author.id,
-            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat()
-        })
-        infractions[member.id] += 1
-        case_logs[case_id] = {
-            'action': 'Warn',
-            'target': member.id,
-            'moderator': ctx.author.id,
-            'reason': reason
-        }
+        case_id = await record_case("Warn", member, ctx.author, reason)
+        infraction_count = add_warning(member.id, case_id, reason, ctx.author.id)
         await ctx.send(f"✅ {member.mention} has been warned. Case ID: {case_id} 📜")
         await notify_user(member, "warned", reason)
-        await log_action("Warn", member, ctx.author, reason, f"Case ID: {case_id}, Infractions: {infractions[member.id]}")
+        await log_action("Warn", member, ctx.author, reason, f"Case ID: {case_id}, Infractions: {infraction_count}")
     except Exception as e:
         await ctx.send(f"⚠️ A cosmic storm hit: {str(e)}. Try again! 🚖")
         await log_action("Error in warn command", ctx.author, member, str(e))
@@ -1063,9 +3976,10 @@ async def timeout_command(ctx, member: discord.Member, minutes: int, *, reason:
 
         duration = datetime.timedelta(minutes=minutes)
         await member.timeout(duration, reason=reason)
-        await ctx.send(f"✅ {member.mention} has been timed out for {minutes} minutes! ⏰")
+        case_id = await record_case("Timeout", member, ctx.author, reason, f"Duration: {minutes} minutes")
+        await ctx.send(f"✅ {member.mention} has been timed out for {minutes} minutes! Case ID: {case_id} ⏰")
         await notify_user(member, "timed out", reason, duration.total_seconds())
-        await log_action("Timeout", member, ctx.author, reason, f"Duration: {minutes} minutes")
+        await log_action("Timeout", member, ctx.author, reason, f"Case ID: {case_id}, Duration: {minutes} minutes")
     except discord.Forbidden:
         await ctx.send("🚫 I don't have permission to timeout this user! My role might be lower than theirs, or I lack 'Moderate Members' permission. 🛠️")
         await log_action("Permission Error: Timeout", member, ctx.author, reason, "Bot lacks permissions")
@@ -1091,9 +4005,10 @@ async def kick(ctx, member: discord.Member, *, reason: str = "No reason provided
             return
 
         await member.kick(reason=reason)
-        await ctx.send(f"✅ {member.display_name} has been kicked from the galaxy! 🚀")
+        case_id = await record_case("Kick", member, ctx.author, reason)
+        await ctx.send(f"✅ {member.display_name} has been kicked from the galaxy! Case ID: {case_id} 🚀")
         await notify_user(member, "kicked", reason)
-        await log_action("Kick", member, ctx.author, reason)
+        await log_action("Kick", member, ctx.author, reason, f"Case ID: {case_id}")
     except discord.Forbidden:
         await ctx.send("🚫 I don't have permission to kick this user! My role might be lower than theirs, or I lack 'Kick Members' permission. 🛠️")
         await log_action("Permission Error: Kick", member, ctx.author, reason, "Bot lacks permissions")
@@ -1115,15 +4030,16 @@ async def ban(ctx, user: discord.User, *, reason: str = "No reason provided"): #
             return
         
         # If the user is in the guild, check role hierarchy
-        member = ctx.guild.get_member(user.id)
+        member = await resolve_member(ctx.guild, user.id)
         if member and ctx.author.top_role <= member.top_role and ctx.author.id != ctx.guild.owner_id:
             await ctx.send("🚫 You cannot ban someone with an equal or higher role than yourself! 🌠")
             return
 
         await ctx.guild.ban(user, reason=reason)
-        await ctx.send(f"✅ {user.display_name} has been banned from the cosmic realm! 🌌")
+        case_id = await record_case("Ban", user, ctx.author, reason)
+        await ctx.send(f"✅ {user.display_name} has been banned from the cosmic realm! Case ID: {case_id} 🌌")
         await notify_user(user, "banned", reason)
-        await log_action("Ban", user, ctx.author, reason)
+        await log_action("Ban", user, ctx.author, reason, f"Case ID: {case_id}")
     except discord.Forbidden:
         await ctx.send("🚫 I don't have permission to ban this user! My role might be lower than theirs, or I lack 'Ban Members' permission. 🛠️")
         await log_action("Permission Error: Ban", user, ctx.author, reason, "Bot lacks permissions")
@@ -1144,15 +4060,16 @@ async def tempban(ctx, user: discord.User, duration_seconds: int, *, reason: str
         if not await check_bot_permissions(ctx, {'ban_members': True}):
             return
         
-        member = ctx.guild.get_member(user.id)
+        member = await resolve_member(ctx.guild, user.id)
         if member and ctx.author.top_role <= member.top_role and ctx.author.id != ctx.guild.owner_id:
             await ctx.send("🚫 You cannot temporarily ban someone with an equal or higher role than yourself! 🌠")
             return
 
         await ctx.guild.ban(user, reason=f"Temporary ban: {reason} for {duration_seconds} seconds")
-        await ctx.send(f"✅ {user.display_name} has been temporarily banned for {duration_seconds} seconds! ⏳")
+        case_id = await record_case("Tempban", user, ctx.author, reason, f"Duration: {duration_seconds}s")
+        await ctx.send(f"✅ {user.display_name} has been temporarily banned for {duration_seconds} seconds! Case ID: {case_id} ⏳")
         await notify_user(user, "temporarily banned", reason, duration_seconds)
-        await log_action("Tempban", user, ctx.author, reason, f"Duration: {duration_seconds}s")
+        await log_action("Tempban", user, ctx.author, reason, f"Case ID: {case_id}, Duration: {duration_seconds}s")
 
         await asyncio.sleep(duration_seconds)
         await ctx.guild.unban(user, reason=f"Temporary ban expired for {reason}")
@@ -1186,9 +4103,10 @@ async def softban(ctx, member: discord.Member, *, reason: str = "No reason provi
 
         await member.ban(reason=reason, delete_message_days=7)
         await member.unban(reason="Softban: Rejoining allowed")
-        await ctx.send(f"✅ {member.display_name} has been softbanned! Their recent messages (last 7 days) have been purged. 🧹")
+        case_id = await record_case("Softban", member, ctx.author, reason)
+        await ctx.send(f"✅ {member.display_name} has been softbanned! Their recent messages (last 7 days) have been purged. Case ID: {case_id} 🧹")
         await notify_user(member, "softbanned", reason)
-        await log_action("Softban", member, ctx.author, reason)
+        await log_action("Softban", member, ctx.author, reason, f"Case ID: {case_id}")
     except discord.Forbidden:
         await ctx.send("🚫 I don't have permission to ban/unban this user! My role might be lower than theirs, or I lack 'Ban Members' permission. 🛠️")
         await log_action("Permission Error: Softban", member, ctx.author, reason, "Bot lacks permissions")
@@ -1199,13 +4117,19 @@ softban.description = "Softbans a user (kicks and deletes messages)."
 softban.usage = ".softban <user> [reason]"
 
 
-@bot.command(name='unban')
+@bot.hybrid_command(name='unban')
 @is_staff()
-async def unban(ctx, user_id: int, *, reason: str = "No reason provided"):
+async def unban(ctx, user_id: str, *, reason: str = "No reason provided"):
     """
     Unbans a user by their ID.
     Usage: .unban <user_id> [reason]
     """
+    if not user_id.isdigit():  # Taken as text: slash-command integers can't hold a snowflake
+        await ctx.send(f"⚠️ `{user_id}` isn't a valid user ID! 🕳️")
+        return
+    user_id = int(user_id)
+    user = None
+    await ctx.defer()  # Acknowledge the slash command before the user and ban list lookups
     try:
         if not await check_bot_permissions(ctx, {'ban_members': True}):
             return
@@ -1217,17 +4141,18 @@ async def unban(ctx, user_id: int, *, reason: str = "No reason provided"):
 
         # Check if the user is actually banned
         try:
-            banned_users = [entry.user for entry in await ctx.guild.bans()]
-            if user not in banned_users:
-                await ctx.send(f"⚠️ User {user.mention} (ID: `{user_id}`) is not currently banned. 🚫")
-                return
+            await ctx.guild.fetch_ban(user)
+        except discord.NotFound:
+            await ctx.send(f"⚠️ User {user.mention} (ID: `{user_id}`) is not currently banned. 🚫")
+            return
         except discord.Forbidden:
             await ctx.send("🚫 I don't have permission to view banned users. 🛠️")
             return
         
         await ctx.guild.unban(user, reason=reason)
-        await ctx.send(f"🎉 {user.display_name} (ID: `{user_id}`) has been unbanned! Welcome back to the galaxy! 🌌")
-        await log_action("Unban", user, ctx.author, reason)
+        case_id = await record_case("Unban", user, ctx.author, reason)
+        await ctx.send(f"🎉 {user.display_name} (ID: `{user_id}`) has been unbanned! Welcome back to the galaxy! Case ID: {case_id} 🌌")
+        await log_action("Unban", user, ctx.author, reason, f"Case ID: {case_id}")
     except discord.Forbidden:
         await ctx.send("🚫 I don't have permission to unban this user! I lack 'Ban Members' permission. 🛠️")
         await log_action("Permission Error: Unban", user, ctx.author, reason, "Bot lacks permissions")
@@ -1237,6 +4162,10 @@ async def unban(ctx, user_id: int, *, reason: str = "No reason provided"):
 unban.description = "Unbans a user by their ID."
 unban.usage = ".unban <user_id> [reason]"
 
+@unban.autocomplete('user_id')
+async def unban_autocomplete(interaction: discord.Interaction, current: str):
+    return autocomplete_choices(banned_user_index, current)
+
 
 @bot.command(name='slowmode')
 @is_staff()
@@ -1382,9 +4311,10 @@ async def profile(ctx, member: discord.Member = None):
     if member is None:
         member = ctx.author
 
-    rep = reputation[member.id]
-    user_warnings = warnings[member.id]
-    infraction_count = infractions[member.id]
+    # Lookups only; a profile view never creates records
+    rep = reputation.get(member.id)
+    user_warnings = warnings.get(member.id, ())
+    infraction_count = infractions.get(member.id)
 
     embed = discord.Embed(
         title=f"👤 Cosmic Profile: {member.display_name} 🌠",
@@ -1398,11 +4328,11 @@ async def profile(ctx, member: discord.Member = None):
     if user_warnings:
         warn_details = []
         for warn_entry in user_warnings:
-            moderator = await bot.fetch_user(warn_entry['moderator'])
-            warn_details.append(f"**Case ID**: {warn_entry['case_id']}\n"
-                                f"**Reason**: {warn_entry['reason']}\n"
+            moderator = await bot.fetch_user(warn_entry.moderator)
+            warn_details.append(f"**Case ID**: {warn_entry.case_id}\n"
+                                f"**Reason**: {warn_entry.reason}\n"
                                 f"**Moderator**: {moderator.mention if moderator else 'Unknown'}\n"
-                                f"**Timestamp**: {datetime.datetime.fromisoformat(warn_entry['timestamp']).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+                                f"**Timestamp**: {datetime.datetime.fromtimestamp(warn_entry.timestamp, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
         embed.add_field(name="📜 Warnings", value="\n\n".join(warn_details), inline=False)
     else:
         embed.add_field(name="📜 Warnings", value="No warnings recorded.", inline=False)
@@ -1412,6 +4342,114 @@ profile.description = "Displays the reputation and infraction profile of a user.
 profile.usage = ".profile [user]"
 
 
+class CaseQueryFlags(commands.FlagConverter):
+    target: discord.User = None
+    moderator: discord.User = None
+    action: str = None
+    since: str = None
+    until: str = None
+
+@bot.command(name='cases')
+@is_staff()
+async def list_cases(ctx, *, flags: CaseQueryFlags):
+    """
+    Searches moderation cases by target, moderator, action and date range.
+    Usage: .cases [target: <user>] [moderator: <user>] [action: <action>] [since: YYYY-MM-DD] [until: YYYY-MM-DD]
+    """
+    try:
+        since = parse_case_date(flags.since) if flags.since else None
+        # `until` is inclusive of the whole day
+        until = parse_case_date(flags.until) + 86400 if flags.until else None
+    except ValueError:
+        await ctx.send("⚠️ Dates must look like `YYYY-MM-DD`! 📅")
+        return
+
+    try:
+        filters = {
+            'target_id': flags.target.id if flags.target else None,
+            'moderator_id': flags.moderator.id if flags.moderator else None,
+            'action': flags.action,
+            'since': since,
+            'until': until
+        }
+        first_page = await case_store.query(**filters)
+        view = CaseLogView(ctx.author, filters, first_page)
+        view.message = await ctx.send(embed=view.get_embed(), view=view)
+    except Exception as e:
+        await ctx.send(f"⚠️ A cosmic storm hit: {str(e)}. Try again! 🚖")
+        await log_action("Error in cases command", ctx.author, None, str(e))
+list_cases.description = "Searches moderation cases with filters and pagination."
+list_cases.usage = ".cases [target: <user>] [moderator: <user>] [action: <action>] [since: YYYY-MM-DD] [until: YYYY-MM-DD]"
+
+
+@bot.command(name='case')
+@is_staff()
+async def show_case(ctx, case_id: int):
+    """
+    Shows a single moderation case by its ID.
+    Usage: .case <case_id>
+    """
+    case = await case_store.get(case_id)
+    if not case:
+        await ctx.send(f"⚠️ Case `{case_id}` not found! 🕳️")
+        return
+
+    embed = discord.Embed(
+        title=f"📜 Case #{case['case_id']} — {case['action']}",
+        description=format_case_summary(case),
+        color=discord.Color.dark_red(),
+        timestamp=datetime.datetime.fromtimestamp(case['created_at'], datetime.timezone.utc)
+    )
+    await ctx.send(embed=embed)
+show_case.description = "Shows a single moderation case by its ID."
+show_case.usage = ".case <case_id>"
+
+
+@bot.command(name='export')
+@is_staff()
+async def export_command(ctx, kind: str, fmt: str = 'jsonl', ticket_id: str = None):
+    """
+    Exports moderation history or a modmail transcript as a gzip-compressed JSONL/CSV file.
+    Usage: .export <cases|warnings|reputation|ticket> [jsonl|csv] [ticket_id]
+    """
+    kind = kind.lower()
+    fmt = fmt.lower()
+    if fmt not in ('jsonl', 'csv'):
+        await ctx.send("⚠️ Export format must be `jsonl` or `csv`! 📦")
+        return
+
+    if kind == 'cases':
+        rows = iter_cases()
+    elif kind == 'warnings':
+        rows = iter_warnings()
+    elif kind == 'reputation':
+        rows = iter_reputation()
+    elif kind == 'ticket':
+        if not ticket_id or ticket_id not in modmail_tickets:
+            await ctx.send(f"⚠️ Modmail ticket `{ticket_id}` not found! 🕳️")
+            return
+        try:
+            thread = await ctx.guild.fetch_channel(modmail_tickets[ticket_id]['thread_id'])
+        except (discord.NotFound, discord.Forbidden):
+            await ctx.send(f"⚠️ Associated thread for ticket `{ticket_id}` not found! 🕳️")
+            return
+        kind = 'transcript'
+        rows = iter_thread_messages(thread)
+    else:
+        await ctx.send("⚠️ Unknown export! Choose `cases`, `warnings`, `reputation` or `ticket`. 📦")
+        return
+
+    try:
+        status_message = await ctx.send(f"📦 Starting {kind} export... 🚀")
+        job_id = await start_export(kind, fmt, rows, ctx.channel, status_message)
+        await log_action("Export Started", None, ctx.author, f"Export #{job_id}: {kind} ({fmt})")
+    except Exception as e:
+        await ctx.send(f"⚠️ A cosmic storm hit: {str(e)}. Try again! 🚖")
+        await log_action("Error in export command", ctx.author, None, str(e))
+export_command.description = "Exports moderation history or a modmail transcript (Staff only)."
+export_command.usage = ".export <cases|warnings|reputation|ticket> [jsonl|csv] [ticket_id]"
+
+
 @bot.command(name='report')
 async def report(ctx, member: discord.Member, *, reason: str = "No reason provided"):
     """
@@ -1431,7 +4469,7 @@ async def report(ctx, member: discord.Member, *, reason: str = "No reason provid
             timestamp=datetime.datetime.now(datetime.timezone.utc)
         )
         report_embed.set_footer(text=f"Reported in #{ctx.channel.name}")
-        await mod_log_channel.send(embed=report_embed)
+        await outbound.send(mod_log_channel, embed=report_embed, priority=SEND_PRIORITY_MODERATION)
         await ctx.send(f"✅ {member.mention} has been reported to the cosmic authorities! We'll investigate! 🕵️‍♀️")
         await log_action("User Report", member, ctx.author, reason, f"Reported by: {ctx.author.display_name}")
     except discord.Forbidden:
@@ -1459,7 +4497,7 @@ report.usage = ".report <user> [reason]"
 # verify.description = "Initiates the verification process."
 # verify.usage = ".verify"
 
-@bot.command(name='modmailclose')
+@bot.hybrid_command(name='modmailclose')
 @is_staff()
 async def modmail_close(ctx, ticket_id: str = None):
     """
@@ -1485,25 +4523,36 @@ async def modmail_close(ctx, ticket_id: str = None):
         await ctx.send(f"⚠️ Ticket `{ticket_id}` is already closed! 🔒")
         return
 
+    await ctx.defer()  # Acknowledge the slash command before fetching the user and thread
     try:
         user_id = int(ticket['user_id'])
         user = await bot.fetch_user(user_id) # Fetch user
         thread = discord.utils.get(ctx.guild.threads, id=ticket['thread_id'])
         
         ticket['status'] = 'closed'
+        index_ticket(ticket_id, ticket)
         # Log and notify
         await ctx.send(f"✅ Modmail ticket `{ticket_id}` closed! 🔒")
         if user:
             try:
-                await user.send(f"🔒 Your modmail ticket `{ticket_id}` has been closed by {ctx.author.mention}. If you need further assistance, open a new ticket with `.modmail`!")
+                await outbound.send(user, f"🔒 Your modmail ticket `{ticket_id}` has been closed by {ctx.author.mention}. If you need further assistance, open a new ticket with `.modmail`!", priority=SEND_PRIORITY_MODMAIL)
             except discord.Forbidden:
-                logger.warning(f"Could not DM user {user.id} about modmail closure.")
+                logger.warning("Could not DM user %s about modmail closure.", user.id)
         if thread:
             try:
                 await thread.edit(locked=True, archived=True, reason=f"Modmail ticket {ticket_id} closed by {ctx.author.name}")
-                await thread.send(f"🔒 This modmail ticket has been closed by {ctx.author.mention}. It is now archived.")
+                await outbound.send(thread, f"🔒 This modmail ticket has been closed by {ctx.author.mention}. It is now archived.", priority=SEND_PRIORITY_MODMAIL)
             except discord.Forbidden:
-                logger.error(f"Bot lacks permissions to lock/archive thread {thread.id}")
+                logger.error("Bot lacks permissions to lock/archive thread %s", thread.id)
+        else:
+            try:
+                thread = await ctx.guild.fetch_channel(ticket['thread_id'])
+            except (discord.NotFound, discord.Forbidden):
+                logger.warning("Modmail thread %s not found; no transcript saved for ticket #%s.", ticket['thread_id'], ticket_id)
+        mod_log_channel = bot.get_channel(MOD_LOG_CHANNEL_ID)
+        if thread and mod_log_channel:
+            # Save a transcript in the background; it's attached to the mod log when done
+            await start_export('transcript', 'jsonl', iter_thread_messages(thread), mod_log_channel)
         await log_action("Modmail Close", user, ctx.author, f"Ticket #{ticket_id} closed")
     except Exception as e:
         await ctx.send(f"⚠️ A cosmic storm hit: {str(e)}. Try again! 🚖")
@@ -1511,8 +4560,12 @@ async def modmail_close(ctx, ticket_id: str = None):
 modmail_close.description = "Closes an open modmail ticket."
 modmail_close.usage = ".modmailclose [ticket_id]"
 
+@modmail_close.autocomplete('ticket_id')
+async def modmail_close_autocomplete(interaction: discord.Interaction, current: str):
+    return autocomplete_choices(ticket_indexes['open'], current.lstrip('#'))
+
 
-@bot.command(name='modmailopen')
+@bot.hybrid_command(name='modmailopen')
 @is_staff()
 async def modmail_open(ctx, ticket_id: str):
     """
@@ -1528,6 +4581,7 @@ async def modmail_open(ctx, ticket_id: str):
         await ctx.send(f"⚠️ Ticket `{ticket_id}` is already open! 🔓")
         return
 
+    await ctx.defer()  # Acknowledge the slash command before fetching the user and thread
     try:
         user_id = int(ticket['user_id'])
         user = await bot.fetch_user(user_id) # Fetch user
@@ -1547,16 +4601,17 @@ async def modmail_open(ctx, ticket_id: str):
                 return
 
         ticket['status'] = 'open'
+        index_ticket(ticket_id, ticket)
         # Unarchive and unlock the thread
         await thread.edit(locked=False, archived=False, reason=f"Modmail ticket {ticket_id} reopened by {ctx.author.name}")
         await ctx.send(f"✅ Modmail ticket `{ticket_id}` reopened! 🔓")
         if user:
             try:
-                await user.send(f"🔓 Your modmail ticket `{ticket_id}` has been reopened by {ctx.author.mention}. You can now send messages again.")
+                await outbound.send(user, f"🔓 Your modmail ticket `{ticket_id}` has been reopened by {ctx.author.mention}. You can now send messages again.", priority=SEND_PRIORITY_MODMAIL)
             except discord.Forbidden:
-                logger.warning(f"Could not DM user {user.id} about modmail reopening.")
+                logger.warning("Could not DM user %s about modmail reopening.", user.id)
         
-        await thread.send(f"🔓 This modmail ticket has been reopened by {ctx.author.mention}.")
+        await outbound.send(thread, f"🔓 This modmail ticket has been reopened by {ctx.author.mention}.", priority=SEND_PRIORITY_MODMAIL)
         await log_action("Modmail Open", user, ctx.author, f"Ticket #{ticket_id} reopened")
     except Exception as e:
         await ctx.send(f"⚠️ A cosmic storm hit: {str(e)}. Try again! 🚖")
@@ -1564,11 +4619,15 @@ async def modmail_open(ctx, ticket_id: str):
 modmail_open.description = "Reopens a closed modmail ticket."
 modmail_open.usage = ".modmailopen <ticket_id>"
 
+@modmail_open.autocomplete('ticket_id')
+async def modmail_open_autocomplete(interaction: discord.Interaction, current: str):
+    return autocomplete_choices(ticket_indexes['closed'], current.lstrip('#'))
+
 # --- Status Commands ---
 @bot.command(name='free', aliases=['f'])
 async def set_status_free(ctx):
     """Set your status to 'Free ✅'."""
-    user_statuses[ctx.author.id] = "Free ✅"
+    set_user_status(ctx.author.id, "Free ✅")
     await ctx.send("✅ Your status has been set to `Free ✅`! Ready to shine! ✨")
     await update_status_board()
 set_status_free.description = "Set your status to 'Free ✅'."
@@ -1577,7 +4636,7 @@ set_status_free.usage = ".free"
 @bot.command(name='sleeping', aliases=['s'])
 async def set_status_sleeping(ctx):
     """Set your status to 'Sleeping 😴'."""
-    user_statuses[ctx.author.id] = "Sleeping 😴"
+    set_user_status(ctx.author.id, "Sleeping 😴")
     await ctx.send("😴 Your status has been set to `Sleeping 😴`! Sweet dreams! 🌙")
     await update_status_board()
 set_status_sleeping.description = "Set your status to 'Sleeping 😴'."
@@ -1586,7 +4645,7 @@ set_status_sleeping.usage = ".sleeping"
 @bot.command(name='dolater', aliases=['d'])
 async def set_status_dolater(ctx):
     """Set your status to 'Do Later 🚧'."""
-    user_statuses[ctx.author.id] = "Do Later 🚧"
+    set_user_status(ctx.author.id, "Do Later 🚧")
     await ctx.send("🚧 Your status has been set to `Do Later 🚧`! On a cosmic mission! 🪐")
     await update_status_board()
 set_status_dolater.description = "Set your status to 'Do Later 🚧'."
@@ -1595,7 +4654,7 @@ set_status_dolater.usage = ".dolater"
 @bot.command(name='studying', aliases=['st'])
 async def set_status_studying(ctx):
     """Set your status to 'Studying 📚'."""
-    user_statuses[ctx.author.id] = "Studying 📚"
+    set_user_status(ctx.author.id, "Studying 📚")
     await ctx.send("📚 Your status has been set to `Studying 📚`! Dive into knowledge! 🧠")
     await update_status_board()
 set_status_studying.description = "Set your status to 'Studying 📚'."
@@ -1604,7 +4663,7 @@ set_status_studying.usage = ".studying"
 @bot.command(name='outside', aliases=['o'])
 async def set_status_outside(ctx):
     """Set your status to 'Outside 🚶‍♂️'."""
-    user_statuses[ctx.author.id] = "Outside 🚶‍♂️"
+    set_user_status(ctx.author.id, "Outside 🚶‍♂️")
     await ctx.send("🚶‍♂️ Your status has been set to `Outside 🚶‍♂️`! Stargazing IRL! 🍃")
     await update_status_board()
 set_status_outside.description = "Set your status to 'Outside 🚶‍♂️'."
@@ -1613,7 +4672,7 @@ set_status_outside.usage = ".outside"
 @bot.command(name='break', aliases=['b'])
 async def set_status_break(ctx):
     """Set your status to 'On Break ☕'."""
-    user_statuses[ctx.author.id] = "On Break ☕"
+    set_user_status(ctx.author.id, "On Break ☕")
     await ctx.send("☕ Your status has been set to `On Break ☕`! Chilling in a nebula lounge! 🛋️")
     await update_status_board()
 set_status_break.description = "Set your status to 'On Break ☕'."
@@ -1622,8 +4681,8 @@ set_status_break.usage = ".break"
 @bot.command(name='clearstatus')
 async def clear_status(ctx):
     """Clear your current status."""
-    if ctx.author.id in user_statuses:
-        del user_statuses[ctx.author.id]
+    if get_user_status(ctx.author.id) is not None:
+        clear_user_status(ctx.author.id)
         await ctx.send("❌ Your cosmic status has been cleared! 🌌")
         await update_status_board()
     else:
@@ -1632,6 +4691,84 @@ clear_status.description = "Clear your current status."
 clear_status.usage = ".clearstatus"
 
 # --- Other Commands ---
+def is_transient_error(error):
+    """
+    True for failures worth retrying: Discord 5xx responses, rate limits and connection errors.
+    Other 4xx responses (bad request, missing permissions, unknown message) won't change on retry.
+    """
+    if isinstance(error, discord.HTTPException):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+async def retry_suggestion_step(description, step, recover=None):
+    """
+    Runs a suggestion setup step, retrying transient failures with exponential backoff.
+    A failed attempt may still have succeeded server-side, so before each retry the optional
+    recover() coroutine can look the result up; a non-None result is returned instead of retrying.
+    Returns the step's result, or None if it ultimately failed.
+    """
+    for attempt in range(1, SUGGESTION_RETRY_ATTEMPTS + 1):
+        try:
+            return await step()
+        except discord.Forbidden:
+            logger.warning("Bot lacks permissions to %s. Check the suggestion channel permissions!", description)
+            return None
+        except Exception as e:
+            if not is_transient_error(e) or attempt == SUGGESTION_RETRY_ATTEMPTS:
+                logger.error("Failed to %s after %s attempts: %s", description, attempt, e)
+                await log_action("Error in suggestion setup", None, None, f"Failed to {description}: {e}")
+                return None
+            await asyncio.sleep(2 ** attempt)
+            if recover:
+                try:
+                    result = await recover()
+                except Exception as lookup_error:
+                    logger.warning("Couldn't check whether %s already succeeded: %s", description, lookup_error)
+                else:
+                    if result is not None:
+                        return result
+
+async def find_message_thread(message):
+    """
+    Returns the thread started from a message, or None if there isn't one.
+    """
+    thread = message.guild.get_thread(message.id)  # Message threads share the starter message's ID
+    if thread:
+        return thread
+    try:
+        return await message.guild.fetch_channel(message.id)
+    except discord.NotFound:
+        return None
+
+async def finish_suggestion_setup(suggestion_message, suggestion_id, suggestion_text, author):
+    """
+    Adds the vote reactions, opens the discussion thread and logs the suggestion concurrently.
+    """
+    async def add_vote_reactions():
+        # Sequential on purpose so ✅ always shows before ❌
+        await retry_suggestion_step(f"add ✅ to suggestion #{suggestion_id}", lambda: suggestion_message.add_reaction(SUGGESTION_UPVOTE_EMOJI))
+        await retry_suggestion_step(f"add ❌ to suggestion #{suggestion_id}", lambda: suggestion_message.add_reaction(SUGGESTION_DOWNVOTE_EMOJI))
+
+    async def open_discussion_thread():
+        # Threads can't live in categories, so the discussion thread hangs off the suggestion message
+        discussion_thread = await retry_suggestion_step(
+            f"create a discussion thread for suggestion #{suggestion_id}",
+            lambda: suggestion_message.create_thread(name=f"Suggestion-#{suggestion_id}-Discussion", auto_archive_duration=1440), # 24 hours
+            recover=lambda: find_message_thread(suggestion_message)
+        )
+        if discussion_thread:
+            await retry_suggestion_step(
+                f"post in the discussion thread for suggestion #{suggestion_id}",
+                lambda: discussion_thread.send(f"This is a private discussion thread for suggestion #{suggestion_id}. Staff can discuss here.")
+            )
+            logger.info("Created discussion thread for suggestion #%s", suggestion_id)
+
+    await asyncio.gather(
+        add_vote_reactions(),
+        open_discussion_thread(),
+        log_action("Suggestion Submitted", author, None, f"Suggestion #{suggestion_id}: {suggestion_text}")
+    )
+
 @bot.command(name='suggest')
 async def suggest(ctx, *, suggestion_text: str):
     """
@@ -1639,19 +4776,13 @@ async def suggest(ctx, *, suggestion_text: str):
     Usage: .suggest <your suggestion>
     """
     suggestion_channel = bot.get_channel(SUGGESTION_CHANNEL_ID)
-    suggestion_category = bot.get_channel(SUGGESTION_CATEGORY_ID)
 
     if not suggestion_channel:
         await ctx.send(f"⚠️ Suggestion channel with ID {SUGGESTION_CHANNEL_ID} not found! Please inform staff. 🕳️")
         return
-    if not suggestion_category:
-        await ctx.send(f"⚠️ Suggestion discussion category with ID {SUGGESTION_CATEGORY_ID} not found! Please inform staff. 🕳️")
-        return
 
     try:
-        global case_id_counter # Reusing case_id_counter for suggestions for simplicity
-        suggestion_id = case_id_counter
-        case_id_counter += 1
+        suggestion_id = await id_allocator.next_id('suggestion')
 
         embed = discord.Embed(
             title=f"💡 New Cosmic Suggestion #{suggestion_id} 🌟",
@@ -1663,40 +4794,27 @@ async def suggest(ctx, *, suggestion_text: str):
         embed.set_footer(text="React with ✅ to approve, ❌ to disapprove.")
 
         suggestion_message = await suggestion_channel.send(embed=embed)
-        await suggestion_message.add_reaction("✅")
-        await suggestion_message.add_reaction("❌")
 
-        suggestions.append({
+        suggestion = {
             'id': suggestion_id,
             'text': suggestion_text,
             'author_id': ctx.author.id,
             'message_id': suggestion_message.id,
             'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
-            'status': 'pending'
-        })
-        
-        # Create a private thread for discussion (optional, based on SUGGESTION_CATEGORY_ID usage)
-        if suggestion_category:
-            try:
-                # Create a thread under the suggestion channel, but put it in the category
-                # Note: Threads cannot directly be created in categories, they are created in channels.
-                # If SUGGESTION_CATEGORY_ID is meant for private discussion, the channel must be within that category.
-                # A common approach is to create a thread from the suggestion message.
-                discussion_thread = await suggestion_message.create_thread(
-                    name=f"Suggestion-#{suggestion_id}-Discussion",
-                    auto_archive_duration=1440 # 24 hours
-                )
-                await discussion_thread.send(f"This is a private discussion thread for suggestion #{suggestion_id}. Staff can discuss here.")
-                logger.info(f"Created discussion thread for suggestion #{suggestion_id}")
-            except discord.Forbidden:
-                logger.warning(f"Bot lacks permissions to create thread for suggestion in channel {suggestion_channel.id}. Check 'create_private_threads' or 'create_public_threads'.")
-            except Exception as e:
-                logger.error(f"Error creating discussion thread for suggestion: {e}")
+            'status': 'pending',
+            'upvotes': 0,
+            'downvotes': 0
+        }
+        suggestions.append(suggestion)
+        suggestions_by_message[suggestion_message.id] = suggestion
 
+        # The rest of the setup runs in the background, started before the confirmation so a slow reply can't hold it up
+        task = asyncio.create_task(finish_suggestion_setup(suggestion_message, suggestion_id, suggestion_text, ctx.author))
+        suggestion_tasks.add(task)
+        task.add_done_callback(suggestion_tasks.discard)
         await ctx.send(f"✅ Your cosmic suggestion #{suggestion_id} has been submitted! Thank you for helping shape our galaxy! 🌟")
-        await log_action("Suggestion Submitted", ctx.author, None, f"Suggestion #{suggestion_id}: {suggestion_text}")
     except discord.Forbidden:
-        await ctx.send("🚫 I don't have permission to send messages or add reactions in the suggestion channel. 🛠️")
+        await ctx.send("🚫 I don't have permission to send messages in the suggestion channel. 🛠️")
     except Exception as e:
         await ctx.send(f"⚠️ A cosmic storm hit: {str(e)}. Try again! 🚖")
         await log_action("Error in suggest command", ctx.author, None, str(e))
@@ -1704,19 +4822,62 @@ suggest.description = "Submit a suggestion for the server."
 suggest.usage = ".suggest <your suggestion>"
 
 
-@bot.command(name='link')
+@bot.command(name='topsuggestions')
+async def top_suggestions(ctx, count: int = 5):
+    """
+    Ranks pending suggestions by their live vote score.
+    Usage: .topsuggestions [count=5]
+    """
+    count = max(1, min(count, 25))
+    pending = [suggestion for suggestion in suggestions if suggestion['status'] == 'pending']
+    ranked = heapq.nlargest(count, pending, key=lambda suggestion: (suggestion['upvotes'] - suggestion['downvotes'], suggestion['upvotes']))
+
+    embed = discord.Embed(
+        title="🏆 Top Cosmic Suggestions 🏆",
+        color=discord.Color.gold(),
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    if not ranked:
+        embed.add_field(name="🌌 Cosmic Void", value="No pending suggestions yet! Submit one with `.suggest`. 💡", inline=False)
+    for rank, suggestion in enumerate(ranked, start=1):
+        text = suggestion['text'] if len(suggestion['text']) <= 200 else suggestion['text'][:197] + "..."
+        embed.add_field(
+            name=f"#{rank} — Suggestion #{suggestion['id']} (score {suggestion['upvotes'] - suggestion['downvotes']})",
+            value=f"{text}\n✅ {suggestion['upvotes']} | ❌ {suggestion['downvotes']}",
+            inline=False
+        )
+    await ctx.send(embed=embed)
+top_suggestions.description = "Ranks pending suggestions by vote score."
+top_suggestions.usage = ".topsuggestions [count]"
+
+
+@bot.hybrid_command(name='link')
 @is_staff()
 async def add_link(ctx, trigger: str, notes_name: str, file_link: str):
     """
     Adds a custom link to the bot's memory for quick sharing.
+    The file link may also be the exact name of a file in the synced Drive library.
     Usage: .link <trigger_word> <notes_name> <file_link>
     """
+    await ctx.defer()  # Acknowledge the slash command before anything slow runs
+    if drive_library and not file_link.startswith(('http://', 'https://')):
+        found = drive_library.find_by_name(file_link)
+        if not found:
+            await ctx.send(f"⚠️ No file named '{file_link}' in the cosmic Drive library! Use a link or an exact file name. 🕳️")
+            return
+        file_link = found[1]['web_link'] or found[0]
     links.append({'trigger': trigger.lower(), 'notes_name': notes_name, 'file_link': file_link, 'user': ctx.author.id, 'channel': ctx.channel.id})
+    link_trigger_index.add(trigger, trigger.lower(), f"{trigger.lower()} → {notes_name}")
     await ctx.send(f"📚 Here's your requested link: '{trigger}' added for '{notes_name}'! 📎")
     await log_action("Link Added", ctx.author, None, f"Trigger: {trigger}, Notes: {notes_name}, Link: {file_link}")
 add_link.description = "Adds a custom link for quick sharing."
 add_link.usage = ".link <trigger_word> <notes_name> <file_link>"
 
+@add_link.autocomplete('trigger')
+async def add_link_autocomplete(interaction: discord.Interaction, current: str):
+    # Shows existing triggers so staff don't register near-duplicates
+    return autocomplete_choices(link_trigger_index, current)
+
 @bot.command(name='listlink')
 async def list_links(ctx):
     """
@@ -1736,9 +4897,12 @@ async def list_links(ctx):
 
     for idx, link_data in enumerate(links):
         user = bot.get_user(link_data['user'])
+        health = ""
+        if link_health.is_broken(link_data['file_link']):
+            health = f"\n⚠️ **Broken** (last check: {link_health.results[link_data['file_link']]['status']})"
         embed.add_field(
             name=f"Link #{idx+1}: {link_data['trigger']}",
-            value=f"**Notes:** [{link_data['notes_name']}]({link_data['file_link']})\n**Added by:** {user.mention if user else 'Unknown User'}",
+            value=f"**Notes:** [{link_data['notes_name']}]({link_data['file_link']})\n**Added by:** {user.mention if user else 'Unknown User'}{health}",
             inline=False
         )
     await ctx.send(embed=embed)
@@ -1785,6 +4949,38 @@ async def sync_commands(ctx):
 sync_commands.description = "Syncs slash commands to Discord."
 sync_commands.usage = ".sync"
 
+@bot.command(name='profile-capture')
+@commands.is_owner() # Only bot owner can run this command
+async def profile_capture(ctx, seconds: int = 10):
+    """
+    Samples the live event loop for a few seconds and uploads a flamegraph-ready collapsed-stack file.
+    Usage: .profile-capture <seconds>
+    """
+    if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+        await ctx.send(f"⚠️ Capture length must be between 1 and {PROFILE_MAX_SECONDS} seconds! ⏱️")
+        return
+    if loop_profiler.running:
+        await ctx.send("⚠️ A profiler capture is already orbiting! Wait for it to finish. 🛰️")
+        return
+    await ctx.send(f"🔬 Profiling the cosmic event loop for {seconds}s... 🌌")
+    try:
+        collapsed, slow_callbacks, samples = await loop_profiler.capture(seconds)
+        files = [discord.File(io.BytesIO('\n'.join(collapsed).encode('utf-8')), filename='profile.collapsed')]
+        if slow_callbacks:
+            files.append(discord.File(io.BytesIO('\n'.join(slow_callbacks).encode('utf-8')), filename='slow_callbacks.txt'))
+        await ctx.send(
+            f"✅ Captured {samples} samples across {len(collapsed)} unique stacks; "
+            f"{len(slow_callbacks)} callbacks took longer than {PROFILE_SLOW_CALLBACK_SECONDS * 1000:.0f}ms. "
+            "Feed `profile.collapsed` to flamegraph.pl or speedscope! 🔥",
+            files=files
+        )
+        await log_action("Profile Capture", ctx.author, None, f"{seconds}s capture, {samples} samples, {len(slow_callbacks)} slow callbacks")
+    except Exception as e:
+        await ctx.send(f"⚠️ A cosmic storm hit during the capture: {str(e)}. Try again! 🚖")
+        await log_action("Error Capturing Profile", ctx.author, None, str(e))
+profile_capture.description = "Captures a sampling profile of the event loop (owner only)."
+profile_capture.usage = ".profile-capture <seconds>"
+
 @bot.command(name='guide')
 async def show_guide(ctx):
     """
@@ -1809,6 +5005,113 @@ async def ping(ctx):
 ping.description = "Checks the bot's latency."
 ping.usage = ".ping"
 
+@bot.command(name='sendstats')
+@is_staff()
+async def send_stats(ctx):
+    """
+    Shows per-queue latency metrics for the outbound send dispatcher (Staff only).
+    Usage: .sendstats
+    """
+    metrics = outbound.metrics()
+    embed = discord.Embed(
+        title="📬 Cosmic Outbound Queues 📬",
+        description=f"In flight: {outbound.in_flight}/{outbound.max_in_flight} | Waiting for a slot: {len(outbound.gate_waiters)}",
+        color=discord.Color.teal(),
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    if not metrics:
+        embed.add_field(name="🌌 Cosmic Void", value="No messages have gone through the dispatcher yet.", inline=False)
+    else:
+        # Show the slowest queues first
+        for (destination_id, priority), stats in sorted(metrics.items(), key=lambda item: item[1]['p99_ms'], reverse=True)[:10]:
+            embed.add_field(
+                name=f"🛰️ {destination_id} ({SEND_PRIORITY_NAMES.get(priority, priority)})",
+                value=f"**Sent:** {stats['sent']} (+{stats['merged']} merged) | **Pending:** {stats['pending']}\n"
+                      f"**p50:** {stats['p50_ms']:.0f}ms | **p99:** {stats['p99_ms']:.0f}ms | **Max:** {stats['max_ms']:.0f}ms",
+                inline=False
+            )
+    await ctx.send(embed=embed)
+send_stats.description = "Shows outbound send queue latency metrics (Staff only)."
+send_stats.usage = ".sendstats"
+
+@bot.command(name='handlerstats')
+@is_staff()
+async def handler_stats_command(ctx):
+    """
+    Shows per-handler cost for the on_message pipeline (Staff only).
+    Usage: .handlerstats
+    """
+    messages = pipeline_stats['messages']
+    uptime = max(time.monotonic() - pipeline_stats['started_at'], 1e-9)
+    outbound_sends = outbound.total_sent
+    embed = discord.Embed(
+        title="⚙️ Cosmic Message Handlers ⚙️",
+        description=f"{len(message_handlers)} handlers registered | {len(pending_handler_tasks)} batches in flight\n"
+                    f"{messages} messages ({messages / uptime:.2f}/sec) | {outbound_sends / messages if messages else 0:.2f} outbound sends per message",
+        color=discord.Color.teal(),
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    for handler in message_handlers:
+        stats = handler_stats[handler['name']]
+        average_ms = stats['total_ms'] / stats['runs'] if stats['runs'] else 0.0
+        samples = sorted(stats['samples'])
+        p50 = samples[len(samples) // 2] if samples else 0.0
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0
+        embed.add_field(
+            name=f"🛰️ {handler['name']}",
+            value=f"**Runs:** {stats['runs']} | **Errors:** {stats['errors']}\n**Avg:** {average_ms:.1f}ms | **p50:** {p50:.1f}ms | **p99:** {p99:.1f}ms | **Max:** {stats['max_ms']:.1f}ms",
+            inline=True
+        )
+    await ctx.send(embed=embed)
+handler_stats_command.description = "Shows on_message handler cost metrics (Staff only)."
+handler_stats_command.usage = ".handlerstats"
+
+@bot.command(name='aistats')
+@is_staff()
+async def ai_stats(ctx):
+    """
+    Shows AI reply cache and streaming metrics (Staff only).
+    Usage: .aistats
+    """
+    metrics = ai_cache.metrics()
+    samples = sorted(ai_first_token_samples)
+    first_token = f"p50 {samples[len(samples) // 2] * 1000:.0f}ms, p90 {samples[int(len(samples) * 0.9)] * 1000:.0f}ms" if samples else "no samples yet"
+    await ctx.send(
+        f"🧠 AI cache: {metrics['entries']} entries | {metrics['hits']} hits | {metrics['misses']} misses | "
+        f"{metrics['coalesced']} shared in-flight | hit rate {metrics['hit_rate']:.0%} 🌟\n"
+        f"⚡ Time to first visible token: {first_token} | {len(ai_reply_tasks)} replies streaming"
+    )
+ai_stats.description = "Shows AI reply cache and streaming metrics (Staff only)."
+ai_stats.usage = ".aistats"
+
+@bot.command(name='jobstats')
+@is_staff()
+async def job_stats(ctx):
+    """
+    Shows worker-process job queue depth and health (Staff only).
+    Usage: .jobstats
+    """
+    try:
+        # Round-trips a trivial job at top priority to prove the workers are alive
+        started = time.monotonic()
+        worker_pid = await asyncio.wait_for(job_runner.run(os.getpid, priority=JOB_PRIORITY_HIGH, name='health check'), timeout=30)
+        health = f"✅ worker {worker_pid} answered in {(time.monotonic() - started) * 1000:.0f}ms"
+    except Exception as e:
+        health = f"⚠️ health check failed: {type(e).__name__}"
+    metrics = job_runner.metrics()
+    def ms(value):
+        return f"{value * 1000:.0f}ms" if value is not None else "n/a"
+    queued = ", ".join(f"{JOB_PRIORITY_NAMES.get(priority, priority)}: {count}" for priority, count in metrics['queued_by_priority'].items()) or "none"
+    await ctx.send(
+        f"⚙️ Jobs: {metrics['running']}/{metrics['workers']} workers busy | {metrics['queued']} queued ({queued})\n"
+        f"📊 {metrics['completed']} completed | {metrics['failed']} failed | {metrics['cancelled']} cancelled | {metrics['pool_restarts']} pool restarts\n"
+        f"⏱️ Run p50 {ms(metrics['run_p50'])}, p99 {ms(metrics['run_p99'])} | Queue wait p50 {ms(metrics['wait_p50'])} | Gateway latency {bot.latency * 1000:.0f}ms\n"
+        f"🩺 {health}"
+        + (f"\n🖼️ Welcome cards: {len(welcome_cards.render_samples)} recent renders, avg {sum(welcome_cards.render_samples) / len(welcome_cards.render_samples) * 1000:.0f}ms, avatar cache hit rate {welcome_cards.avatar_hit_rate:.0%}" if welcome_cards.render_samples else "")
+    )
+job_stats.description = "Shows worker-process job queue depth and health (Staff only)."
+job_stats.usage = ".jobstats"
+
 @bot.command(name='say')
 @is_staff()
 async def say_command(ctx, *, message: str):
@@ -1854,19 +5157,26 @@ async def on_command_error(ctx, error):
         pass
     else:
         await ctx.send(f"⚠️ A cosmic storm hit: {str(error)}. Try again or contact support! 🚖")
-        logger.error(f"Command Error in {ctx.command}: {str(error)}")
+        logger.error("Command Error in %s: %s", ctx.command, error)
         # Log the error for debugging
         await log_action("Command Error", ctx.author, None, f"Command: {ctx.command}, Error: {str(error)}")
-    logger.error(f"Command error in {ctx.command}: {str(error)}")
+    logger.error("Command error in %s: %s", ctx.command, error)
 
 # --- Run the Bot ---
 if __name__ == "__main__":
+    # Checked here rather than at import time so the module can be loaded offline (e.g. for profiling)
+    if not DISCORD_TOKEN:
+        logger.error("DISCORD_TOKEN not found! A star has fallen—please set the token and try again! 🌠")
+        sys.exit(1)
+    else:
+        logger.info("DISCORD_TOKEN loaded successfully! Ready to launch into the cosmos! 🚀")
     try:
-        # Run the bot with the loaded token
-        bot.run(DISCORD_TOKEN)
+        # Run the bot with the loaded token; logging is already configured by setup_logging()
+        bot.run(DISCORD_TOKEN, log_handler=None)
+        job_runner.shutdown()
     except discord.LoginFailure:
         logger.error("Invalid DISCORD_TOKEN! Your bot cannot launch into the cosmos. 🚫")
         sys.exit(1)
     except Exception as e:
-        logger.error(f"An unexpected error occurred during bot startup: {str(e)}")
+        logger.error("An unexpected error occurred during bot startup: %s", e)
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,514 @@
+"""
+Offline harness for bot.py.
+Builds real discord.py Guild/Member/Channel/Message objects from gateway-shaped payloads, swaps the
+HTTP layer for a recorder that returns canned REST responses, and replays JSONL event streams through
+the bot's real on_message, command and log_action paths. No token or network connection is needed.
+
+JSONL event format, one gateway dispatch per line:
+    {"t": "MESSAGE_CREATE", "d": {...message payload...}}
+Any dispatch the connection state knows how to parse (MESSAGE_REACTION_ADD, GUILD_MEMBER_ADD, ...) can
+be replayed. Use message_payload() and friends to build payloads, or synthetic_events() for a mixed stream.
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+
+# bot.py reads its data paths at import time; keep replays away from the real data directory
+os.environ.setdefault('BOT_DATA_DIR', tempfile.mkdtemp(prefix='bot-harness-'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord
+from discord.http import Route
+from discord.webhook.async_ import async_context
+
+import bot as bot_module
+
+GUILD_ID = 900000000000000001
+BOT_USER_ID = 900000000000000002
+MEMBER_ID_BASE = 910000000000000000  # Synthetic members are MEMBER_ID_BASE + n
+ADMINISTRATOR = 1 << 3
+DEFAULT_PERMISSIONS = (1 << 10) | (1 << 11) | (1 << 14) | (1 << 16) | (1 << 6)  # View, send, embed, history, react
+
+RestCall = namedtuple('RestCall', 'method path url params payload')
+
+_snowflakes = itertools.count()
+
+def snowflake():
+    """
+    Returns a fresh snowflake timestamped now, so age-dependent REST routes behave like production.
+    """
+    return discord.utils.time_snowflake(discord.utils.utcnow()) + next(_snowflakes) % (1 << 22)
+
+def iso_now():
+    return discord.utils.utcnow().isoformat()
+
+# --- Payload builders ---
+def user_payload(user_id, name=None, bot=False):
+    return {
+        'id': str(user_id),
+        'username': name or f"user{user_id % 100000}",
+        'global_name': None,
+        'discriminator': '0',
+        'avatar': None,
+        'bot': bot
+    }
+
+def role_payload(role_id, name, permissions=0, position=1):
+    return {
+        'id': str(role_id),
+        'name': name,
+        'permissions': str(permissions),
+        'position': position,
+        'color': 0,
+        'hoist': False,
+        'managed': False,
+        'mentionable': True
+    }
+
+def member_payload(user_id, roles=(), name=None, bot=False):
+    return {
+        'user': user_payload(user_id, name, bot),
+        'roles': [str(role_id) for role_id in roles],
+        'joined_at': iso_now(),
+        'deaf': False,
+        'mute': False,
+        'flags': 0
+    }
+
+def channel_payload(channel_id, name, channel_type=0, guild_id=GUILD_ID, parent_id=None, position=0):
+    payload = {
+        'id': str(channel_id),
+        'type': channel_type,
+        'name': name,
+        'position': position,
+        'guild_id': str(guild_id),
+        'permission_overwrites': [],
+        'parent_id': str(parent_id) if parent_id else None,
+        'nsfw': False,
+        'topic': None,
+        'rate_limit_per_user': 0
+    }
+    if channel_type in (11, 12):  # Public and private threads
+        payload['owner_id'] = str(BOT_USER_ID)
+        payload['thread_metadata'] = {'archived': False, 'auto_archive_duration': 1440, 'archive_timestamp': iso_now(), 'locked': False}
+        payload['member_count'] = 1
+        payload['message_count'] = 0
+    return payload
+
+def configured_channels():
+    """
+    Every channel ID bot.py is configured with, so get_channel() finds them during a replay.
+    """
+    names = {
+        'mod-log': bot_module.MOD_LOG_CHANNEL_ID,
+        'status': bot_module.STATUS_CHANNEL_ID,
+        'suggestions': bot_module.SUGGESTION_CHANNEL_ID,
+        'guide': bot_module.GUIDE_CHANNEL_ID,
+        'modmail': bot_module.MODMAIL_CHANNEL_ID,
+        'verification': bot_module.VERIFICATION_CHANNEL_ID,
+        'bump': bot_module.BUMP_CHANNEL_ID,
+        'social-media': bot_module.SOCIAL_MEDIA_CHANNEL_ID,
+        'links': bot_module.LINK_CHANNEL_ID,
+        'welcome': bot_module.WELCOME_CHANNEL_ID
+    }
+    return {channel_id: name for name, channel_id in names.items()}
+
+def configured_roles():
+    role_ids = list(bot_module.STAFF_ROLE_IDS) + [
+        bot_module.HELPER_ROLE_ID, bot_module.QUARANTINE_ROLE_ID, bot_module.BUMP_ROLE_ID,
+        bot_module.SOCIAL_MEDIA_ROLE_ID, bot_module.DEFAULT_ROLE_ID
+    ]
+    return list(dict.fromkeys(role_ids))
+
+APPLICATION_ID = 900000000000000006
+BOT_ROLE_ID = 900000000000000003
+GENERAL_CHANNEL_ID = 900000000000000004
+OWNER_ID = 900000000000000005  # Not the bot, so its permissions come from its roles
+
+def guild_payload(guild_id=GUILD_ID, members=(), extra_channels=()):
+    """
+    A guild holding every configured role and channel, a #general channel, the bot (as administrator)
+    and the given member payloads.
+    """
+    roles = [role_payload(guild_id, '@everyone', DEFAULT_PERMISSIONS, position=0)]
+    roles += [role_payload(role_id, f"role-{position}", position=position) for position, role_id in enumerate(configured_roles(), start=1)]
+    roles.append(role_payload(BOT_ROLE_ID, 'bot', ADMINISTRATOR, position=len(roles) + 1))
+    channels = [channel_payload(channel_id, name, guild_id=guild_id, position=position) for position, (channel_id, name) in enumerate(configured_channels().items())]
+    channels.append(channel_payload(GENERAL_CHANNEL_ID, 'general', guild_id=guild_id, position=len(channels)))
+    channels.extend(extra_channels)
+    return {
+        'id': str(guild_id),
+        'name': 'Harness Galaxy',
+        'owner_id': str(OWNER_ID),
+        'icon': None,
+        'roles': roles,
+        'channels': channels,
+        'threads': [],
+        'members': [member_payload(BOT_USER_ID, [BOT_ROLE_ID], 'harness-bot', bot=True), *members],
+        'member_count': 1 + len(members),
+        'emojis': [],
+        'stickers': [],
+        'features': [],
+        'premium_tier': 0,
+        'verification_level': 0,
+        'default_message_notifications': 0,
+        'explicit_content_filter': 0,
+        'mfa_level': 0,
+        'system_channel_flags': 0,
+        'preferred_locale': 'en-US',
+        'large': False
+    }
+
+def message_payload(content, author_id, channel_id=GENERAL_CHANNEL_ID, guild_id=GUILD_ID, roles=(), mentions=(), bot=False, embeds=(), message_id=None, reference=None):
+    """
+    A MESSAGE_CREATE payload. Pass guild_id=None (and a DM channel ID) for a direct message.
+    """
+    payload = {
+        'id': str(message_id or snowflake()),
+        'channel_id': str(channel_id),
+        'author': user_payload(author_id, bot=bot),
+        'content': content,
+        'timestamp': iso_now(),
+        'edited_timestamp': None,
+        'tts': False,
+        'mention_everyone': False,
+        'mentions': [user_payload(user_id) for user_id in mentions],
+        'mention_roles': [],
+        'attachments': [],
+        'embeds': list(embeds),
+        'pinned': False,
+        'type': 0,
+        'flags': 0
+    }
+    if guild_id is not None:
+        payload['guild_id'] = str(guild_id)
+        payload['member'] = {key: value for key, value in member_payload(author_id, roles).items() if key != 'user'}
+    if reference is not None:
+        payload['message_reference'] = {'message_id': str(reference), 'channel_id': str(channel_id), 'guild_id': str(guild_id) if guild_id else None}
+    return payload
+
+def interaction_payload(command, options, author_id, channel_id=GENERAL_CHANNEL_ID, guild_id=GUILD_ID, roles=()):
+    """
+    An INTERACTION_CREATE payload for a slash command. options maps parameter names to string values.
+    """
+    return {
+        'id': str(snowflake()),
+        'application_id': str(APPLICATION_ID),
+        'type': 2,
+        'token': f"token-{next(_snowflakes)}",
+        'version': 1,
+        'guild_id': str(guild_id),
+        'channel_id': str(channel_id),
+        'channel': channel_payload(channel_id, 'channel', guild_id=guild_id),
+        'member': {**member_payload(author_id, roles), 'permissions': str(DEFAULT_PERMISSIONS)},
+        'app_permissions': str(ADMINISTRATOR),
+        'attachment_size_limit': 8 * 1024 * 1024,
+        'locale': 'en-US',
+        'guild_locale': 'en-US',
+        'entitlements': [],
+        'authorizing_integration_owners': {},
+        'context': 0,
+        'data': {
+            'id': str(snowflake()),
+            'name': command,
+            'type': 1,
+            'options': [{'name': name, 'type': 3, 'value': value} for name, value in options.items()]
+        }
+    }
+
+def event(event_type, data):
+    return {'t': event_type, 'd': data}
+
+def synthetic_events(count, members=200, staff_share=0.05, seed=0):
+    """
+    A mixed MESSAGE_CREATE stream shaped like a busy server: chatter, auto-reply triggers,
+    prefix commands from members and staff, and the odd burst of duplicate spam.
+    """
+    rng = random.Random(seed)
+    staff_role = bot_module.STAFF_ROLE_IDS[0]
+    chatter = ["anyone up for revision later", "did you see the new chapter", "that exam was rough",
+               "lol same", "check the pinned notes", "ok see you in class tomorrow"]
+    triggers = ["hello everyone", "good morning all", "thanks for the help", "bye for now", "can someone help me"]
+    commands = [".help", ".free", ".studying", ".topsuggestions", ".listlink", ".clearstatus"]
+    for i in range(count):
+        member_index = rng.randrange(members)
+        author_id = MEMBER_ID_BASE + member_index
+        roles = [staff_role] if member_index < members * staff_share else []
+        roll = rng.random()
+        if roll < 0.6:
+            content = f"{rng.choice(chatter)} {rng.randrange(1000)}"
+        elif roll < 0.8:
+            content = rng.choice(triggers)
+        elif roll < 0.95:
+            content = rng.choice(commands)
+        else:
+            content = "FREE NITRO at https://spam.example/claim"
+        yield event('MESSAGE_CREATE', message_payload(content, author_id, roles=roles))
+
+def load_events(path):
+    """
+    Yields events from a JSONL file, skipping blank lines.
+    """
+    with open(path, encoding='utf-8') as events_file:
+        for line in events_file:
+            if line.strip():
+                yield json.loads(line)
+
+def write_events(path, events):
+    with open(path, 'w', encoding='utf-8') as events_file:
+        for item in events:
+            events_file.write(json.dumps(item) + '\n')
+
+# --- Recording HTTP layer ---
+def http_error(status, message="error", code=0):
+    """
+    Builds the discord.HTTPException subclass discord.py would raise for a status code.
+    """
+    response = SimpleNamespace(status=status, reason=message)
+    error_type = {403: discord.Forbidden, 404: discord.NotFound}.get(status, discord.HTTPException)
+    if status >= 500:
+        error_type = discord.DiscordServerError
+    return error_type(response, {'code': code, 'message': message})
+
+class RecordingHTTP:
+    """
+    Replaces HTTPClient.request: every REST call is recorded and answered with a canned payload.
+    Override a route with respond('POST', '/channels/{channel_id}/messages', handler), where the
+    handler receives (params, payload) and returns a response payload or raises (see http_error()).
+    """
+    def __init__(self, harness, latency=0.0):
+        self.harness = harness
+        self.latency = latency  # Simulated round trip per request, in seconds
+        self.calls = []
+        self.responders = {
+            ('POST', '/channels/{channel_id}/messages'): self._message_response,
+            ('PATCH', '/channels/{channel_id}/messages/{message_id}'): self._message_response,
+            ('POST', '/users/@me/channels'): self._dm_channel_response,
+            ('GET', '/users/{user_id}'): lambda params, payload: user_payload(int(params['user_id'])),
+            ('GET', '/guilds/{guild_id}/members/{member_id}'): self._member_response,
+            ('PATCH', '/guilds/{guild_id}/members/{user_id}'): lambda params, payload: {**member_payload(int(params['user_id'])), **(payload or {})},
+            ('GET', '/guilds/{guild_id}/members'): lambda params, payload: list(harness.members),  # One page; fine below 1000 members
+            ('GET', '/channels/{channel_id}'): self._channel_response,
+            ('GET', '/channels/{channel_id}/messages'): lambda params, payload: [],  # Empty history
+            ('GET', '/guilds/{guild_id}/bans'): lambda params, payload: [{'user': user_payload(user_id), 'reason': None} for user_id in harness.bans],
+            ('GET', '/guilds/{guild_id}/bans/{user_id}'): self._ban_response,
+            ('POST', '/channels/{channel_id}/threads'): self._thread_response,
+            ('POST', '/channels/{channel_id}/messages/{message_id}/threads'): self._thread_response,
+            ('POST', '/interactions/{webhook_id}/{webhook_token}/callback'): self._interaction_callback_response,
+            ('POST', '/webhooks/{webhook_id}/{webhook_token}'): self._webhook_message_response,
+            ('PATCH', '/webhooks/{webhook_id}/{webhook_token}/messages/{message_id}'): self._webhook_message_response
+        }
+        self.dm_channels = {}  # {recipient_id: DM channel ID}
+
+    def respond(self, method, path, handler):
+        self.responders[(method, path)] = handler
+
+    @staticmethod
+    def _params(route):
+        pattern = re.escape(route.path).replace(r'\{', '{').replace(r'\}', '}')
+        pattern = re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', pattern)
+        match = re.fullmatch(pattern, route.url[len(Route.BASE):].split('?')[0])
+        return match.groupdict() if match else {}
+
+    @staticmethod
+    def _payload(kwargs):
+        if 'json' in kwargs:
+            return kwargs['json']
+        for part in kwargs.get('form') or ():
+            if part.get('name') == 'payload_json':
+                return json.loads(part['value'])
+        return None
+
+    async def webhook_request(self, route, session=None, *, payload=None, multipart=None, files=None, **kwargs):
+        """
+        Replaces the webhook adapter's request, which carries interaction responses and followups.
+        """
+        return await self.request(route, json=payload, form=multipart, files=files)
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        params = self._params(route)
+        payload = self._payload({**kwargs, 'form': form})
+        self.calls.append(RestCall(route.method, route.path, route.url, params, payload))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        handler = self.responders.get((route.method, route.path))
+        return handler(params, payload) if handler else None
+
+    def _message_response(self, params, payload):
+        payload = payload or {}
+        channel_id = int(params['channel_id'])
+        channel = self.harness.state.get_channel(channel_id)
+        guild_id = getattr(getattr(channel, 'guild', None), 'id', None)
+        response = message_payload(payload.get('content') or '', BOT_USER_ID, channel_id, guild_id=guild_id, roles=[BOT_ROLE_ID], bot=True,
+                                   embeds=payload.get('embeds') or (), message_id=params.get('message_id'))
+        response['author']['id'] = str(BOT_USER_ID)
+        return response
+
+    def _interaction_callback_response(self, params, payload):
+        response = {'interaction': {'id': params['webhook_id'], 'type': 2, 'response_message_loading': payload['type'] == 5}}
+        if payload['type'] == 4:  # Immediate message reply
+            message = message_payload((payload.get('data') or {}).get('content') or '', BOT_USER_ID, bot=True)
+            response['resource'] = {'type': 4, 'message': message}
+        return response
+
+    def _webhook_message_response(self, params, payload):
+        payload = payload or {}
+        return message_payload(payload.get('content') or '', BOT_USER_ID, bot=True, embeds=payload.get('embeds') or ())
+
+    def _member_response(self, params, payload):
+        member_id = params['member_id']
+        return next((member for member in self.harness.members if member['user']['id'] == member_id), None) or member_payload(int(member_id))
+
+    def _ban_response(self, params, payload):
+        user_id = int(params['user_id'])
+        if user_id not in self.harness.bans:
+            raise http_error(404, "Unknown Ban", 10026)
+        return {'user': user_payload(user_id), 'reason': None}
+
+    def _dm_channel_response(self, params, payload):
+        recipient_id = int(payload['recipient_id'])
+        channel_id = self.dm_channels.setdefault(recipient_id, snowflake())
+        return {'id': str(channel_id), 'type': 1, 'recipients': [user_payload(recipient_id)], 'last_message_id': None}
+
+    def _channel_response(self, params, payload):
+        channel_id = int(params['channel_id'])
+        if channel_id in self.harness.extra_channels:
+            return self.harness.extra_channels[channel_id]
+        raise http_error(404, "Unknown Channel", 10003)
+
+    def _thread_response(self, params, payload):
+        payload = payload or {}
+        thread_id = int(params.get('message_id') or snowflake())  # Message threads share the starter message's ID
+        thread = channel_payload(thread_id, payload.get('name', 'thread'), payload.get('type', 11), parent_id=params['channel_id'])
+        self.harness.extra_channels[thread_id] = thread
+        return thread
+
+    def count(self, method=None, path=None):
+        return sum(1 for call in self.calls if (method is None or call.method == method) and (path is None or call.path == path))
+
+    def sent_messages(self, channel_id=None):
+        """
+        Payloads of every message posted, optionally only to one channel.
+        """
+        return [call.payload or {} for call in self.calls
+                if call.method == 'POST' and call.path == '/channels/{channel_id}/messages'
+                and (channel_id is None or int(call.params['channel_id']) == channel_id)]
+
+# --- Harness ---
+def is_timer_task(task):
+    """
+    True for tasks that only wait out a timeout (e.g. a View's expiry), which settle() shouldn't wait for.
+    """
+    return task.get_coro().__qualname__.endswith('__timeout_task_impl')
+
+class Harness:
+    """
+    Connects bot.py's global bot to a fake guild and a recording HTTP layer.
+    Use as an async context manager inside a running event loop:
+
+        async with Harness() as harness:
+            await harness.message("hello", author_id=harness.member_id(1))
+            print(harness.http.calls)
+    """
+    def __init__(self, members=(), http_latency=0.0, cache_members=True):
+        self.bot = bot_module.bot
+        self.state = self.bot._connection
+        self.http = RecordingHTTP(self, latency=http_latency)
+        self.members = list(members)  # Member payloads, also served by the member list endpoint
+        self.cache_members = cache_members  # False leaves them out of the guild cache, like the 'none' cache policy
+        self.extra_channels = {}  # Channels only reachable through the REST stand-in (e.g. created threads)
+        self.bans = set()  # User IDs the ban endpoints report as banned
+        self.original_request = None
+        self.webhook_adapter = async_context.get()
+        self.guild = None
+
+    @staticmethod
+    def member_id(n):
+        return MEMBER_ID_BASE + n
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def start(self):
+        await self.bot._async_setup_hook()
+        self.original_request = self.bot.http.request
+        self.bot.http.request = self.http.request
+        self.webhook_adapter.request = self.http.webhook_request
+        self.state.application_id = APPLICATION_ID
+        self.state.user = discord.ClientUser(state=self.state, data=user_payload(BOT_USER_ID, 'harness-bot', bot=True))
+        self.guild = discord.Guild(data=guild_payload(members=self.members if self.cache_members else ()), state=self.state)
+        self.state._add_guild(self.guild)
+        self.baseline_tasks = set(asyncio.all_tasks())
+
+    async def stop(self):
+        await self.settle()
+        self.state._remove_guild(self.guild)
+        self.bot.http.request = self.original_request
+        del self.webhook_adapter.request  # Back to the class's method
+
+    async def settle(self):
+        """
+        Waits until every task started since the harness came up (event handlers, background
+        handler batches, outbound queue workers) has finished.
+        """
+        current = asyncio.current_task()
+        while True:
+            pending = [task for task in asyncio.all_tasks()
+                       if task is not current and task not in self.baseline_tasks and not task.done() and not is_timer_task(task)]
+            if not pending:
+                return
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def dispatch(self, item):
+        """
+        Feeds one gateway event through discord.py's parser, as if it arrived on the websocket,
+        and waits for everything it triggered to finish.
+        """
+        self.state.parsers[item['t']](item['d'])
+        await self.settle()
+
+    async def message(self, content, author_id, channel_id=GENERAL_CHANNEL_ID, **kwargs):
+        await self.dispatch(event('MESSAGE_CREATE', message_payload(content, author_id, channel_id, **kwargs)))
+
+    async def slash(self, command, author_id, roles=(), channel_id=GENERAL_CHANNEL_ID, **options):
+        await self.dispatch(event('INTERACTION_CREATE', interaction_payload(command, options, author_id, channel_id, roles=roles)))
+
+    async def replay(self, events):
+        """
+        Replays events one at a time. Returns a list of (latency_seconds, rest_calls) per event.
+        """
+        results = []
+        for item in events:
+            calls_before = len(self.http.calls)
+            start = time.perf_counter()
+            await self.dispatch(item)
+            results.append((time.perf_counter() - start, len(self.http.calls) - calls_before))
+        return results
+
+def summarize(results, wall_seconds):
+    """
+    Throughput, latency percentiles and REST calls per event for replay() results.
+    """
+    latencies = sorted(latency for latency, _ in results)
+    if not latencies:
+        return {'events': 0}
+    return {
+        'events': len(results),
+        'events_per_sec': len(results) / wall_seconds,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'rest_calls_per_event': sum(calls for _, calls in results) / len(results)
+    }
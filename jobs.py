@@ -0,0 +1,99 @@
+"""
+Worker-process side of the bot's job runner.
+Everything a spawned worker needs lives here, and this module imports nothing heavier than the
+standard library, so workers start in milliseconds instead of loading discord.py and the whole bot.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+RESULT_SUFFIX = '.job'  # Temp files holding large job results
+
+class JobOutput:
+    """
+    Large job result left in a temp file by the worker, so only the path crosses the process boundary.
+    """
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+
+    def read(self):
+        """
+        Returns the result and deletes its temp file.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                return f.read()
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def execute_job(func, args, result_dir, inline_limit):
+    """
+    Runs in a worker process. Bytes results over inline_limit are spilled to a temp file instead of pickled back.
+    """
+    result = func(*args)
+    if isinstance(result, (bytes, bytearray)) and len(result) > inline_limit:
+        fd, path = tempfile.mkstemp(dir=result_dir, suffix=RESULT_SUFFIX)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(result)
+        return JobOutput(path, len(result))
+    return result
+
+def sweep_results(result_dir):
+    """
+    Deletes result files left behind by a previous run (e.g. the bot was killed mid-job). Returns the count.
+    """
+    try:
+        entries = list(os.scandir(result_dir))
+    except FileNotFoundError:
+        return 0
+    removed = 0
+    for entry in entries:
+        if entry.name.endswith(RESULT_SUFFIX):
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+@contextmanager
+def worker_main():
+    """
+    Spawned workers re-run the parent's __main__ module before doing anything else. While workers
+    are being started, __main__ points at this module so they load it instead of the whole bot.
+    """
+    main_module = sys.modules['__main__']
+    sys.modules['__main__'] = sys.modules[__name__]
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main_module
+
+# --- Job functions ---
+def encode_export_batch(fmt, fieldnames, rows, header):
+    """
+    Encodes export rows as JSONL or CSV and compresses them into one gzip member.
+    Gzip members concatenate into a single valid file, so batches can be appended in order.
+    """
+    text = io.StringIO(newline='')
+    if fmt == 'csv':
+        writer = csv.DictWriter(text, fieldnames=fieldnames, extrasaction='ignore')
+        if header:
+            writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            text.write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+    return gzip.compress(text.getvalue().encode('utf-8'))
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# bot.py reads its data paths at import time, so point them at a scratch directory first
+os.environ.setdefault('BOT_DATA_DIR', tempfile.mkdtemp(prefix='bot-tests-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+import asyncio
+
+import bot
+import harness
+
+
+async def ready():
+    pass
+
+
+def test_bump_during_send_does_not_cancel_the_reminder(tmp_path, monkeypatch):
+    tracker = bot.BumpTracker(str(tmp_path / 'state.db'))
+    sending = asyncio.Event()
+    release = asyncio.Event()
+    sent = []
+
+    async def send_bump_reminder():
+        sending.set()
+        await release.wait()
+        sent.append(tracker.last_bump_at)
+        return True
+
+    monkeypatch.setattr(bot, 'send_bump_reminder', send_bump_reminder)
+    monkeypatch.setattr(bot.bot, 'wait_until_ready', ready)
+    monkeypatch.setattr(bot, 'BUMP_COOLDOWN_SECONDS', 3600)
+
+    async def scenario():
+        tracker.last_bump_at = 1000.0  # Cooldown long over, so the reminder is due now
+        tracker.schedule()
+        reminder = tracker.task
+        await sending.wait()
+        await tracker.record_bump(bot.time.time())  # A bump lands while the reminder is going out
+        release.set()
+        await reminder
+        tracker.task.cancel()
+        return reminder
+
+    reminder = asyncio.run(scenario())
+    assert not reminder.cancelled()
+    assert len(sent) == 1
+    assert tracker.reminded_for == 1000.0  # Only the bump the reminder was sent for
+    assert tracker.next_reminder_at() == tracker.last_bump_at + 3600
+
+
+def bump_confirmation(channel_id, author_id=bot.BUMP_BOT_ID, text="Bump done! :thumbsup: Check it out on DISBOARD"):
+    return harness.message_payload("", author_id, channel_id, bot=True, embeds=[{'description': text}])
+
+
+def test_bump_is_recorded_from_any_channel(tmp_path, monkeypatch):
+    tracker = bot.BumpTracker(str(tmp_path / 'state.db'))
+    monkeypatch.setattr(tracker, 'schedule', lambda: None)
+    monkeypatch.setattr(bot, 'bump_tracker', tracker)
+
+    async def scenario():
+        async with harness.Harness() as h:
+            await h.dispatch(harness.event('MESSAGE_CREATE', bump_confirmation(harness.GENERAL_CHANNEL_ID, text="Please wait another 2 hours")))
+            await h.dispatch(harness.event('MESSAGE_CREATE', bump_confirmation(harness.GENERAL_CHANNEL_ID, author_id=harness.Harness.member_id(9))))
+            assert tracker.last_bump_at is None  # Cooldown notices and other bots don't count
+            await h.dispatch(harness.event('MESSAGE_CREATE', bump_confirmation(harness.GENERAL_CHANNEL_ID)))
+            return tracker.last_bump_at
+
+    assert asyncio.run(scenario()) is not None
@@ -0,0 +1,230 @@
+import asyncio
+import re
+
+import pytest
+
+import bot
+
+FOLDER = bot.DriveLibrary.FOLDER_MIME
+ROOT = 'root-folder'
+
+
+class Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result()
+
+
+class FakeDrive:
+    """
+    Local stand-in for the parts of the Drive v3 API DriveLibrary uses: files().list with an
+    "'<id>' in parents and trashed = false" query, and the changes feed. Results are paged small
+    so pagination is always exercised.
+    """
+    def __init__(self, page_size=2):
+        self.page_size = page_size
+        self.items = {ROOT: {'id': ROOT, 'name': 'Library', 'mimeType': FOLDER, 'parents': [], 'trashed': False}}
+        self.log = []  # Change records, in order; a page token is an index into this list
+        self.list_calls = 0
+
+    # Mutations, each recorded in the changes feed for the item itself only
+    def add(self, file_id, name, parent, folder=False):
+        self.items[file_id] = {'id': file_id, 'name': name, 'mimeType': FOLDER if folder else 'application/pdf',
+                               'parents': [parent], 'trashed': False, 'webViewLink': f"https://drive.google.com/file/d/{file_id}/view"}
+        self._changed(file_id)
+
+    def update(self, file_id, **fields):
+        self.items[file_id].update(fields)
+        self._changed(file_id)
+
+    def delete(self, file_id):
+        del self.items[file_id]
+        self.log.append({'fileId': file_id, 'removed': True})
+
+    def _changed(self, file_id):
+        self.log.append({'fileId': file_id, 'removed': False, 'file': dict(self.items[file_id])})
+
+    def _trashed(self, item):
+        while item:
+            if item['trashed']:
+                return True
+            item = self.items.get(item['parents'][0]) if item['parents'] else None
+        return False
+
+    # API surface
+    def files(self):
+        return self
+
+    def changes(self):
+        return ChangesResource(self)
+
+    def list(self, q, fields, pageSize, pageToken=None):
+        self.list_calls += 1
+        parent = re.match(r"'([^']+)' in parents and trashed = false", q).group(1)
+        matches = [dict(item) for item in self.items.values() if parent in item['parents'] and not self._trashed(item)]
+        start = int(pageToken or 0)
+        page = matches[start:start + self.page_size]
+
+        def result():
+            response = {'files': page}
+            if start + self.page_size < len(matches):
+                response['nextPageToken'] = str(start + self.page_size)
+            return response
+        return Request(result)
+
+
+class ChangesResource:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self):
+        return Request(lambda: {'startPageToken': str(len(self.drive.log))})
+
+    def list(self, pageToken, pageSize, **kwargs):
+        start = int(pageToken)
+        page = self.drive.log[start:start + self.drive.page_size]
+
+        def result():
+            response = {'changes': page}
+            end = start + len(page)
+            if end < len(self.drive.log):
+                response['nextPageToken'] = str(end)
+            else:
+                response['newStartPageToken'] = str(end)
+            return response
+        return Request(result)
+
+
+@pytest.fixture
+def drive():
+    fake = FakeDrive()
+    fake.add('notes', 'Notes', ROOT, folder=True)
+    fake.add('n1', 'Physics 2021 Paper 1', 'notes')
+    fake.add('n2', 'Physics 2021 Paper 2', 'notes')
+    fake.add('deep', 'Deep', 'notes', folder=True)
+    fake.add('d1', 'Chemistry Mark Scheme', 'deep')
+    fake.add('top', 'Syllabus', ROOT)
+    fake.add('elsewhere', 'Elsewhere', 'someone-else', folder=True)
+    fake.add('e1', 'Not in the library', 'elsewhere')
+    return fake
+
+
+@pytest.fixture
+def library(tmp_path, drive):
+    return bot.DriveLibrary(str(tmp_path / 'drive.db'), ROOT, service_factory=lambda: drive)
+
+
+def sync(library):
+    return asyncio.run(library.sync())
+
+
+def assert_consistent(library):
+    """The stored index, the in-memory index and the parent links all agree."""
+    reloaded = bot.DriveLibrary(library.db_path, ROOT, service_factory=None)
+    asyncio.run(reloaded.load())
+    assert reloaded.files == library.files
+    assert reloaded.page_token == library.page_token
+    for entry in library.files.values():
+        assert entry['parent_id'] == ROOT or library.files[entry['parent_id']]['mime_type'] == FOLDER
+
+
+def test_full_listing(library, drive):
+    assert sync(library) == 6
+    assert set(library.files) == {'notes', 'n1', 'n2', 'deep', 'd1', 'top'}
+    assert library.files['d1']['parent_id'] == 'deep'
+    assert library.resolve("https://drive.google.com/file/d/n1/view")['name'] == 'Physics 2021 Paper 1'
+    assert [entry['name'] for entry in library.search('physics', '2021', limit=5)] == ['Physics 2021 Paper 1', 'Physics 2021 Paper 2']
+    assert_consistent(library)
+
+
+def test_incremental_changes_do_not_relist(library, drive):
+    sync(library)
+    listed = drive.list_calls
+    drive.add('n3', 'Physics 2022 Paper 1', 'notes')
+    drive.update('top', name='Syllabus 2025')
+    drive.add('e2', 'Still not in the library', 'elsewhere')
+    drive.delete('n2')
+    assert sync(library) == 3
+    assert drive.list_calls == listed
+    assert library.files['n3']['parent_id'] == 'notes'
+    assert library.files['top']['name'] == 'Syllabus 2025'
+    assert 'n2' not in library.files and 'e2' not in library.files
+    assert sync(library) == 0
+    assert_consistent(library)
+
+
+def test_trash_and_untrash_folder(library, drive):
+    sync(library)
+    drive.update('notes', trashed=True)
+    sync(library)
+    assert set(library.files) == {'top'}
+    drive.update('notes', trashed=False)
+    sync(library)
+    # The feed only reports the folder itself, so its contents come back from a listing
+    assert set(library.files) == {'notes', 'n1', 'n2', 'deep', 'd1', 'top'}
+    assert_consistent(library)
+
+
+def test_trash_single_file(library, drive):
+    sync(library)
+    drive.update('d1', trashed=True)
+    sync(library)
+    assert 'd1' not in library.files and 'deep' in library.files
+    drive.update('d1', trashed=False)
+    sync(library)
+    assert library.files['d1']['parent_id'] == 'deep'
+
+
+def test_move_out_of_and_back_into_tree(library, drive):
+    sync(library)
+    drive.update('deep', parents=['elsewhere'])
+    sync(library)
+    assert 'deep' not in library.files and 'd1' not in library.files
+    drive.update('deep', parents=[ROOT])
+    sync(library)
+    assert library.files['deep']['parent_id'] == ROOT
+    assert library.files['d1']['parent_id'] == 'deep'
+    assert_consistent(library)
+
+
+def test_move_within_tree_keeps_subtree(library, drive):
+    sync(library)
+    drive.update('deep', parents=[ROOT])
+    sync(library)
+    assert library.files['deep']['parent_id'] == ROOT
+    drive.update('notes', trashed=True)
+    sync(library)
+    assert set(library.files) == {'top', 'deep', 'd1'}
+
+
+def test_child_before_parent_in_one_batch(library, drive):
+    library.service = drive
+    files = {}
+    upserts, removed = library.apply_changes(files, [
+        {'fileId': 'c1', 'file': {'id': 'c1', 'name': 'Child', 'mimeType': 'application/pdf', 'parents': ['new']}},
+        {'fileId': 'new', 'file': {'id': 'new', 'name': 'New', 'mimeType': FOLDER, 'parents': [ROOT]}},
+    ])
+    assert set(upserts) == {'c1', 'new'} and removed == set()
+    assert files['c1']['parent_id'] == 'new'
+
+
+def test_child_before_parent_across_pages(library, drive):
+    sync(library)
+    drive.page_size = 1
+    # Drive can report a file before the folder it was created in; here they land on different pages
+    drive.items['later'] = {'id': 'later', 'name': 'Later', 'mimeType': FOLDER, 'parents': [ROOT], 'trashed': False}
+    drive.add('l1', 'Arrived first', 'later')
+    drive._changed('later')
+    sync(library)
+    assert library.files['l1']['parent_id'] == 'later'
+    assert_consistent(library)
+
+
+def test_removing_large_tree_uses_child_links(library):
+    files = {'f0': {'name': 'f0', 'mime_type': FOLDER, 'parent_id': ROOT, 'web_link': None}}
+    for i in range(1, 2000):
+        files[f"f{i}"] = {'name': f"f{i}", 'mime_type': FOLDER, 'parent_id': f"f{i - 1}", 'web_link': None}
+    upserts, removed = library.apply_changes(files, [{'fileId': 'f0', 'removed': True}])
+    assert files == {} and len(removed) == 2000
@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import gzip
+import json
+import os
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import bot
+import jobs
+
+
+class UploadChannel:
+    def __init__(self):
+        self.id = 42
+        self.uploads = []
+
+    async def send(self, content=None, file=None, **kwargs):
+        if file is not None:
+            self.uploads.append(file.fp.read())
+            file.close()
+        return content
+
+
+async def rows(count, fail_at=None):
+    for i in range(count):
+        if i == fail_at:
+            raise RuntimeError("history fetch failed")
+        yield {'user_id': i, 'points': i * 2}
+
+
+def test_uploaded_export_is_deleted(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, 'EXPORT_DIR', str(tmp_path))
+    channel = UploadChannel()
+    asyncio.run(bot.run_export(1, 'reputation', 'jsonl', rows(250), channel))
+    assert len(channel.uploads) == 1
+    lines = gzip.decompress(channel.uploads[0]).decode().splitlines()
+    assert [json.loads(line)['user_id'] for line in lines] == list(range(250))
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_export_removes_partial_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, 'EXPORT_DIR', str(tmp_path))
+    channel = UploadChannel()
+    # Fail after a few batches have already been flushed to disk
+    asyncio.run(bot.run_export(2, 'reputation', 'csv', rows(1000, fail_at=bot.EXPORT_BATCH_SIZE * 3 + 5), channel))
+    assert channel.uploads == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_prune_exports_removes_only_expired_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, 'EXPORT_DIR', str(tmp_path))
+    old, fresh = tmp_path / 'cases-1.jsonl.gz', tmp_path / 'cases-2.jsonl.gz'
+    old.write_bytes(b'old')
+    fresh.write_bytes(b'fresh')
+    expired = time.time() - bot.EXPORT_RETENTION_SECONDS - 60
+    os.utime(old, (expired, expired))
+    assert bot.prune_exports() == 1
+    assert os.listdir(tmp_path) == ['cases-2.jsonl.gz']
+
+
+class SyntheticThread:
+    """A thread whose history() makes each message as it is requested, like a paged API would."""
+    def __init__(self, count):
+        self.count = count
+
+    async def history(self, limit=None, oldest_first=True):
+        started = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        for i in range(self.count):
+            yield SimpleNamespace(
+                id=1300000000000000000 + i,
+                created_at=started + datetime.timedelta(seconds=i),
+                author=SimpleNamespace(id=910000000000000000 + i % 500),
+                content=f"Message {i}: the cosmic crew checked in on ticket {i % 97} again",
+                embeds=[],
+                attachments=[]
+            )
+
+
+class DiscardingChannel(UploadChannel):
+    async def send(self, content=None, file=None, **kwargs):
+        if file is not None:
+            while file.fp.read(64 * 1024):  # Stream the upload without holding it
+                pass
+            self.uploads.append(file.filename)
+            file.close()
+        return content
+
+
+def export_peak(count):
+    channel = DiscardingChannel()
+
+    async def export():
+        # Start the job workers first so the pool itself isn't counted
+        await bot.job_runner.run(jobs.encode_export_batch, 'jsonl', [], [], False)
+        tracemalloc.start()
+        await bot.run_export(count, 'transcript', 'jsonl', bot.iter_thread_messages(SyntheticThread(count)), channel)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    peak = asyncio.run(export())
+    assert len(channel.uploads) == 1
+    return peak
+
+
+def test_transcript_export_memory_stays_flat(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, 'EXPORT_DIR', str(tmp_path))
+    small, large = export_peak(10000), export_peak(100000)
+    # Ten times the messages may not cost anything like ten times the memory
+    assert large < small * 1.5 + 256 * 1024, (small, large)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,76 @@
+import asyncio
+
+import harness
+import bot
+
+STAFF_ROLE = bot.STAFF_ROLE_IDS[0]
+
+
+def replay(scenario, **kwargs):
+    async def run():
+        async with harness.Harness(**kwargs) as h:
+            return await scenario(h)
+    return asyncio.run(run())
+
+
+def test_auto_reply_goes_through_real_handlers():
+    async def scenario(h):
+        await h.message("hello everyone", harness.Harness.member_id(1))
+        return h.http.sent_messages(harness.GENERAL_CHANNEL_ID)
+
+    sent = replay(scenario)
+    assert len(sent) == 1
+    assert f"<@{harness.Harness.member_id(1)}>" in sent[0]['content']
+
+
+def test_command_and_log_action_paths():
+    target = harness.Harness.member_id(4)
+
+    async def scenario(h):
+        await h.message(".free", harness.Harness.member_id(2))
+        await h.message(f".warn <@{target}> flooding general", harness.Harness.member_id(3), roles=[STAFF_ROLE])
+        return h.http.sent_messages(harness.GENERAL_CHANNEL_ID), h.http.sent_messages(bot.MOD_LOG_CHANNEL_ID)
+
+    general, mod_log = replay(scenario, members=[harness.member_payload(target)])
+    assert any('free' in (message.get('content') or '').lower() for message in general)
+    assert any('Warn' in embed['title'] for message in mod_log for embed in message.get('embeds', []))
+    assert bot.warnings[target][-1].reason == "flooding general"
+
+
+def test_duplicate_spam_is_deleted_and_logged():
+    async def scenario(h):
+        author = harness.Harness.member_id(50)
+        for _ in range(bot.SPAM_DUPLICATE_LIMIT + 1):
+            await h.message("FREE NITRO at https://spam.example/claim", author)
+        return h.http.count('DELETE', '/channels/{channel_id}/messages/{message_id}'), h.http.sent_messages(bot.MOD_LOG_CHANNEL_ID)
+
+    deletes, mod_log = replay(scenario)
+    assert deletes == 1
+    assert any(embed['title'].endswith('Automod Warn') for message in mod_log for embed in message.get('embeds', []))
+
+
+def test_jsonl_round_trip(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    harness.write_events(path, harness.synthetic_events(200, seed=3))
+    events = list(harness.load_events(path))
+    assert len(events) == 200
+
+    async def scenario(h):
+        return await h.replay(events)
+
+    results = replay(scenario)
+    summary = harness.summarize(results, sum(latency for latency, _ in results))
+    assert summary['events'] == 200
+    assert summary['rest_calls_per_event'] > 0
+
+
+def test_staff_messages_skip_the_spam_detector():
+    author = harness.Harness.member_id(51)
+
+    async def scenario(h):
+        for _ in range(bot.SPAM_DUPLICATE_LIMIT + 1):
+            await h.message("FREE NITRO at https://spam.example/claim", author, roles=[STAFF_ROLE])
+        return h.http.count('DELETE', '/channels/{channel_id}/messages/{message_id}')
+
+    assert replay(scenario) == 0
+    assert author not in bot.spam_detector.slots
@@ -0,0 +1,64 @@
+import asyncio
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import bot
+
+BLOCK_SIZE = 7
+COROUTINES = 50
+IDS_PER_COROUTINE = BLOCK_SIZE * 3
+
+
+async def allocate(db_path, entity='case'):
+    allocator = bot.IdAllocator(db_path, block_size=BLOCK_SIZE)
+
+    async def worker():
+        ids = []
+        for _ in range(IDS_PER_COROUTINE):
+            ids.append(await allocator.next_id(entity))
+            await asyncio.sleep(0)
+        return ids
+
+    results = await asyncio.gather(*(worker() for _ in range(COROUTINES)))
+    return [i for ids in results for i in ids]
+
+
+def allocate_in_process(db_path):
+    return asyncio.run(allocate(db_path))
+
+
+def assert_full_blocks(ids):
+    """Every block a process reserved is handed out completely and in order."""
+    blocks = Counter((i - 1) // BLOCK_SIZE for i in ids)
+    assert all(count == BLOCK_SIZE for count in blocks.values()), blocks
+
+
+def test_concurrent_coroutines(tmp_path):
+    db_path = str(tmp_path / 'ids.db')
+    ids = asyncio.run(allocate(db_path))
+    assert len(ids) == len(set(ids))
+    assert sorted(ids) == list(range(1, COROUTINES * IDS_PER_COROUTINE + 1))
+    assert asyncio.run(bot.IdAllocator(db_path).reserved_next_id('case')) == COROUTINES * IDS_PER_COROUTINE + 1
+
+
+def test_concurrent_processes(tmp_path):
+    db_path = str(tmp_path / 'ids.db')
+    processes = 4
+    with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        per_process = list(pool.map(allocate_in_process, [db_path] * processes))
+    all_ids = [i for ids in per_process for i in ids]
+    assert len(all_ids) == len(set(all_ids)), "an ID was issued twice"
+    for ids in per_process:
+        assert_full_blocks(ids)
+    # Each process consumes whole blocks, so together they cover the sequence without holes
+    assert sorted(all_ids) == list(range(1, processes * COROUTINES * IDS_PER_COROUTINE + 1))
+
+
+def test_restart_skips_unused_ids(tmp_path):
+    db_path = str(tmp_path / 'ids.db')
+    first = bot.IdAllocator(db_path, block_size=BLOCK_SIZE)
+    assert asyncio.run(first.next_id('ticket')) == 1
+    restarted = bot.IdAllocator(db_path, block_size=BLOCK_SIZE)
+    assert asyncio.run(restarted.next_id('ticket')) == BLOCK_SIZE + 1
+    assert asyncio.run(restarted.next_id('case')) == 1
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import bot
+import jobs
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_MODULES = "sorted(name for name in __import__('sys').modules if name.split('.')[0] in ('discord', 'bot', 'aiohttp'))"
+
+
+def test_spawned_workers_do_not_import_the_bot(tmp_path):
+    # Run from a main script that imports the bot, like `python bot.py` does
+    script = tmp_path / 'main.py'
+    script.write_text(
+        "import asyncio, sys\n"
+        f"sys.path.insert(0, {REPO!r})\n"
+        "import bot\n"
+        "async def main():\n"
+        f"    print(await bot.job_runner.run(eval, {WORKER_MODULES!r}))\n"
+        "    bot.job_runner.shutdown()\n"
+        "if __name__ == '__main__':\n"
+        "    asyncio.run(main())\n"
+    )
+    env = {**os.environ, 'BOT_DATA_DIR': str(tmp_path / 'data'), 'LOG_LEVEL': 'WARNING'}
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, env=env, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == '[]'
+
+
+def test_large_result_file_is_deleted_after_reading():
+    async def scenario():
+        output = await bot.job_runner.run(bytes, bot.JOB_INLINE_RESULT_BYTES + 1)
+        assert isinstance(output, jobs.JobOutput) and os.path.exists(output.path)
+        data = output.read()
+        return output.path, data
+
+    path, data = asyncio.run(scenario())
+    assert data == bytes(bot.JOB_INLINE_RESULT_BYTES + 1)
+    assert not os.path.exists(path)
+
+
+def test_sweep_removes_only_job_results(tmp_path):
+    (tmp_path / 'a.job').write_bytes(b'x')
+    (tmp_path / 'b.job').write_bytes(b'x')
+    (tmp_path / 'keep.txt').write_bytes(b'x')
+    assert jobs.sweep_results(str(tmp_path)) == 2
+    assert os.listdir(tmp_path) == ['keep.txt']
+    assert jobs.sweep_results(str(tmp_path / 'missing')) == 0
+
+
+def test_export_batches_concatenate_into_one_file():
+    import gzip
+    first = jobs.encode_export_batch('csv', ['a', 'b'], [{'a': 1, 'b': 2}], True)
+    second = jobs.encode_export_batch('csv', ['a', 'b'], [{'a': 3, 'b': 4}], False)
+    assert gzip.decompress(first + second).decode().splitlines() == ['a,b', '1,2', '3,4']
@@ -0,0 +1,121 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+
+import bot
+
+
+@asynccontextmanager
+async def serve(routes):
+    app = web.Application()
+    app.add_routes(routes)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
+
+
+def respond(status):
+    async def handler(request):
+        return web.Response(status=status)
+    return handler
+
+
+def run_checks(routes, scenario):
+    async def main():
+        checker = bot.LinkHealthChecker()
+        try:
+            async with serve(routes) as base:
+                return await scenario(checker, base)
+        finally:
+            await checker.close()
+    return asyncio.run(main())
+
+
+def test_gone_links_are_flagged_after_one_check():
+    routes = [web.head('/missing', respond(404)),
+              web.head('/gone', respond(410))]
+
+    async def scenario(checker, base):
+        newly_broken = await checker.run_cycle([f"{base}/missing", f"{base}/gone"])
+        return base, newly_broken
+
+    base, newly_broken = run_checks(routes, scenario)
+    assert newly_broken == {f"{base}/missing", f"{base}/gone"}
+
+
+def test_head_not_allowed_falls_back_to_a_ranged_get():
+    seen = []
+
+    async def get(request):
+        seen.append(request.headers.get('Range'))
+        return web.Response(status=206, body=b'x')
+
+    routes = [web.head('/file', respond(405)), web.get('/file', get, allow_head=False)]
+
+    async def scenario(checker, base):
+        return await checker.check(f"{base}/file")
+
+    result = run_checks(routes, scenario)
+    assert seen == ['bytes=0-0']
+    assert result['ok'] and result['status'] == 206
+
+
+def test_not_modified_keeps_the_previous_etag():
+    requests = []
+
+    async def head(request):
+        requests.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        return web.Response(status=200, headers={'ETag': '"v1"', 'Last-Modified': 'Wed, 01 Jan 2026 00:00:00 GMT'})
+
+    async def scenario(checker, base):
+        first = dict(await checker.check(f"{base}/doc"))
+        second = await checker.check(f"{base}/doc")
+        return first, second
+
+    first, second = run_checks([web.head('/doc', head)], scenario)
+    assert requests == [None, '"v1"']
+    assert second['ok'] and second['status'] == 200
+    assert second['etag'] == first['etag'] == '"v1"'
+    assert second['last_modified'] == first['last_modified']
+
+
+def test_connections_to_one_host_are_capped(monkeypatch):
+    monkeypatch.setattr(bot, 'LINK_CHECK_PER_HOST', 2)
+    active, peak = 0, 0
+
+    async def head(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return web.Response(status=200)
+
+    async def scenario(checker, base):
+        await checker.run_cycle([f"{base}/page/{i}" for i in range(12)])
+        return len(checker.results)
+
+    assert run_checks([web.head('/page/{n}', head)], scenario) == 12
+    assert peak == 2
+
+
+def test_malformed_link_is_a_failure_not_a_crash():
+    # An empty DNS label makes the request raise UnicodeError, which isn't an aiohttp error
+    async def scenario(checker, base):
+        newly_broken = await checker.run_cycle(["http://a..b/notes.pdf", f"{base}/ok"])
+        return base, newly_broken, checker.results
+
+    base, newly_broken, results = run_checks([web.head('/ok', respond(200))], scenario)
+    assert newly_broken == set()
+    assert results["http://a..b/notes.pdf"]['ok'] is False
+    assert results["http://a..b/notes.pdf"]['failures'] == 1
+    assert results[f"{base}/ok"]['ok'] is True
@@ -0,0 +1,21 @@
+import asyncio
+import logging
+import time
+
+import bot
+
+
+def test_slow_callbacks_are_recorded_under_a_strict_log_level(monkeypatch):
+    monkeypatch.setattr(bot, 'PROFILE_SLOW_CALLBACK_SECONDS', 0.05)
+    asyncio_logger = logging.getLogger('asyncio')
+    monkeypatch.setattr(asyncio_logger, 'level', logging.ERROR)  # As with LOG_LEVEL=ERROR
+
+    async def scenario():
+        profiler = bot.LoopProfiler()
+        asyncio.get_running_loop().call_later(0.05, time.sleep, 0.1)  # Blocks the loop mid-capture
+        return await profiler.capture(0.3)
+
+    collapsed, slow_callbacks, samples = asyncio.run(scenario())
+    assert any(message.startswith('Executing ') for message in slow_callbacks)
+    assert samples > 0
+    assert asyncio_logger.level == logging.ERROR  # Restored after the capture
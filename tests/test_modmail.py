@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+import bot
+import harness
+
+STAFF_ROLE = bot.STAFF_ROLE_IDS[0]
+
+
+async def private_thread(h, staff_mentionable):
+    for role_id in bot.STAFF_ROLE_IDS:
+        h.guild.get_role(role_id).mentionable = staff_mentionable
+    h.guild.get_role(harness.BOT_ROLE_ID)._permissions = harness.DEFAULT_PERMISSIONS  # No mention_everyone
+    channel = h.guild.get_channel(bot.MODMAIL_CHANNEL_ID)
+    return await channel.create_thread(name="ticket", type=discord.ChannelType.private_thread)
+
+
+def added_users(h):
+    return {int(call.params['user_id']) for call in h.http.calls if call.path == '/channels/{channel_id}/thread-members/{user_id}'}
+
+
+def use_roster(monkeypatch, tmp_path, member_ids=()):
+    roster = bot.StaffRoster(str(tmp_path / 'state.db'))
+    for member_id in member_ids:
+        asyncio.run(roster.add(member_id))
+    monkeypatch.setattr(bot, 'staff_roster', roster)
+    return roster
+
+
+def test_staff_fetched_one_by_one_from_the_roster(monkeypatch, tmp_path):
+    monkeypatch.setattr(bot, 'MEMBER_CACHE_POLICY', 'none')
+    staff_ids = {harness.Harness.member_id(i) for i in range(3)}
+    demoted = harness.Harness.member_id(10)
+    roster = use_roster(monkeypatch, tmp_path, staff_ids | {demoted})
+    members = [harness.member_payload(member_id, roles=[STAFF_ROLE]) for member_id in staff_ids]
+    members.append(harness.member_payload(demoted))
+
+    async def scenario():
+        async with harness.Harness(members=members, cache_members=False) as h:
+            thread = await private_thread(h, staff_mentionable=False)
+            await bot.add_staff_to_thread(thread)
+            return added_users(h), h.http.sent_messages(thread.id), h.http.count('GET', '/guilds/{guild_id}/members')
+
+    added, posted, member_list_pages = asyncio.run(scenario())
+    assert added == staff_ids
+    assert posted == []
+    assert member_list_pages == 0  # Never scans the member list
+    assert roster.member_ids == staff_ids  # The member who lost the role was dropped
+    assert bot.StaffRoster(roster.db_path)._load() == staff_ids
+
+
+def test_roster_follows_staff_messages_and_audit_log_role_changes(monkeypatch, tmp_path):
+    roster = use_roster(monkeypatch, tmp_path)
+    speaker, promoted = harness.Harness.member_id(1), harness.Harness.member_id(2)
+
+    def role_update(member_id, added=(), removed=()):
+        changes = SimpleNamespace(after=SimpleNamespace(roles=[discord.Object(role_id) for role_id in added]),
+                                  before=SimpleNamespace(roles=[discord.Object(role_id) for role_id in removed]))
+        return SimpleNamespace(action=discord.AuditLogAction.member_role_update, target=discord.Object(member_id), changes=changes, guild=h.guild)
+
+    async def scenario():
+        nonlocal h
+        async with harness.Harness() as h:
+            await h.message("on duty", speaker, roles=[STAFF_ROLE])
+            await bot.on_audit_log_entry_create(role_update(promoted, added=[STAFF_ROLE]))
+            seen = set(roster.member_ids)
+            await bot.on_audit_log_entry_create(role_update(speaker, removed=[STAFF_ROLE]))
+            return seen
+
+    h = None
+    assert asyncio.run(scenario()) == {speaker, promoted}
+    assert roster.member_ids == {promoted}
+
+
+def test_mentionable_role_is_summoned_without_member_lookups():
+    async def scenario():
+        async with harness.Harness() as h:
+            thread = await private_thread(h, staff_mentionable=True)
+            await bot.add_staff_to_thread(thread)
+            return h.http.count('GET', '/guilds/{guild_id}/members'), h.http.count('PATCH', '/channels/{channel_id}/messages/{message_id}')
+
+    member_lookups, edits = asyncio.run(scenario())
+    assert member_lookups == 0
+    assert edits == 1
+
+
+def test_thread_is_told_when_no_staff_could_be_added(monkeypatch, tmp_path):
+    monkeypatch.setattr(bot, 'MEMBER_CACHE_POLICY', 'active')
+    use_roster(monkeypatch, tmp_path)
+
+    async def scenario():
+        async with harness.Harness(members=[harness.member_payload(harness.Harness.member_id(1))], cache_members=False) as h:
+            thread = await private_thread(h, staff_mentionable=False)
+            await bot.add_staff_to_thread(thread)
+            return added_users(h), h.http.sent_messages(thread.id)
+
+    added, posted = asyncio.run(scenario())
+    assert added == set()
+    assert len(posted) == 1 and "couldn't add any staff" in posted[0]['content']
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import bot
+
+
+class SlowChannel:
+    """Destination whose sends take a fixed amount of time, like a REST round trip."""
+    def __init__(self, channel_id, delay=0.005):
+        self.id = channel_id
+        self.delay = delay
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        self.sent.append(content)
+        return content
+
+
+async def moderation_latencies(dispatcher, channel, count=20):
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        await dispatcher.send(channel, f"Case #{i}", priority=bot.SEND_PRIORITY_MODERATION)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[-1]
+
+
+def test_moderation_latency_flat_under_auto_reply_flood():
+    async def scenario():
+        mod_log = SlowChannel(1)
+        quiet = bot.OutboundDispatcher()
+        quiet_p50, _ = await moderation_latencies(quiet, mod_log)
+
+        flooded = bot.OutboundDispatcher()
+        flood_channels = [SlowChannel(1000 + i) for i in range(300)]
+        flood = [flooded.post(flood_channels[i % len(flood_channels)], f"auto-reply {i}") for i in range(3000)]
+        await asyncio.sleep(0)  # Let the flood workers grab every send slot first
+        flood_p50, flood_max = await moderation_latencies(flooded, mod_log)
+        assert any(not future.done() for future in flood), "flood drained before moderation sends ran"
+        await asyncio.gather(*flood)
+        return quiet_p50, flood_p50, flood_max
+
+    quiet_p50, flood_p50, flood_max = asyncio.run(scenario())
+    # A moderation send waits for at most one in-flight send to release its slot
+    assert flood_p50 < quiet_p50 * 2 + 0.01
+    assert flood_max < 0.1
+
+
+def test_stats_are_bounded_for_one_off_destinations():
+    async def scenario():
+        dispatcher = bot.OutboundDispatcher()
+        await asyncio.gather(*(dispatcher.send(SlowChannel(i, delay=0), "hi") for i in range(bot.OUTBOUND_STATS_MAX_QUEUES * 3)))
+        return dispatcher
+
+    dispatcher = asyncio.run(scenario())
+    assert len(dispatcher.stats) == bot.OUTBOUND_STATS_MAX_QUEUES
+    assert dispatcher.total_sent == bot.OUTBOUND_STATS_MAX_QUEUES * 3
+    assert len(dispatcher.metrics()) == bot.OUTBOUND_STATS_MAX_QUEUES
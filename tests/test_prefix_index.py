@@ -0,0 +1,78 @@
+import asyncio
+
+import bot
+import harness
+
+
+def build(*entries):
+    index = bot.PrefixIndex()
+    for key, value in entries:
+        index.add(key, value, f"label {value}")
+    return index
+
+
+def test_complete_returns_closest_keys_first():
+    index = build(("bandana", 'c'), ("banner", 'b'), ("ban", 'a'), ("bank", 'd'), ("apple", 'e'))
+    assert [value for value, _ in index.complete("ban")] == ['a', 'd', 'b', 'c']
+    assert index.complete("BAN")[0] == ('a', "label a")  # Case-insensitive
+    assert index.complete("band") == [('c', "label c")]
+    assert index.complete("x") == []
+
+
+def test_complete_respects_the_limit():
+    index = build(*((f"user{i:03}", i) for i in range(100)))
+    assert len(index.complete("user")) == bot.AUTOCOMPLETE_MAX_CHOICES
+    assert [value for value, _ in index.complete("user0", limit=3)] == [0, 1, 2]
+
+
+def test_value_under_several_keys_is_returned_once():
+    index = bot.PrefixIndex()
+    index.add("nova", 42, "nova (42)")
+    index.add("novastar", 42, "nova (42)")  # e.g. a name and an alias
+    index.add("novella", 7)
+    assert index.complete("nov") == [(42, "nova (42)"), (7, "7")]
+
+
+def test_remove_prunes_empty_branches():
+    index = build(("ban", 'a'), ("banner", 'b'))
+    index.add("banner", 'c')
+    index.remove("banner", 'b')
+    assert [value for value, _ in index.complete("banner")] == ['c']
+    index.remove("banner", 'c')
+    assert index.root == {'b': {'a': {'n': {bot.PrefixIndex._ENTRIES: {'a': "label a"}}}}}
+    index.remove("missing", 'a')  # Unknown keys and values are ignored
+    index.remove("ban", 'zzz')
+    index.remove("ban", 'a')
+    assert index.root == {}
+
+
+def test_command_index_lists_commands(monkeypatch):
+    index = bot.PrefixIndex()
+    monkeypatch.setattr(bot, 'command_name_index', index)
+    bot.build_command_name_index()
+    assert ('warn', ".warn") in index.complete("war")
+
+
+def test_ban_index_loads_once_the_bot_is_ready(monkeypatch):
+    index = bot.PrefixIndex()
+    monkeypatch.setattr(bot, 'banned_user_index', index)
+    ready = asyncio.Event()
+
+    async def wait_until_ready():
+        await ready.wait()
+
+    monkeypatch.setattr(bot.bot, 'wait_until_ready', wait_until_ready)
+
+    async def scenario():
+        async with harness.Harness() as h:
+            h.bans.add(harness.Harness.member_id(5))
+            task = asyncio.create_task(bot.load_banned_user_indexes())
+            await asyncio.sleep(0)
+            before = index.complete("user")
+            ready.set()
+            await task
+            return before, index.complete(str(harness.Harness.member_id(5)))
+
+    before, after = asyncio.run(scenario())
+    assert before == []
+    assert [value for value, _ in after] == [str(harness.Harness.member_id(5))]
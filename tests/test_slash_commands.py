@@ -0,0 +1,70 @@
+import asyncio
+
+import bot
+import harness
+
+STAFF_ROLE = bot.STAFF_ROLE_IDS[0]
+STAFF = harness.Harness.member_id(1)
+CALLBACK = '/interactions/{webhook_id}/{webhook_token}/callback'
+
+
+def run(scenario):
+    async def main():
+        async with harness.Harness() as h:
+            await scenario(h)
+            return h.http.calls
+    return asyncio.run(main())
+
+
+def defer_comes_first(calls):
+    assert calls[0].path == CALLBACK and calls[0].payload['type'] == 5, calls[:2]
+
+
+def followups(calls):
+    return [call.payload.get('content') or '' for call in calls if call.path == '/webhooks/{webhook_id}/{webhook_token}']
+
+
+def test_unban_defers_before_lookups():
+    banned = harness.Harness.member_id(77)
+
+    async def scenario(h):
+        h.bans.add(banned)
+        await h.slash('unban', STAFF, roles=[STAFF_ROLE], user_id=str(banned))
+
+    calls = run(scenario)
+    defer_comes_first(calls)
+    assert any(call.method == 'DELETE' and call.params.get('user_id') == str(banned) for call in calls)
+    assert any('has been unbanned' in content for content in followups(calls))
+
+
+def test_unban_reports_user_who_is_not_banned():
+    async def scenario(h):
+        await h.slash('unban', STAFF, roles=[STAFF_ROLE], user_id=str(harness.Harness.member_id(78)))
+
+    calls = run(scenario)
+    defer_comes_first(calls)
+    assert any('is not currently banned' in content for content in followups(calls))
+
+
+def test_modmail_close_and_open_defer(monkeypatch):
+    monkeypatch.setitem(bot.modmail_tickets, '9001', {'user_id': str(harness.Harness.member_id(5)), 'status': 'open', 'thread_id': 1})
+
+    async def scenario(h):
+        await h.slash('modmailclose', STAFF, roles=[STAFF_ROLE], ticket_id='9001')
+        calls_after_close = len(h.http.calls)
+        defer_comes_first(h.http.calls)
+        await h.slash('modmailopen', STAFF, roles=[STAFF_ROLE], ticket_id='9001')
+        defer_comes_first(h.http.calls[calls_after_close:])
+
+    calls = run(scenario)
+    assert any("closed" in content for content in followups(calls))
+
+
+def test_link_defers():
+    async def scenario(h):
+        await h.slash('link', STAFF, roles=[STAFF_ROLE], trigger='physics', notes_name='Physics', file_link='https://example.com/physics.pdf')
+
+    calls = run(scenario)
+    defer_comes_first(calls)
+    assert any("added for 'Physics'" in content for content in followups(calls))
+    bot.links[:] = [link for link in bot.links if link['trigger'] != 'physics']
@@ -0,0 +1,97 @@
+import asyncio
+
+import bot
+
+USER_ID = 910000000000000001
+MODERATOR_ID = 910000000000000002
+
+
+def fresh_state(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'state.db')
+    monkeypatch.setattr(bot, 'SNAPSHOT_PATH', str(tmp_path / 'state.snapshot'))
+    monkeypatch.setattr(bot, 'case_store', bot.CaseStore(db_path))
+    monkeypatch.setattr(bot, 'id_allocator', bot.IdAllocator(db_path))
+    monkeypatch.setattr(bot, 'warnings', {})
+    monkeypatch.setattr(bot, 'infractions', bot.UserCounters())
+
+
+def restart(monkeypatch):
+    monkeypatch.setattr(bot, 'warnings', {})
+    monkeypatch.setattr(bot, 'infractions', bot.UserCounters())
+
+
+async def warn(reason):
+    case_id = await bot.id_allocator.next_id('case')
+    await bot.case_store.add({'case_id': case_id, 'action': 'Warn', 'target': USER_ID, 'moderator': MODERATOR_ID,
+                              'reason': reason, 'details': None, 'created_at': bot.time.time()})
+    bot.add_warning(USER_ID, case_id, reason, MODERATOR_ID)
+    return case_id
+
+
+def test_warning_recorded_during_a_save_is_replayed_once(tmp_path, monkeypatch):
+    fresh_state(tmp_path, monkeypatch)
+    capture_state = bot.capture_state
+    late_case_id = 1000
+
+    def capture_then_warn():
+        sections = capture_state()
+        # A warning lands after the state was copied but before the save finishes
+        bot.case_store._insert({'case_id': late_case_id, 'action': 'Warn', 'target': USER_ID, 'moderator': MODERATOR_ID,
+                                'reason': "late", 'details': None, 'created_at': bot.time.time()})
+        bot.add_warning(USER_ID, late_case_id, "late", MODERATOR_ID)
+        return sections
+
+    async def scenario():
+        await warn("early")
+        monkeypatch.setattr(bot, 'capture_state', capture_then_warn)
+        await bot.save_state_snapshot()
+        restart(monkeypatch)
+        await bot.load_state_snapshot()
+        first = [record.reason for record in bot.warnings[USER_ID]]
+        await bot.load_state_snapshot()  # Loading again must not duplicate anything
+        return first
+
+    first = asyncio.run(scenario())
+    assert first == ["early", "late"]
+    assert [record.reason for record in bot.warnings[USER_ID]] == ["early", "late"]
+    assert bot.infractions[USER_ID] == 2
+
+
+def test_warning_already_in_the_snapshot_is_not_replayed(tmp_path, monkeypatch):
+    fresh_state(tmp_path, monkeypatch)
+    max_case_id = bot.case_store.max_case_id
+
+    async def scenario():
+        async def mark_then_warn():
+            high_water = await max_case_id()
+            await warn("between")  # Recorded after the mark was read, so it is both captured and above it
+            return high_water
+
+        monkeypatch.setattr(bot.case_store, 'max_case_id', mark_then_warn)
+        await bot.save_state_snapshot()
+        monkeypatch.setattr(bot.case_store, 'max_case_id', max_case_id)
+        restart(monkeypatch)
+        await bot.load_state_snapshot()
+
+    asyncio.run(scenario())
+    assert [record.reason for record in bot.warnings[USER_ID]] == ["between"]
+    assert bot.infractions[USER_ID] == 1
+
+
+def test_repeated_signals_start_one_shutdown(monkeypatch):
+    started = []
+
+    async def shutdown_with_snapshot():
+        started.append(True)
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(bot, 'shutdown_with_snapshot', shutdown_with_snapshot)
+
+    async def scenario():
+        bot.request_shutdown()
+        bot.request_shutdown()
+        await asyncio.gather(*bot.shutdown_tasks)
+
+    asyncio.run(scenario())
+    assert started == [True]
+    assert not bot.shutdown_tasks
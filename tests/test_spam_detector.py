@@ -0,0 +1,86 @@
+import asyncio
+
+import bot
+import harness
+
+USER = 910000000000000001
+SENTENCE = ("does anyone have the notes from the astronomy lecture about stellar evolution and the main sequence "
+            "because i missed it and the exam is next week so any help would be really appreciated thanks everyone")
+
+
+def send(detector, now, content='', mentions=0, links=0, user_id=USER):
+    return detector.check(user_id, content, mentions, links, now=now)
+
+
+def test_near_duplicates_are_flagged_on_the_fourth_copy():
+    detector = bot.SpamDetector()
+    variants = [SENTENCE, SENTENCE, SENTENCE.replace("thanks", "cheers"), SENTENCE]
+    results = [send(detector, now, content) for now, content in enumerate(variants)]
+    assert results[:3] == [None, None, None]
+    assert results[3] == f"Repeated the same message 4 times in {bot.SPAM_WINDOW_SECONDS}s"
+
+
+def test_duplicates_outside_the_window_do_not_count():
+    detector = bot.SpamDetector()
+    for now in range(bot.SPAM_DUPLICATE_LIMIT):
+        assert send(detector, now, SENTENCE) is None
+    assert send(detector, bot.SPAM_DUPLICATE_LIMIT + bot.SPAM_WINDOW_SECONDS, SENTENCE) is None
+
+
+def test_message_rate_limit():
+    detector = bot.SpamDetector()
+    results = [send(detector, now * 0.5) for now in range(bot.SPAM_RATE_LIMIT)]
+    assert results[:-1] == [None] * (bot.SPAM_RATE_LIMIT - 1)
+    assert results[-1] == f"Sent {bot.SPAM_RATE_LIMIT} messages in {bot.SPAM_WINDOW_SECONDS}s"
+
+
+def test_mentions_and_links_add_up_across_the_window():
+    detector = bot.SpamDetector()
+    assert send(detector, 0, mentions=bot.SPAM_MENTION_LIMIT - 4) is None
+    assert send(detector, 1, mentions=4) == f"Mentioned {bot.SPAM_MENTION_LIMIT} users or roles in {bot.SPAM_WINDOW_SECONDS}s"
+
+    detector = bot.SpamDetector()
+    assert send(detector, 0, links=bot.SPAM_LINK_LIMIT - 1) is None
+    assert send(detector, 1 + bot.SPAM_WINDOW_SECONDS, links=1) is None  # The earlier links left the window
+    assert send(detector, 2 + bot.SPAM_WINDOW_SECONDS, links=bot.SPAM_LINK_LIMIT - 1) == f"Posted {bot.SPAM_LINK_LIMIT} links in {bot.SPAM_WINDOW_SECONDS}s"
+
+
+def test_window_resets_after_a_detection():
+    detector = bot.SpamDetector()
+    assert send(detector, 0, mentions=bot.SPAM_MENTION_LIMIT) is not None
+    assert send(detector, 1, mentions=1) is None
+
+
+def test_least_recently_active_slot_is_recycled():
+    detector = bot.SpamDetector(max_users=2)
+    first, second, third = USER, USER + 1, USER + 2
+    send(detector, 0, mentions=bot.SPAM_MENTION_LIMIT - 1, user_id=first)
+    send(detector, 1, user_id=second)
+    send(detector, 2, mentions=bot.SPAM_MENTION_LIMIT - 1, user_id=third)  # Takes over the first user's slot
+    assert list(detector.slots) == [second, third]
+    assert len(detector.positions) == 2
+    assert send(detector, 3, mentions=1, user_id=first) is None  # Starts from an empty window
+    assert list(detector.slots) == [third, first]
+    assert send(detector, 4, mentions=1, user_id=third) is not None  # Its own history survived
+
+
+def test_repeat_offender_is_timed_out(monkeypatch):
+    author = harness.Harness.member_id(60)
+    monkeypatch.setattr(bot, 'spam_detector', bot.SpamDetector())
+    monkeypatch.setattr(bot, 'warnings', {})
+    monkeypatch.setattr(bot, 'infractions', bot.UserCounters())
+    bot.infractions[author] = bot.SPAM_TIMEOUT_AFTER_INFRACTIONS - 1
+
+    async def scenario():
+        async with harness.Harness() as h:
+            for _ in range(bot.SPAM_DUPLICATE_LIMIT + 1):
+                await h.message(SENTENCE, author)
+            edits = [call.payload for call in h.http.calls if call.path == '/guilds/{guild_id}/members/{user_id}' and call.method == 'PATCH']
+            return edits, h.http.sent_messages(bot.MOD_LOG_CHANNEL_ID)
+
+    edits, mod_log = asyncio.run(scenario())
+    assert len(edits) == 1 and edits[0]['communication_disabled_until']
+    titles = [embed['title'] for message in mod_log for embed in message.get('embeds', [])]
+    assert any(title.endswith('Automod Warn') for title in titles)
+    assert any(title.endswith('Automod Timeout') for title in titles)
+    assert bot.infractions[author] == bot.SPAM_TIMEOUT_AFTER_INFRACTIONS
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+import bot
+
+SLEEPING, STUDYING = "Sleeping 😴", "Studying 📚"
+USER = 910000000000000001
+
+
+class FakeTimer:
+    def __init__(self, when, callback, args):
+        self.when, self.callback, self.args = when, callback, args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def fire(self):
+        self.cancelled = True  # A fired timer is done, like a real TimerHandle
+        self.callback(*self.args)
+
+
+class FakeClock:
+    """Stands in for time.time() and the loop's call_later, so timers fire only when a test says so."""
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.timers = []
+
+    def time(self):
+        return self.now
+
+    def call_later(self, delay, callback, *args):
+        timer = FakeTimer(self.now + delay, callback, args)
+        self.timers.append(timer)
+        return timer
+
+    @property
+    def armed(self):
+        return [timer for timer in self.timers if not timer.cancelled]
+
+    def advance(self, seconds):
+        """Moves time forward and runs the armed timer if it is due."""
+        self.now += seconds
+        for timer in self.armed:
+            if timer.when <= self.now:
+                timer.fire()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(bot.time, 'time', clock.time)
+    monkeypatch.setattr(bot, 'user_statuses', {})
+    monkeypatch.setattr(bot, 'status_expiry', {})
+    monkeypatch.setattr(bot, 'status_expiry_heap', [])
+    monkeypatch.setattr(bot, 'status_expiry_timer', None)
+    monkeypatch.setattr(bot, 'status_board_refresh_task', None)
+    monkeypatch.setattr(bot, 'STATUS_BOARD_REFRESH_DELAY', 0)
+    return clock
+
+
+def in_loop(clock, scenario):
+    async def main():
+        asyncio.get_running_loop().call_later = clock.call_later
+        return await scenario()
+    return asyncio.run(main())
+
+
+def test_one_timer_armed_for_the_earliest_deadline(clock):
+    async def scenario():
+        bot.set_user_status(USER, SLEEPING)
+        bot.set_user_status(USER + 1, STUDYING)  # Earlier deadline: the timer moves
+        bot.set_user_status(USER + 2, SLEEPING)  # Later deadline: the timer stays
+        return clock.armed
+
+    armed = in_loop(clock, scenario)
+    assert len(armed) == 1
+    assert armed[0].when == clock.now + bot.STATUS_TTL_SECONDS[STUDYING]
+
+
+def test_changed_status_leaves_a_stale_entry_that_is_skipped(clock, monkeypatch):
+    refreshes = []
+
+    async def update_status_board():
+        refreshes.append(clock.now)
+
+    monkeypatch.setattr(bot, 'update_status_board', update_status_board)
+
+    async def scenario():
+        bot.set_user_status(USER, STUDYING)
+        clock.advance(60)
+        bot.set_user_status(USER, SLEEPING)  # The Studying deadline stays on the heap, now stale
+        assert len(bot.status_expiry_heap) == 2
+        clock.advance(bot.STATUS_TTL_SECONDS[STUDYING])
+        await asyncio.sleep(0)
+        return bot.get_user_status(USER), list(bot.status_expiry_heap), clock.armed
+
+    status, heap, armed = in_loop(clock, scenario)
+    assert status == SLEEPING  # The stale deadline didn't expire the new status
+    assert [user_id for _, user_id in heap] == [USER]
+    assert len(armed) == 1 and armed[0].when == bot.status_expiry[USER]
+    assert refreshes == []
+
+
+def test_wave_of_expirations_refreshes_the_board_once(clock, monkeypatch):
+    refreshes = []
+
+    async def update_status_board():
+        refreshes.append(len(bot.user_statuses))
+
+    monkeypatch.setattr(bot, 'update_status_board', update_status_board)
+
+    async def scenario():
+        for offset in range(50):
+            bot.set_user_status(USER + offset, STUDYING)
+        bot.set_user_status(USER + 100, SLEEPING)
+        clock.advance(bot.STATUS_TTL_SECONDS[STUDYING])
+        await bot.status_board_refresh_task
+
+    in_loop(clock, scenario)
+    assert refreshes == [1]  # One refresh, after all 50 expired; the Sleeping status is left
+    assert list(bot.user_statuses) == [USER + 100]
+
+
+def test_expired_status_is_dropped_on_read_before_the_timer_fires(clock):
+    async def scenario():
+        bot.set_user_status(USER, STUDYING)
+        clock.now += bot.STATUS_TTL_SECONDS[STUDYING]  # Time passes but the timer hasn't run yet
+        return bot.get_user_status(USER), clock.armed
+
+    status, armed = in_loop(clock, scenario)
+    assert status is None
+    assert USER not in bot.user_statuses and USER not in bot.status_expiry
+    assert len(armed) == 1  # The timer fires later and finds only a stale entry
+    armed[0].fire()
+    assert bot.status_expiry_heap == []
@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import discord
+import pytest
+
+import bot
+
+
+def http_error(status):
+    return discord.HTTPException(SimpleNamespace(status=status, reason="error"), "error")
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(bot.asyncio, 'sleep', lambda delay, *args: real_sleep(0))
+
+
+def run_step(failures, recover=None):
+    calls = []
+
+    async def step():
+        calls.append(1)
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return "done"
+
+    result = asyncio.run(bot.retry_suggestion_step("do the thing", step, recover=recover))
+    return result, len(calls)
+
+
+@pytest.mark.parametrize('error', [http_error(500), http_error(503), http_error(429), aiohttp.ClientConnectionError(), asyncio.TimeoutError()])
+def test_transient_errors_are_retried(error):
+    assert run_step([error]) == ("done", 2)
+
+
+@pytest.mark.parametrize('error', [http_error(400), http_error(404), ValueError("bad")])
+def test_client_errors_are_not_retried(error):
+    assert run_step([error, error]) == (None, 1)
+
+
+def test_gives_up_after_max_attempts():
+    assert run_step([http_error(502)] * bot.SUGGESTION_RETRY_ATTEMPTS) == (None, bot.SUGGESTION_RETRY_ATTEMPTS)
+
+
+def test_recover_skips_retry_when_step_already_succeeded():
+    async def existing_thread():
+        return "thread"
+
+    assert run_step([http_error(504)], recover=existing_thread) == ("thread", 1)
+
+
+def test_recover_miss_falls_back_to_retry():
+    async def no_thread():
+        return None
+
+    assert run_step([http_error(504)], recover=no_thread) == ("done", 2)
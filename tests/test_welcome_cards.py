@@ -0,0 +1,91 @@
+import asyncio
+import io
+
+import discord
+import pytest
+
+import bot
+import harness
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def avatar_png(color=(120, 80, 200)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (256, 256), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def member_with_avatar(n, avatar_hash):
+    # IDs no other test uses: discord.py keeps the first User it saw for an ID, avatar and all
+    payload = harness.member_payload(harness.Harness.member_id(7000 + n))
+    payload['user']['avatar'] = avatar_hash
+    return {**payload, 'guild_id': str(harness.GUILD_ID)}
+
+
+@pytest.fixture
+def renderer(monkeypatch):
+    renderer = bot.WelcomeCardRenderer()
+    monkeypatch.setattr(bot, 'welcome_cards', renderer)
+    return renderer
+
+
+@pytest.fixture
+def avatar_downloads(monkeypatch):
+    downloads = []
+
+    async def read(asset):
+        downloads.append(asset.url)
+        await asyncio.sleep(0.01)  # Long enough for concurrent joins to overlap
+        return avatar_png()
+
+    monkeypatch.setattr(discord.Asset, 'read', read)
+    return downloads
+
+
+def welcome_messages(h):
+    return [call for call in h.http.calls if call.method == 'POST' and call.params.get('channel_id') == str(bot.WELCOME_CHANNEL_ID)]
+
+
+def test_join_sends_the_card_as_an_attachment(renderer, avatar_downloads):
+    async def scenario():
+        async with harness.Harness() as h:
+            await h.dispatch(harness.event('GUILD_MEMBER_ADD', member_with_avatar(1, 'a1')))
+            return welcome_messages(h)
+
+    [call] = asyncio.run(scenario())
+    assert call.payload['attachments'][0]['filename'] == 'welcome.png'
+    assert call.payload['embeds'][0]['image']['url'] == 'attachment://welcome.png'
+    assert 'thumbnail' not in call.payload['embeds'][0]
+
+
+def test_failed_render_falls_back_to_the_thumbnail_embed(renderer, avatar_downloads, monkeypatch):
+    async def broken_render(member):
+        raise OSError("font file is corrupt")
+
+    monkeypatch.setattr(renderer, 'render', broken_render)
+
+    async def scenario():
+        async with harness.Harness() as h:
+            await h.dispatch(harness.event('GUILD_MEMBER_ADD', member_with_avatar(2, 'a2')))
+            return welcome_messages(h)
+
+    [call] = asyncio.run(scenario())
+    embed = call.payload['embeds'][0]
+    assert not call.payload.get('attachments')
+    assert 'image' not in embed
+    assert embed['thumbnail']['url'].startswith('https://cdn.discordapp.com/avatars/')
+
+
+def test_concurrent_joins_share_one_avatar_download(renderer, avatar_downloads):
+    async def scenario():
+        async with harness.Harness() as h:
+            members = [discord.Member(data=member_with_avatar(3, 'same'), guild=h.guild, state=h.state) for _ in range(5)]
+            cards = await asyncio.gather(*(renderer.render(member) for member in members))
+            await renderer.render(members[0])
+            return cards
+
+    cards = asyncio.run(scenario())
+    assert len(avatar_downloads) == 1
+    assert all(card.startswith(b'\x89PNG') for card in cards)
+    assert renderer.avatar_stats == {'hits': 5, 'misses': 1}